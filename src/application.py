@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from telegram.ext import Application, ContextTypes
+from telegram.request import BaseRequest
+
+from src.configurator import Configurator
+from src.data.config import Config
+from src.handlers.error import error_handler
+from src.observability.instrumentation import instrument_handler
+from src.tg.context import Context
+from src.tg.persistence import Persistence
+from src.tg.request import TransportRequest, create_pool_request
+
+
+def create_application(
+    config: Config,
+    persistence: Persistence | None = None,
+    request: BaseRequest | None = None,
+    get_updates_request: BaseRequest | None = None,
+    game_config_path: Path | None = None,
+    *,
+    process_services: bool = True,
+) -> Application:
+    """Создание приложения бота со всеми обработчиками"""
+    configurator = Configurator(config, game_config_path, process_services=process_services)
+
+    app = (
+        Application.builder()
+        .token(config.token)
+        .request(request or TransportRequest(config.telegram_transport))
+        .get_updates_request(
+            get_updates_request or create_pool_request("updates", config.telegram_transport.updates)
+        )
+        .post_init(configurator.application_post_init)
+        .post_stop(configurator.application_post_stop)
+        .persistence(persistence or Persistence(config))
+        .context_types(ContextTypes(Context))
+        .build()
+    )
+    app.add_error_handler(instrument_handler(error_handler), block=False)
+    app.add_handlers(configurator.create_recorder_handlers(), group=-1)
+    app.add_handlers(configurator.create_basic_handlers())
+    app.add_handlers(configurator.create_admin_handlers())
+    app.add_handlers(configurator.create_inline_keyboard_handlers())
+    app.add_handler(configurator.create_district_sell_conversation_handler())
+    app.add_handler(configurator.create_district_fight_conversation_handler())
+    return app
@@ -1,22 +1,35 @@
+import functools
+from pathlib import Path
+
 from loguru import logger
-from telegram import Bot, BotCommand, BotName
+from telegram import Bot, BotCommand, BotName, Update
 from telegram.ext import (
     Application,
     BaseHandler,
+    CallbackQueryHandler,
     CommandHandler,
     ConversationHandler,
     MessageHandler,
+    TypeHandler,
 )
 from telegram.ext.filters import Chat, ChatType, Text
 
-from src.data.config import Config
+from src.data.config import CONFIG_PATH, Config, parse_config, parse_game_config
+from src.handlers.admin import (
+    profile_handler,
+    stats_handler,
+    timelapse_handler,
+    transfer_handler,
+)
 from src.handlers.basic import (
     cancel_key_hit_handler,
     help_handler,
     simple_key_hit_handler,
 )
 from src.handlers.district_fight import (
+    FIGHT_CALLBACK_PREFIX,
     FightStates,
+    fight_callback_handler,
     fight_choose_assaulter_handler,
     fight_choose_defender_handler,
     fight_district_handler,
@@ -25,13 +38,61 @@ from src.handlers.district_fight import (
     fight_start_handler,
 )
 from src.handlers.district_sell import (
+    SELL_CALLBACK_PREFIX,
     SellStates,
+    sell_callback_handler,
     sell_confirm_handler,
     sell_district_handler,
     sell_start_handler,
     sell_team_handler,
 )
-from src.handlers.districts_map import districts_map_handler
+from src.handlers.districts_map import districts_map_handler, districts_map_region_handler
+from src.handlers.helpers import (
+    CALLBACK_DATA_SEPARATOR,
+    CANCEL_CALLBACK_DATA,
+    cancel_callback_handler,
+)
+from src.observability.instrumentation import instrument_handler
+from src.observability.metrics_server import MetricsServer
+from src.observability.startup import STARTUP
+from src.observability.watchdog import Watchdog
+from src.tg.config_watcher import ConfigWatcher
+from src.tg.standings_broadcaster import StandingsBroadcaster
+from src.tg.update_recorder import UpdateRecorder
+
+RESTART_REQUIRED_FIELDS = (
+    "game",
+    "token",
+    "pg_user",
+    "pg_password",
+    "pg_host",
+    "pg_port",
+    "pg_schema",
+    "minio_root_user",
+    "minio_root_password",
+    "minio_secure",
+    "minio_host",
+    "minio_bucket",
+    "metrics_host",
+    "metrics_port",
+    "tracing_export_path",
+    "tracing_slow_threshold",
+    "watchdog_lag_threshold",
+    "log_level",
+    "log_levels",
+    "log_json",
+    "log_sample_rate",
+    "config_reload_interval",
+    "updates_record_path",
+    "webhook_url",
+    "webhook_host",
+    "webhook_port",
+    "webhook_secret_token",
+    "replica_sync",
+    "telegram_transport",
+    "standings_broadcast",
+)
+"""Поля конфига, которые применяются только при запуске бота"""
 
 
 class Configurator:
@@ -40,97 +101,330 @@ class Configurator:
     HELP_COMMAND = "help"
     """Команда помощи"""
 
-    def __init__(self, config: Config) -> None:
+    PROFILE_COMMAND = "profile"
+    """Команда снятия профиля, доступна только в чате администраторов"""
+
+    TIMELAPSE_COMMAND = "timelapse"
+    """Команда записи таймлапса владения райончиками, доступна только в чате администраторов"""
+
+    STATS_COMMAND = "stats"
+    """Команда статистики владения райончиками, доступна только в чате администраторов"""
+
+    TRANSFER_COMMAND = "transfer"
+    """Команда перераспределения райончиков, доступна только в чате администраторов"""
+
+    REGION_COMMAND = "region"
+    """Команда получения области карты райончиков в режиме высокого разрешения"""
+
+    def __init__(
+        self, config: Config, game_config_path: Path | None = None, *, process_services: bool = True
+    ) -> None:
+        """
+        Конфигуратор игры, `game_config_path` задаётся для игр, размещаемых в одном процессе
+
+        Сервер метрик, наблюдение за циклом событий и запись событий общие для процесса
+        и запускаются только конфигуратором с `process_services`
+        """
         self._config = config
+        self._game_config_path = game_config_path
+        self._process_services = process_services
         self._prepare_filters()
         self.help_handler: BaseHandler = CommandHandler(
-            self.HELP_COMMAND, help_handler, filters=self.all_groups_filter, block=False
+            self.HELP_COMMAND,
+            instrument_handler(help_handler),
+            filters=self.all_groups_filter,
+            block=False,
         )
         self.cancel_handler: BaseHandler = MessageHandler(
-            self.cancel_filter, cancel_key_hit_handler, block=False
+            self.cancel_filter, instrument_handler(cancel_key_hit_handler), block=False
         )
         self.conversation_fallbacks = [self.help_handler, self.cancel_handler]
+        self.metrics_server = (
+            MetricsServer(self._config.metrics_host, self._config.metrics_port)
+            if self._config.metrics_port and process_services
+            else None
+        )
+        self.watchdog: Watchdog | None = None
+        self.config_watcher: ConfigWatcher | None = None
+        self.standings_broadcaster = (
+            StandingsBroadcaster(self._config.standings_broadcast)
+            if self._config.standings_broadcast
+            else None
+        )
+        self.update_recorder = (
+            UpdateRecorder(self._config.updates_record_path, self._config.token)
+            if self._config.updates_record_path and process_services
+            else None
+        )
 
     def _prepare_filters(self) -> None:
-        """Подготовка фильтров для обработчиков"""
-        self.all_groups_filter = ChatType.GROUPS & Chat(self._config.chats.all_chat_ids)
-        self.team_groups_filter = ChatType.GROUPS & Chat(self._config.chats.team_chat_ids)
-        self.admin_group_filter = ChatType.GROUPS & Chat(self._config.chats.admin)
-        self.bank_group_filter = ChatType.GROUPS & Chat(self._config.chats.bank)
-        self.fight_group_filter = ChatType.GROUPS & Chat(self._config.chats.fight)
-
-        self.game_mechanics_key_filter = self.team_groups_filter & Text(
-            [self._config.keyboard["game_mechanics"].key]
-        )
+        """
+        Подготовка фильтров для обработчиков
 
-        self.districts_map_key_filter = self.all_groups_filter & Text(
-            [self._config.keyboard["show_districts_map"].key]
-        )
+        Составные фильтры ссылаются на фильтры чатов и текстов, значения которых задаёт
+        `_update_filters`, поэтому при перезагрузке конфига фильтры обновляются на месте
+        """
+        self._all_chats = Chat()
+        self._team_chats = Chat()
+        self._admin_chat = Chat()
+        self._bank_chat = Chat()
+        self._fight_chat = Chat()
 
-        self.cancel_filter = (self.bank_group_filter | self.fight_group_filter) & Text(
-            [self._config.keyboard["cancel"].key]
-        )
+        self._game_mechanics_key = Text([])
+        self._districts_map_key = Text([])
+        self._cancel_key = Text([])
+        self._sell_keys = Text([])
+        self._fight_keys = Text([])
+        self._fight_notify_key = Text([])
 
-        self.sell_keys_filter = self.bank_group_filter & Text(
-            [
-                self._config.keyboard["district_sell_start_choose_team"].key,
-                *self._config.chats.team_names,
-                *self._config.districts_map.distict_names,
-                self._config.keyboard["district_sell_confirmed"].key,
-            ]
-        )
+        self.all_groups_filter = ChatType.GROUPS & self._all_chats
+        self.team_groups_filter = ChatType.GROUPS & self._team_chats
+        self.admin_group_filter = ChatType.GROUPS & self._admin_chat
+        self.bank_group_filter = ChatType.GROUPS & self._bank_chat
+        self.fight_group_filter = ChatType.GROUPS & self._fight_chat
 
-        self.fight_keys_filter = self.fight_group_filter & Text(
-            [
-                self._config.keyboard["district_fight_start_choose_assaulter"].key,
-                *self._config.chats.team_names,
-                *self._config.districts_map.distict_names,
-            ]
-        )
+        self.game_mechanics_key_filter = self.team_groups_filter & self._game_mechanics_key
+        self.districts_map_key_filter = self.all_groups_filter & self._districts_map_key
+        self.cancel_filter = (self.bank_group_filter | self.fight_group_filter) & self._cancel_key
+        self.sell_keys_filter = self.bank_group_filter & self._sell_keys
+        self.fight_keys_filter = self.fight_group_filter & self._fight_keys
+        self.fight_notify_filter = self.fight_group_filter & self._fight_notify_key
 
-        self.fight_notify_filter = self.fight_group_filter & Text(
-            [self._config.keyboard["district_fight_notify_defender"].key]
-        )
+        self._update_filters()
 
-    async def application_post_init(self, application: Application) -> None:
-        """Инциализация окружения приложения для конфигурации бота"""
-        logger.info("Application post init...")
+    def _update_filters(self) -> None:
+        """Задать значения фильтров из текущего конфига"""
+        self._all_chats.chat_ids = self._config.chats.all_chat_ids
+        self._team_chats.chat_ids = self._config.chats.team_chat_ids
+        self._admin_chat.chat_ids = self._config.chats.admin
+        self._bank_chat.chat_ids = self._config.chats.bank
+        self._fight_chat.chat_ids = self._config.chats.fight
 
-        bot: Bot = application.bot
+        self._game_mechanics_key.strings = [self._config.keyboard["game_mechanics"].key]
+        self._districts_map_key.strings = [self._config.keyboard["show_districts_map"].key]
+        self._cancel_key.strings = [self._config.keyboard["cancel"].key]
+        self._sell_keys.strings = [
+            self._config.keyboard["district_sell_start_choose_team"].key,
+            *self._config.chats.team_names,
+            *self._config.districts_map.distict_names,
+            self._config.keyboard["district_sell_confirmed"].key,
+        ]
+        self._fight_keys.strings = [
+            self._config.keyboard["district_fight_start_choose_assaulter"].key,
+            *self._config.chats.team_names,
+            *self._config.districts_map.distict_names,
+        ]
+        self._fight_notify_key.strings = [
+            self._config.keyboard["district_fight_notify_defender"].key
+        ]
+
+    async def _sync_bot_profile(self, bot: Bot) -> None:
+        """Обновить имя и команды бота, если они отличаются от конфига"""
         bot_my_name: BotName = await bot.get_my_name()
         if bot_my_name.name != self._config.my_name:
             await bot.set_my_name(self._config.my_name)
             logger.info("Found difference in my name - updated")
 
         bot_my_comands: tuple[BotCommand, ...] = await bot.get_my_commands()
-        my_commands = (BotCommand(self.HELP_COMMAND, self._config.help_comand_hint),)
+        my_commands: tuple[BotCommand, ...] = (
+            BotCommand(self.HELP_COMMAND, self._config.help_comand_hint),
+        )
+        if self._config.districts_map.tiled and self._config.districts_map.tiled.regions:
+            my_commands += (
+                BotCommand(self.REGION_COMMAND, self._config.districts_map.tiled.regions_hint),
+            )
         if bot_my_comands != my_commands:
             await bot.set_my_commands(my_commands)
             logger.info("Found difference in my commands - updated")
 
-        logger.success("Done application post init")
+    async def apply_config(self, application: Application, config: Config) -> None:
+        """
+        Применить перезагруженный конфиг
+
+        Конфиг данных бота и фильтры заменяются синхронно, поэтому обработчики видят либо
+        прежний, либо новый конфиг целиком. Обработчики и состояния общений не пересоздаются,
+        начатые общения продолжаются. Если изменились цвета или исходники карты, карта
+        перерисовывается в фоне
+        """
+        restart_required = [
+            field
+            for field in RESTART_REQUIRED_FIELDS
+            if getattr(config, field) != getattr(self._config, field)
+        ]
+        if restart_required:
+            logger.warning(f"Config fields {restart_required} are applied only after restart")
+
+        render_outdated = application.bot_data.set_config(config)
+        self._config = config
+        self._update_filters()
+
+        if render_outdated:
+            logger.info("Districts map colors changed, rendering districts map")
+            application.create_task(application.bot_data.update_districts_map())
+        application.create_task(application.bot_data.init_adjacency())
+        await self._sync_bot_profile(application.bot)
+
+    async def application_post_init(self, application: Application) -> None:
+        """Инциализация окружения приложения для конфигурации бота"""
+        logger.info(f"Application post init for game {self._config.game}...")
+
+        bot: Bot = application.bot
+        await self._sync_bot_profile(bot)
+
+        application.bot_data.error_reporter.start(bot)
+        if self.update_recorder:
+            self.update_recorder.start()
+        if self.metrics_server:
+            self.metrics_server.start()
+        if self._config.watchdog_lag_threshold and self._process_services:
+            self.watchdog = Watchdog(
+                self._config.watchdog_lag_threshold, application.bot_data.error_reporter
+            )
+            self.watchdog.start()
+        if self._config.config_reload_interval:
+            self.config_watcher = ConfigWatcher(
+                self._game_config_path or CONFIG_PATH,
+                self._config.config_reload_interval,
+                functools.partial(parse_game_config, self._game_config_path)
+                if self._game_config_path
+                else parse_config,
+                lambda config: self.apply_config(application, config),
+                application.bot_data.error_reporter,
+            )
+            self.config_watcher.start()
+        if self.standings_broadcaster:
+            self.standings_broadcaster.start(application)
+
+        logger.success(f"Done application post init for game {self._config.game}")
+        if self._process_services:
+            STARTUP.mark("initialize")
+            STARTUP.report()
+
+    async def application_post_stop(self, application: Application) -> None:
+        """Остановка фоновых задач приложения"""
+        logger.info("Application post stop...")
+        if self.config_watcher:
+            await self.config_watcher.stop()
+        if self.standings_broadcaster:
+            await self.standings_broadcaster.stop()
+        if self.watchdog:
+            await self.watchdog.stop()
+        await application.bot_data.error_reporter.stop()
+        if self.update_recorder:
+            self.update_recorder.stop()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        if application.bot_data.replica_sync:
+            await application.bot_data.replica_sync.stop()
+        logger.success("Done application post stop")
 
     def create_basic_handlers(self) -> list[BaseHandler]:
         """Основные обработчики команд и клавиш"""
         return [
             self.help_handler,
-            MessageHandler(self.game_mechanics_key_filter, simple_key_hit_handler, block=False),
-            MessageHandler(self.districts_map_key_filter, districts_map_handler, block=False),
+            MessageHandler(
+                self.game_mechanics_key_filter,
+                instrument_handler(simple_key_hit_handler),
+                block=False,
+            ),
+            MessageHandler(
+                self.districts_map_key_filter,
+                instrument_handler(districts_map_handler),
+                block=False,
+            ),
+            CommandHandler(
+                self.REGION_COMMAND,
+                instrument_handler(districts_map_region_handler),
+                filters=self.all_groups_filter,
+                block=False,
+            ),
+        ]
+
+    def create_inline_keyboard_handlers(self) -> list[BaseHandler]:
+        """
+        Обработчики встроенных клавиатур продажи и стрелки
+
+        Состояние шага передаётся в данных клавиши, поэтому обработчики не входят в общения
+        и регистрируются всегда: клавиатуры, отправленные до выключения режима, продолжают работать
+        """
+        return [
+            CallbackQueryHandler(
+                instrument_handler(sell_callback_handler),
+                pattern=f"^{SELL_CALLBACK_PREFIX}({CALLBACK_DATA_SEPARATOR}|$)",
+                block=False,
+            ),
+            CallbackQueryHandler(
+                instrument_handler(fight_callback_handler),
+                pattern=f"^{FIGHT_CALLBACK_PREFIX}({CALLBACK_DATA_SEPARATOR}|$)",
+                block=False,
+            ),
+            CallbackQueryHandler(
+                instrument_handler(cancel_callback_handler),
+                pattern=f"^{CANCEL_CALLBACK_DATA}$",
+                block=False,
+            ),
+        ]
+
+    def create_recorder_handlers(self) -> list[BaseHandler]:
+        """Обработчик записи всех входящих событий, если запись включена"""
+        if not self.update_recorder:
+            return []
+        return [TypeHandler(Update, self.update_recorder.record_handler)]
+
+    def create_admin_handlers(self) -> list[BaseHandler]:
+        """Обработчики команд администраторов"""
+        return [
+            CommandHandler(
+                self.PROFILE_COMMAND,
+                instrument_handler(profile_handler),
+                filters=self.admin_group_filter,
+                block=False,
+            ),
+            CommandHandler(
+                self.TIMELAPSE_COMMAND,
+                instrument_handler(timelapse_handler),
+                filters=self.admin_group_filter,
+                block=False,
+            ),
+            CommandHandler(
+                self.STATS_COMMAND,
+                instrument_handler(stats_handler),
+                filters=self.admin_group_filter,
+                block=False,
+            ),
+            CommandHandler(
+                self.TRANSFER_COMMAND,
+                instrument_handler(transfer_handler),
+                filters=self.admin_group_filter,
+                block=False,
+            ),
         ]
 
     def create_district_sell_conversation_handler(self) -> ConversationHandler:
         """Обработчик общения для покупки района"""
         return ConversationHandler(
-            entry_points=[MessageHandler(self.sell_keys_filter, sell_start_handler, block=False)],
+            entry_points=[
+                MessageHandler(
+                    self.sell_keys_filter, instrument_handler(sell_start_handler), block=False
+                )
+            ],
             states={
                 SellStates.TEAM_CHOOSE_AWAIT: [
-                    MessageHandler(self.sell_keys_filter, sell_team_handler, block=False)
+                    MessageHandler(
+                        self.sell_keys_filter, instrument_handler(sell_team_handler), block=False
+                    )
                 ],
                 SellStates.DISTRICT_CHOOSE_AWAIT: [
-                    MessageHandler(self.sell_keys_filter, sell_district_handler, block=False)
+                    MessageHandler(
+                        self.sell_keys_filter,
+                        instrument_handler(sell_district_handler),
+                        block=False,
+                    )
                 ],
                 SellStates.SELL_CONFIRMATION_AWAIT: [
-                    MessageHandler(self.sell_keys_filter, sell_confirm_handler, block=False)
+                    MessageHandler(
+                        self.sell_keys_filter, instrument_handler(sell_confirm_handler), block=False
+                    )
                 ],
             },
             fallbacks=self.conversation_fallbacks,
@@ -140,26 +434,44 @@ class Configurator:
     def create_district_fight_conversation_handler(self) -> ConversationHandler:
         """Обработчик общения для покупки района"""
         return ConversationHandler(
-            entry_points=[MessageHandler(self.fight_keys_filter, fight_start_handler, block=False)],
+            entry_points=[
+                MessageHandler(
+                    self.fight_keys_filter, instrument_handler(fight_start_handler), block=False
+                )
+            ],
             states={
                 FightStates.ASSAULTER_TEAM_CHOOSE_AWAIT: [
                     MessageHandler(
-                        self.fight_keys_filter, fight_choose_assaulter_handler, block=False
+                        self.fight_keys_filter,
+                        instrument_handler(fight_choose_assaulter_handler),
+                        block=False,
                     )
                 ],
                 FightStates.DEFENDER_TEAM_CHOOSE_AWAIT: [
                     MessageHandler(
-                        self.fight_keys_filter, fight_choose_defender_handler, block=False
+                        self.fight_keys_filter,
+                        instrument_handler(fight_choose_defender_handler),
+                        block=False,
                     )
                 ],
                 FightStates.FIGHT_RESULT_AWAIT: [
                     MessageHandler(
-                        self.fight_notify_filter, fight_notify_defender_handler, block=False
+                        self.fight_notify_filter,
+                        instrument_handler(fight_notify_defender_handler),
+                        block=False,
+                    ),
+                    MessageHandler(
+                        self.fight_keys_filter,
+                        instrument_handler(fight_result_handler),
+                        block=False,
                     ),
-                    MessageHandler(self.fight_keys_filter, fight_result_handler, block=False),
                 ],
                 FightStates.DISTRICT_CHOOSE_AWAIT: [
-                    MessageHandler(self.fight_keys_filter, fight_district_handler, block=False)
+                    MessageHandler(
+                        self.fight_keys_filter,
+                        instrument_handler(fight_district_handler),
+                        block=False,
+                    )
                 ],
             },
             fallbacks=self.conversation_fallbacks,
@@ -0,0 +1,118 @@
+import hashlib
+import io
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+ADJACENCY_FILENAME = "districts_adjacency.json"
+"""Файл графа соседства райончиков в MinIO рядом с исходниками карты"""
+
+MASK_THRESHOLD = 128
+"""Яркость маски, начиная с которой пиксель относится к райончику"""
+
+LABELS_PER_IMAGE = 255
+"""Количество райончиков на одном изображении меток, метка 0 - пиксель без райончика"""
+
+
+def create_key(mask_filenames: list[str], border_width: int) -> str:
+    """Ключ графа соседства по названиям масок и ширине границы"""
+    return hashlib.sha256("\n".join([*mask_filenames, str(border_width)]).encode()).hexdigest()
+
+
+def compute_adjacency(
+    names: list[str], masks: list[bytes], border_width: int
+) -> dict[str, list[str]]:
+    """
+    Построить граф соседства райончиков по маскам, выполняется в пуле потоков
+
+    Райончики соседние, если маска одного, расширенная на `border_width` пикселей,
+    пересекает маску другого. Маски бинаризуются и раскладываются на изображения меток,
+    где значение пикселя - номер райончика. Для каждого райончика расширяется только его
+    маска в границах с отступом, а номера соседей считываются одной гистограммой
+    изображения меток под расширенной маской
+    """
+    binary_masks = _binarize_masks(masks)
+    if not binary_masks:
+        return {}
+    boxes = [mask.getbbox() for mask in binary_masks]
+    labels = _label_images(binary_masks, boxes)
+
+    neighbours: dict[int, set[int]] = {idx: set() for idx in range(len(binary_masks))}
+    for idx, mask_box in enumerate(boxes):
+        if not mask_box:
+            continue
+        for neighbour in _overlapping_labels(binary_masks[idx], mask_box, labels, border_width):
+            if neighbour != idx:
+                neighbours[idx].add(neighbour)
+                neighbours[neighbour].add(idx)
+
+    for image in (*binary_masks, *labels):
+        image.close()
+    return {
+        names[idx]: sorted(names[neighbour] for neighbour in district_neighbours)
+        for idx, district_neighbours in neighbours.items()
+    }
+
+
+def _binarize_masks(masks: list[bytes]) -> list["Image.Image"]:
+    """Декодировать маски и привести их к размеру первой маски и значениям 0 и 255"""
+    from PIL import Image
+
+    binary_masks: list[Image.Image] = []
+    for mask in masks:
+        mask_image = Image.open(io.BytesIO(mask)).convert("L")
+        if binary_masks and mask_image.size != binary_masks[0].size:
+            mask_image = mask_image.resize(binary_masks[0].size)
+        binary_masks.append(mask_image.point(lambda x: 255 if x >= MASK_THRESHOLD else 0))
+        mask_image.close()
+    return binary_masks
+
+
+def _label_images(
+    binary_masks: list["Image.Image"], boxes: list[tuple[int, int, int, int] | None]
+) -> list["Image.Image"]:
+    """Изображения меток: на каждом до `LABELS_PER_IMAGE` райончиков, пиксель - номер райончика"""
+    from PIL import Image
+
+    labels = []
+    for chunk_start in range(0, len(binary_masks), LABELS_PER_IMAGE):
+        label_image = Image.new("L", binary_masks[0].size, 0)
+        for idx in range(chunk_start, min(chunk_start + LABELS_PER_IMAGE, len(binary_masks))):
+            mask_box = boxes[idx]
+            if mask_box:
+                label_image.paste(idx - chunk_start + 1, mask_box, binary_masks[idx].crop(mask_box))
+        labels.append(label_image)
+    return labels
+
+
+def _overlapping_labels(
+    binary_mask: "Image.Image",
+    mask_box: tuple[int, int, int, int],
+    labels: list["Image.Image"],
+    border_width: int,
+) -> list[int]:
+    """Номера райончиков под маской, расширенной на `border_width` пикселей"""
+    from PIL import ImageFilter
+
+    padded_box = (
+        max(mask_box[0] - border_width, 0),
+        max(mask_box[1] - border_width, 0),
+        min(mask_box[2] + border_width, binary_mask.width),
+        min(mask_box[3] + border_width, binary_mask.height),
+    )
+    dilated = binary_mask.crop(padded_box)
+    for _ in range(border_width):
+        dilated = dilated.filter(ImageFilter.MaxFilter(3))
+    overlapping = []
+    for chunk_idx, label_image in enumerate(labels):
+        label_area = label_image.crop(padded_box)
+        histogram = label_area.histogram(mask=dilated)
+        label_area.close()
+        overlapping += [
+            chunk_idx * LABELS_PER_IMAGE + label - 1
+            for label, count in enumerate(histogram[1:], 1)
+            if count
+        ]
+    dilated.close()
+    return overlapping
@@ -0,0 +1,221 @@
+from datetime import datetime
+
+from pytz import timezone
+from sqlalchemy import Select, and_, func, literal, select, union_all
+from sqlalchemy.sql.selectable import CTE, Subquery
+
+from src.data.config import Config
+from src.data.db_model import DistrictOwnerChange
+
+
+class TeamStats:
+    """Статистика команды по истории владения райончиками"""
+
+    def __init__(
+        self,
+        chat_id: int,
+        held_seconds: float,
+        captures: int,
+        purchases: int,
+        losses: int,
+        peak_districts: int,
+    ) -> None:
+        self.chat_id = chat_id
+        self.held_seconds = held_seconds
+        """Суммарное время владения всеми райончиками"""
+        self.captures = captures
+        """Райончики, полученные у другой команды"""
+        self.purchases = purchases
+        """Райончики, полученные без владельца"""
+        self.losses = losses
+        """Райончики, перешедшие от команды к другому владельцу"""
+        self.peak_districts = peak_districts
+        """Наибольшее количество райончиков, которыми команда владела одновременно"""
+
+
+class DistrictStats:
+    """Статистика райончика по истории владения"""
+
+    def __init__(
+        self,
+        name: str,
+        changes: int,
+        longest_held_seconds: float,
+        longest_owner_chat_id: int | None,
+        owned_since: datetime,
+    ) -> None:
+        self.name = name
+        self.changes = changes
+        """Количество смен владельца после начала игры"""
+        self.longest_held_seconds = longest_held_seconds
+        """Самое долгое владение райончиком одним владельцем"""
+        self.longest_owner_chat_id = longest_owner_chat_id
+        """Владелец райончика при самом долгом владении"""
+        self.owned_since = owned_since
+        """Время перехода райончика к текущему владельцу"""
+
+
+def _owner_periods(now: datetime) -> CTE:
+    """
+    Периоды владения: каждое изменение с прежним владельцем, порядковым номером
+    и длительностью до следующего изменения райончика или до `now`
+
+    Окно по райончику в порядке времени покрывается индексом `(district_name, timestamp, id)`,
+    периоды считаются один раз общим табличным выражением для всех подзапросов
+    """
+    window = {
+        "partition_by": DistrictOwnerChange.district_name,
+        "order_by": (DistrictOwnerChange.timestamp, DistrictOwnerChange.id),
+    }
+    next_timestamp = func.lead(DistrictOwnerChange.timestamp).over(**window)
+    return select(
+        DistrictOwnerChange.district_name,
+        DistrictOwnerChange.owner_chat_id,
+        DistrictOwnerChange.timestamp,
+        func.lag(DistrictOwnerChange.owner_chat_id).over(**window).label("previous_owner_chat_id"),
+        func.row_number().over(**window).label("change_number"),
+        func.extract(
+            "epoch", func.coalesce(next_timestamp, now) - DistrictOwnerChange.timestamp
+        ).label("held_seconds"),
+    ).cte("owner_periods")
+
+
+def team_stats_query(now: datetime) -> Select:
+    """
+    Статистика команд: время владения, захваты, покупки и потери одним проходом по периодам
+
+    Первая запись райончика - владелец на начало игры, она учитывается только во времени владения
+    """
+    periods = _owner_periods(now)
+    changed = and_(
+        periods.c.change_number > 1,
+        periods.c.owner_chat_id.is_distinct_from(periods.c.previous_owner_chat_id),
+    )
+    gains = (
+        select(
+            periods.c.owner_chat_id.label("chat_id"),
+            func.sum(periods.c.held_seconds).label("held_seconds"),
+            func.count()
+            .filter(and_(changed, periods.c.previous_owner_chat_id.is_not(None)))
+            .label("captures"),
+            func.count()
+            .filter(and_(changed, periods.c.previous_owner_chat_id.is_(None)))
+            .label("purchases"),
+        )
+        .where(periods.c.owner_chat_id.is_not(None))
+        .group_by(periods.c.owner_chat_id)
+        .subquery("gains")
+    )
+    losses = (
+        select(
+            periods.c.previous_owner_chat_id.label("chat_id"),
+            func.count().label("losses"),
+        )
+        .where(changed, periods.c.previous_owner_chat_id.is_not(None))
+        .group_by(periods.c.previous_owner_chat_id)
+        .subquery("losses")
+    )
+    peaks = _peak_districts(periods)
+    return (
+        select(
+            gains.c.chat_id,
+            gains.c.held_seconds,
+            gains.c.captures,
+            gains.c.purchases,
+            func.coalesce(losses.c.losses, 0),
+            func.coalesce(peaks.c.peak_districts, 0),
+        )
+        .outerjoin(losses, losses.c.chat_id == gains.c.chat_id)
+        .outerjoin(peaks, peaks.c.chat_id == gains.c.chat_id)
+        .order_by(gains.c.held_seconds.desc())
+    )
+
+
+def _peak_districts(periods: CTE) -> Subquery:
+    """
+    Наибольшее количество райончиков команды: нарастающая сумма приходов и уходов по времени
+
+    Изменения с одним временем попадают в одну рамку окна и учитываются вместе
+    """
+    changed = periods.c.owner_chat_id.is_distinct_from(periods.c.previous_owner_chat_id)
+    deltas = union_all(
+        select(
+            periods.c.owner_chat_id.label("chat_id"),
+            periods.c.timestamp,
+            literal(1).label("delta"),
+        ).where(changed, periods.c.owner_chat_id.is_not(None)),
+        select(
+            periods.c.previous_owner_chat_id.label("chat_id"),
+            periods.c.timestamp,
+            literal(-1).label("delta"),
+        ).where(changed, periods.c.previous_owner_chat_id.is_not(None)),
+    ).subquery("deltas")
+    running = select(
+        deltas.c.chat_id,
+        func.sum(deltas.c.delta)
+        .over(partition_by=deltas.c.chat_id, order_by=deltas.c.timestamp)
+        .label("districts"),
+    ).subquery("running")
+    return (
+        select(running.c.chat_id, func.max(running.c.districts).label("peak_districts"))
+        .group_by(running.c.chat_id)
+        .subquery("peaks")
+    )
+
+
+def district_stats_query(now: datetime) -> Select:
+    """Статистика райончиков: смены владельца, самое долгое владение и время текущего владения"""
+    periods = _owner_periods(now)
+    ranked = select(
+        periods,
+        func.row_number()
+        .over(partition_by=periods.c.district_name, order_by=periods.c.held_seconds.desc())
+        .label("held_rank"),
+    ).subquery("ranked")
+    return (
+        select(
+            ranked.c.district_name,
+            (func.count() - 1).label("changes"),
+            func.max(ranked.c.held_seconds),
+            func.max(ranked.c.owner_chat_id).filter(ranked.c.held_rank == 1),
+            func.max(ranked.c.timestamp),
+        )
+        .group_by(ranked.c.district_name)
+        .order_by(ranked.c.district_name)
+    )
+
+
+def _format_duration(seconds: float) -> str:
+    minutes = int(seconds) // 60
+    return f"{minutes // 60}h{minutes % 60:02d}m"
+
+
+def format_stats(
+    config: Config, team_stats: list[TeamStats], district_stats: list[DistrictStats]
+) -> str:
+    """Статистика владения в виде таблиц для чата администраторов"""
+
+    def team_name(chat_id: int | None) -> str:
+        if chat_id is None:
+            return "-"
+        team = config.chats.chat_id_to_team.get(chat_id)
+        return team.name if team else str(chat_id)
+
+    lines = [
+        f"{'team':<20} {'held':>9} {'peak':>5} {'capt':>5} {'buy':>4} {'lost':>5}",
+        *(
+            f"{team_name(stats.chat_id)[:20]:<20} {_format_duration(stats.held_seconds):>9} "
+            f"{stats.peak_districts:>5} {stats.captures:>5} {stats.purchases:>4} {stats.losses:>5}"
+            for stats in team_stats
+        ),
+        "",
+        f"{'district':<20} {'chg':>4} {'since':>5} {'longest':>9} {'by':<20}",
+        *(
+            f"{stats.name[:20]:<20} {stats.changes:>4} "
+            f"{stats.owned_since.astimezone(timezone('Europe/Moscow')):%H:%M} "
+            f"{_format_duration(stats.longest_held_seconds):>9} "
+            f"{team_name(stats.longest_owner_chat_id)[:20]:<20}"
+            for stats in district_stats
+        ),
+    ]
+    return "\n".join(lines)
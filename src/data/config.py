@@ -1,10 +1,13 @@
+import functools
+import hashlib
 import os
+import pickle
 from pathlib import Path
-from typing import Any, Literal
+from typing import TYPE_CHECKING, Any, Literal
 
+import pydantic
 import yaml
 from dotenv import find_dotenv, load_dotenv
-from jinja2 import Template
 from loguru import logger
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -16,6 +19,9 @@ from src.exceptions.config import (
     KeyboardKeyHintMessagesNotSetError,
 )
 
+if TYPE_CHECKING:
+    from jinja2 import Template
+
 chat_func = Literal["admin", "bank", "fight", "team"]
 key_id = Literal[
     "cancel",
@@ -37,6 +43,8 @@ key_id = Literal[
     "district_fight_notification_all",
     "district_fight_notification_winner",
     "district_fight_notification_loser",
+    "district_owner_already_changed",
+    "districts_transfer_notification",
 ]
 
 
@@ -109,15 +117,29 @@ class KeyboardKeyHit(BaseModel):
             raise KeyboardkeyHintMessageOrMessagesNotSetError
         return super().model_post_init(__context)
 
-    def get_message_template(self) -> Template:
+    def get_message_template(self) -> "Template":
         if not self.message:
             raise KeyboardKeyHintMessageNotSetError
-        return Template(self.message)
+        return compile_template(self.message)
 
-    def get_messages_templates(self) -> list[Template]:
+    def get_messages_templates(self) -> list["Template"]:
         if not self.messages:
             raise KeyboardKeyHintMessagesNotSetError
-        return [Template(message) for message in self.messages]
+        return [compile_template(message) for message in self.messages]
+
+
+@functools.lru_cache(maxsize=512)
+def compile_template(source: str) -> "Template":
+    """
+    Скомпилированный шаблон jinja2
+
+    Шаблоны кэшируются по тексту, поэтому переиспользуются между вызовами обработчиков,
+    а после перезагрузки конфига компилируются только изменённые. jinja2 загружается
+    при первой компиляции
+    """
+    from jinja2 import Template
+
+    return Template(source)
 
 
 class DefaultDistrict(BaseModel):
@@ -127,12 +149,68 @@ class DefaultDistrict(BaseModel):
     mask_filename: str
 
 
+class MapRegion(BaseModel):
+    """Модель области карты райончиков, которую можно получить отдельным файлом"""
+
+    left: int
+    top: int
+    width: int
+    height: int
+
+    @property
+    def box(self) -> tuple[int, int, int, int]:
+        return self.left, self.top, self.left + self.width, self.top + self.height
+
+
+class TiledMap(BaseModel):
+    """Модель режима карты райончиков высокого разрешения, которая хранится плитками"""
+
+    tile_size: int = 512
+    overview_size: int = 2048
+    regions: dict[str, MapRegion] = {}
+    regions_hint: str = "Доступные области карты"
+
+
+class MapEncoding(BaseModel):
+    """
+    Модель кодирования карты райончиков, которая отправляется фото
+
+    `png` - PNG с настройками Pillow по умолчанию, `png_tuned` - PNG с заданными
+    `compress_level` и `optimize`, `palette` - PNG с палитрой из цветов команд и
+    цветов сглаживания, `webp` и `jpeg` - сжатие с потерями с качеством `quality`
+    """
+
+    mode: Literal["png", "png_tuned", "palette", "webp", "jpeg"] = "png"
+    compress_level: int = 3
+    optimize: bool = False
+    palette_colors: int = 256
+    quality: int = 85
+    webp_method: int = 4
+
+
+class DistrictsAdjacency(BaseModel):
+    """
+    Модель соседства райончиков по маскам
+
+    `border_width` - расстояние между масками в пикселях, при котором райончики
+    считаются соседними, `capture_adjacent_only` - в стрелке можно захватить только
+    райончики, граничащие с райончиками победителя
+    """
+
+    border_width: int = 8
+    capture_adjacent_only: bool = False
+
+
 class DistrictsMap(BaseModel):
     """Модель карты райончиков"""
 
     backing_filename: str
     text_filename: str
     none_map_color: str
+    personalized_maps: bool = False
+    tiled: TiledMap | None = None
+    encoding: MapEncoding = MapEncoding()
+    adjacency: DistrictsAdjacency | None = None
     default_districts: list[DefaultDistrict]
     distict_names: list[str] = []
 
@@ -141,15 +219,74 @@ class DistrictsMap(BaseModel):
         return super().model_post_init(__context)
 
 
+class StandingsBroadcast(BaseModel):
+    """
+    Модель рассылки карты райончиков с положением команд в чаты команд
+
+    `interval` - период рассылки в секундах, `owner_changes` - рассылка, как только
+    столько райончиков сменили владельца с прошлой рассылки, `messages_per_second` -
+    ограничение частоты отправки сообщений рассылки
+    """
+
+    interval: float | None = 1800.0
+    owner_changes: int | None = None
+    messages_per_second: float = 10.0
+
+
+class TelegramPool(BaseModel):
+    """
+    Модель пула соединений к Telegram Bot API
+
+    `connection_pool_size` - одновременные запросы пула, остальные ждут не дольше
+    `pool_timeout`, `keepalive_connections` - соединения, которые остаются открытыми
+    между запросами не дольше `keepalive_expiry` секунд, по умолчанию все соединения пула.
+    `http_version` `2` требует установленного `h2`, без него используется HTTP/1.1
+    """
+
+    connection_pool_size: int = 1
+    keepalive_connections: int | None = None
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 5.0
+    write_timeout: float = 5.0
+    pool_timeout: float | None = 1.0
+    http_version: Literal["1.1", "2"] = "1.1"
+
+
+class TelegramTransport(BaseModel):
+    """
+    Модель соединений с Telegram Bot API
+
+    `updates` - получение обновлений, `send` - сообщения, ответы и изменения сообщений,
+    `media` - загрузка и скачивание файлов, чтобы большие файлы не занимали пул сообщений
+
+    Размеры пулов `updates` и `send` по умолчанию - размеры, которые задаёт
+    `ApplicationBuilder` python-telegram-bot: один запрос `getUpdates` и 256 одновременных
+    запросов обработчиков, которые выполняются без блокировки. Пул `media` ограничен
+    несколькими загрузками, чтобы загрузки карт не занимали весь канал
+    """
+
+    updates: TelegramPool = TelegramPool()
+    send: TelegramPool = TelegramPool(connection_pool_size=256)
+    media: TelegramPool = TelegramPool(
+        connection_pool_size=8, read_timeout=20.0, write_timeout=20.0, pool_timeout=5.0
+    )
+
+
 class Config(BaseSettings):
     """Модель конфига приложения"""
 
     model_config = SettingsConfigDict(env_nested_delimiter="__")
 
+    game: str = "main"
+
     token: str
 
     pg_user: str
     pg_password: str
+    pg_host: str = "localhost"
+    pg_port: int = 5432
+    pg_schema: str | None = None
 
     minio_root_user: str
     minio_root_password: str
@@ -157,6 +294,36 @@ class Config(BaseSettings):
     minio_host: str
     minio_bucket: str
 
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int | None = None
+
+    tracing_export_path: str | None = None
+    tracing_slow_threshold: float | None = None
+
+    watchdog_lag_threshold: float | None = None
+
+    log_level: str = "DEBUG"
+    log_levels: dict[str, str] = {}
+    log_json: bool = False
+    log_sample_rate: float | None = None
+
+    config_reload_interval: float | None = None
+
+    updates_record_path: str | None = None
+
+    webhook_url: str | None = None
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_secret_token: str | None = None
+
+    replica_sync: bool = False
+
+    inline_keyboards: bool = False
+
+    telegram_transport: TelegramTransport = TelegramTransport()
+
+    standings_broadcast: StandingsBroadcast | None = None
+
     my_name: str
     help_comand_hint: str
 
@@ -201,23 +368,133 @@ class Config(BaseSettings):
         return self.get_reply_keys_to_choose_from_flat_list(team_names)
 
 
+CONFIG_PATH = Path("config/config.yaml")
+"""Файл конфига"""
+
+
+def _config_snapshot_key(config_yaml: bytes) -> str:
+    """Ключ снимка конфига: хэш файла конфига, описания моделей конфига и версии pydantic"""
+    digest = hashlib.sha256(config_yaml)
+    digest.update(Path(__file__).read_bytes())
+    digest.update(pydantic.VERSION.encode())
+    return digest.hexdigest()
+
+
+def _load_config_snapshot(path: Path, key: str) -> dict[str, Any] | None:
+    """Загрузить проверенные значения конфига из снимка, если снимок соответствует ключу"""
+    if not path.exists():
+        return None
+    try:
+        with path.open("rb") as stream:
+            snapshot = pickle.load(stream)
+    except Exception as e:
+        logger.warning(f"Config snapshot {path} is unreadable: {e}")
+        return None
+    if snapshot.get("key") != key:
+        logger.info(f"Config snapshot {path} is outdated")
+        return None
+    return snapshot["values"]
+
+
+def _save_config_snapshot(path: Path, key: str, values: dict[str, Any]) -> None:
+    """Сохранить проверенные значения конфига в снимок"""
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with tmp_path.open("wb") as stream:
+        pickle.dump({"key": key, "values": values}, stream, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp_path.replace(path)
+    logger.info(f"Saved config snapshot {path}")
+
+
 def create_config() -> Config:
-    """Создание конфига из файла и переменных окружения"""
+    """
+    Создание конфига из файла и переменных окружения
+
+    Если задан `CONFIG_SNAPSHOT_PATH`, проверенные значения из файла конфига сохраняются
+    в снимок, и при следующем запуске с тем же файлом конфига берутся из снимка без разбора
+    YAML и проверки вложенных моделей. Переменные окружения читаются при каждом запуске
+    """
 
     load_dotenv(find_dotenv())
 
-    with Path("config/config.yaml").open() as stream:
-        full_config = yaml.safe_load(stream)
+    config_yaml = CONFIG_PATH.read_bytes()
+    snapshot_key = _config_snapshot_key(config_yaml)
+    snapshot_path = (
+        Path(os.environ["CONFIG_SNAPSHOT_PATH"]) if os.getenv("CONFIG_SNAPSHOT_PATH") else None
+    )
 
-    if not full_config:
-        full_config = {}
+    full_config = _load_config_snapshot(snapshot_path, snapshot_key) if snapshot_path else None
+    from_snapshot = full_config is not None
+    if full_config is None:
+        full_config = _read_config_values(config_yaml)
+    config_keys = list(full_config)
 
-    full_config["minio_secure"] = "unsecure"
-    if os.getenv("MINIO_CERTDIR"):
-        full_config["minio_secure"] = "tls"
+    config_obj = _create_config_from_values(full_config)
 
-    config_obj = Config(**full_config)
+    if snapshot_path and not from_snapshot:
+        _save_config_snapshot(
+            snapshot_path, snapshot_key, {key: getattr(config_obj, key) for key in config_keys}
+        )
 
-    logger.info(f"\n{config_obj.model_dump_json(indent=4)}")
+    logger.info(
+        f"Loaded config {snapshot_key[:12]}{' from snapshot' if from_snapshot else ''}: "
+        f"{describe_config(config_obj)}"
+    )
 
     return config_obj
+
+
+def create_game_configs(games_dir: Path) -> dict[Path, Config]:
+    """
+    Создание конфигов игр, размещаемых в одном процессе, по файлам `*.yaml` в каталоге
+
+    Название игры - имя файла без расширения, оно же по умолчанию задаёт схему БД и бакет
+    MinIO игры. Токен игры берётся из переменной окружения `TOKEN_<ИГРА>`, если она задана
+    """
+
+    load_dotenv(find_dotenv())
+
+    configs = {}
+    for config_path in sorted(games_dir.glob("*.yaml")):
+        configs[config_path] = parse_game_config(config_path, config_path.read_bytes())
+        logger.info(
+            f"Loaded game {config_path.stem} config: {describe_config(configs[config_path])}"
+        )
+
+    if not configs:
+        raise FileNotFoundError(f"No game configs found in {games_dir}")
+    return configs
+
+
+def parse_game_config(config_path: Path, config_yaml: bytes) -> Config:
+    """Разобрать и проверить конфиг игры из содержимого её файла конфига и переменных окружения"""
+    game = config_path.stem
+    values = _read_config_values(config_yaml)
+    values.setdefault("pg_schema", game)
+    values.setdefault("minio_bucket", game)
+    token = os.getenv(f"TOKEN_{game.upper().replace('-', '_')}")
+    if token:
+        values["token"] = token
+    return _create_config_from_values(values | {"game": game})
+
+
+def parse_config(config_yaml: bytes) -> Config:
+    """Разобрать и проверить конфиг из содержимого файла конфига и переменных окружения"""
+    return _create_config_from_values(_read_config_values(config_yaml))
+
+
+def describe_config(config: Config) -> str:
+    """Краткое описание конфига для лога"""
+    return (
+        f"{len(config.chats.teams)} teams, "
+        f"{len(config.districts_map.default_districts)} districts, "
+        f"{len(config.keyboard)} keys"
+    )
+
+
+def _read_config_values(config_yaml: bytes) -> dict[str, Any]:
+    return yaml.load(config_yaml, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)) or {}
+
+
+def _create_config_from_values(values: dict[str, Any]) -> Config:
+    minio_secure = "tls" if os.getenv("MINIO_CERTDIR") else "unsecure"
+    return Config(**values, minio_secure=minio_secure)
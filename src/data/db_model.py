@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import BigInteger, DateTime
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index
 from sqlalchemy.orm import (
     DeclarativeBase,
     Mapped,
@@ -47,3 +47,45 @@ class DistrictsMap(DbModel):
 
     file_id: Mapped[str | None] = mapped_column(default=None)
     """Id файла карты райончиков в telegram"""
+
+
+class DistrictsMapVariant(DbModel):
+    """Персональные варианты карт райончиков для команд"""
+
+    __tablename__ = "districts_map_variants"
+
+    id: Mapped[int] = mapped_column(primary_key=True, nullable=False)
+    """Уникальный идентификатор варианта карты"""
+
+    districts_map_id: Mapped[int] = mapped_column(ForeignKey("districts_maps.id"), index=True)
+    """Идентификатор карты, к которой относится вариант"""
+
+    chat_id: Mapped[int] = mapped_column(type_=BigInteger)
+    """Идентификатор чата команды, для которой отрисован вариант"""
+
+    filename: Mapped[str] = mapped_column()
+    """Название файла варианта карты"""
+
+    file_id: Mapped[str | None] = mapped_column(default=None)
+    """Id файла варианта карты в telegram"""
+
+
+class DistrictOwnerChange(DbModel):
+    """История владения райончиками"""
+
+    __tablename__ = "district_owner_changes"
+    __table_args__ = (
+        Index("ix_district_owner_changes_district_timestamp", "district_name", "timestamp", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, nullable=False)
+    """Уникальный идентификатор изменения"""
+
+    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    """Время изменения владения"""
+
+    district_name: Mapped[str] = mapped_column()
+    """Название райончика"""
+
+    owner_chat_id: Mapped[int | None] = mapped_column(nullable=True, type_=BigInteger)
+    """Идентификатор чата нового владельца райончика"""
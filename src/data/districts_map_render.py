@@ -0,0 +1,66 @@
+import io
+from typing import TYPE_CHECKING
+
+from src.data.tiled_map import MASK_OPACITY
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+VARIANT_DIM_FACTOR = 0.45
+"""Яркость чужих райончиков на персональных вариантах карты"""
+
+
+def render_districts_maps(
+    backing: bytes,
+    mask_colors: list[tuple[bytes, str]],
+    text: bytes,
+    variant_masks: dict[int, list[int]],
+) -> tuple["Image.Image", dict[int, "Image.Image"]]:
+    """
+    Отрисовать общую карту райончиков и персональные варианты за один проход
+
+    Маски райончиков декодируются один раз, раскрашенная карта без подписей и её затемнённая
+    копия общие для всех вариантов. Вариант команды - затемнённая карта, на которую по
+    объединению масок райончиков команды наложена раскрашенная карта, и подписи поверх.
+    Выполняется в пуле потоков, PIL загружается при первой отрисовке
+    """
+    from PIL import Image, ImageChops
+
+    colored_map = Image.open(io.BytesIO(backing))
+    masks = []
+    for mask, color in mask_colors:
+        district_mask = Image.open(io.BytesIO(mask)).convert("L").resize(colored_map.size)
+        district_mask_evaled = Image.eval(district_mask, lambda x: x * MASK_OPACITY)
+        district_mask_color_fill = Image.new("RGB", colored_map.size, color)
+        colored_map = Image.composite(district_mask_color_fill, colored_map, district_mask_evaled)
+        district_mask_color_fill.close()
+        if variant_masks:
+            masks.append(district_mask)
+        else:
+            district_mask.close()
+
+    text_image = Image.open(io.BytesIO(text))
+    districts_map = colored_map.copy()
+    districts_map.alpha_composite(text_image)
+
+    variant_maps = {}
+    if variant_masks:
+        *color_bands, alpha = colored_map.split()
+        dimmed_map = Image.merge(
+            colored_map.mode,
+            [band.point(lambda x: x * VARIANT_DIM_FACTOR) for band in color_bands] + [alpha],
+        )
+        for chat_id, mask_indexes in variant_masks.items():
+            own_mask = masks[mask_indexes[0]]
+            for mask_idx in mask_indexes[1:]:
+                own_mask = ImageChops.lighter(own_mask, masks[mask_idx])
+            variant_map = Image.composite(colored_map, dimmed_map, own_mask)
+            variant_map.alpha_composite(text_image)
+            variant_maps[chat_id] = variant_map
+        dimmed_map.close()
+        for district_mask in masks:
+            district_mask.close()
+
+    text_image.close()
+    colored_map.close()
+    return districts_map, variant_maps
@@ -0,0 +1,215 @@
+from pydantic import BaseModel, ConfigDict
+
+from src.data.config import Config
+from src.exceptions.db import DistrictsMapFileWasNotFoundInMinioError
+
+team_with_district_num = dict[str, str | int]
+
+FULL_MAP_VARIANT_ID = 0
+"""Ключ полноразмерной карты среди вариантов карты в режиме высокого разрешения"""
+
+
+class DistrictsMapVariantView(BaseModel):
+    """Вариант карты райончиков: персональная карта команды или полноразмерная карта"""
+
+    model_config = ConfigDict(frozen=True)
+
+    filename: str
+    """Название файла варианта карты"""
+
+    file_id: str | None = None
+    """Id файла варианта карты в telegram"""
+
+    map_bytes: bytes | None = None
+    """Байты варианта карты, если его ещё нет в telegram"""
+
+    @property
+    def districts_map(self) -> bytes | str:
+        """Идентификатор файла или байты варианта карты для отправки в telegram"""
+        if self.file_id:
+            return self.file_id
+        if self.map_bytes is None:
+            raise DistrictsMapFileWasNotFoundInMinioError
+        return self.map_bytes
+
+
+class DistrictsMapView(BaseModel):
+    """
+    Неизменяемый снимок состояния карты райончиков
+
+    Содержит всё, что требуется для ответа на запрос карты без обращения к БД и MinIO,
+    заменяется целиком при изменении владения райончиками или идентификатора файла
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    district_owners: dict[str, int | None]
+    """Идентификаторы чатов владельцев райончиков по названию райончика"""
+
+    teams_with_district_num: dict[int, team_with_district_num]
+    """Команды с количеством подконтрольных райончиков по идентификатору чата"""
+
+    sorted_teams: tuple[team_with_district_num, ...]
+    """Команды с подконтрольными райончиками, отсортированные по названию"""
+
+    captions: dict[int, str]
+    """Подписи к карте по идентификатору чата"""
+
+    districts_map_id: int
+    """Идентификатор актуальной карты райончиков в БД"""
+
+    districts_map_filename: str
+    """Название файла актуальной карты райончиков"""
+
+    districts_map_file_id: str | None = None
+    """Id файла актуальной карты райончиков в telegram"""
+
+    districts_map_bytes: bytes | None = None
+    """Байты актуальной карты райончиков, если её ещё нет в telegram"""
+
+    variants: dict[int, DistrictsMapVariantView] = {}
+    """Варианты актуальной карты по идентификатору чата команды или `FULL_MAP_VARIANT_ID`"""
+
+    @classmethod
+    def create(
+        cls,
+        config: Config,
+        district_owners: dict[str, int | None],
+        districts_map_id: int,
+        districts_map_filename: str,
+        districts_map_file_id: str | None,
+        districts_map_bytes: bytes | None,
+        variants: dict[int, DistrictsMapVariantView] | None = None,
+    ) -> "DistrictsMapView":
+        """Создать снимок карты по владельцам райончиков и актуальной карте"""
+        district_nums: dict[int, int] = {}
+        for owner_chat_id in district_owners.values():
+            if owner_chat_id is not None:
+                district_nums[owner_chat_id] = district_nums.get(owner_chat_id, 0) + 1
+
+        teams_with_district_num: dict[int, team_with_district_num] = {}
+        for chat_id, district_num in district_nums.items():
+            team = config.chats.chat_id_to_team[chat_id]
+            teams_with_district_num[chat_id] = {
+                "color_emoji": team.color_emoji,
+                "name": team.name,
+                "district_num": district_num,
+            }
+
+        sorted_teams = tuple(
+            sorted(teams_with_district_num.values(), key=lambda team: team["name"])
+        )
+
+        message_template = config.keyboard["show_districts_map"].get_message_template()
+        captions = {}
+        for chat_id, chat_func in config.chats.chat_id_to_func.items():
+            own_team = None
+            if chat_func == "team":
+                team = config.chats.chat_id_to_team[chat_id]
+                own_team = teams_with_district_num.get(
+                    chat_id,
+                    {"color_emoji": team.color_emoji, "name": team.name, "district_num": 0},
+                )
+            template_context = {
+                "team": own_team,
+                "teams": [
+                    team for team in sorted_teams if own_team is None or team is not own_team
+                ],
+            }
+            captions[chat_id] = message_template.render(context=template_context)
+
+        return cls(
+            district_owners=district_owners,
+            teams_with_district_num=teams_with_district_num,
+            sorted_teams=sorted_teams,
+            captions=captions,
+            districts_map_id=districts_map_id,
+            districts_map_filename=districts_map_filename,
+            districts_map_file_id=districts_map_file_id,
+            districts_map_bytes=districts_map_bytes,
+            variants=variants or {},
+        )
+
+    def with_district_owner(
+        self, config: Config, district_name: str, owner_chat_id: int | None
+    ) -> "DistrictsMapView":
+        """Получить снимок с изменённым владельцем райончика и прежней картой"""
+        return self.with_district_owners(config, {district_name: owner_chat_id})
+
+    def with_district_owners(
+        self, config: Config, district_owners: dict[str, int | None]
+    ) -> "DistrictsMapView":
+        """Получить снимок с изменёнными владельцами райончиков и прежней картой"""
+        return self.create(
+            config,
+            self.district_owners | district_owners,
+            self.districts_map_id,
+            self.districts_map_filename,
+            self.districts_map_file_id,
+            self.districts_map_bytes,
+            self.variants,
+        )
+
+    def with_config(self, config: Config) -> "DistrictsMapView":
+        """Получить снимок с командами и подписями из нового конфига и прежней картой"""
+        return self.create(
+            config,
+            self.district_owners,
+            self.districts_map_id,
+            self.districts_map_filename,
+            self.districts_map_file_id,
+            self.districts_map_bytes,
+            self.variants,
+        )
+
+    def with_districts_map(
+        self,
+        districts_map_id: int,
+        districts_map_filename: str,
+        districts_map_bytes: bytes,
+        variants: dict[int, DistrictsMapVariantView] | None = None,
+    ) -> "DistrictsMapView":
+        """Получить снимок с новой картой райончиков"""
+        return self.model_copy(
+            update={
+                "districts_map_id": districts_map_id,
+                "districts_map_filename": districts_map_filename,
+                "districts_map_file_id": None,
+                "districts_map_bytes": districts_map_bytes,
+                "variants": variants or {},
+            }
+        )
+
+    def with_file_id(self, file_id: str, chat_id: int | None = None) -> "DistrictsMapView":
+        """
+        Получить снимок с установленным идентификатором файла карты в telegram
+
+        Если задан `chat_id`, идентификатор устанавливается варианту карты команды
+        """
+        if chat_id is None:
+            return self.model_copy(
+                update={"districts_map_file_id": file_id, "districts_map_bytes": None}
+            )
+        variant = self.variants[chat_id].model_copy(update={"file_id": file_id, "map_bytes": None})
+        return self.model_copy(update={"variants": self.variants | {chat_id: variant}})
+
+    def file_id_for(self, chat_id: int) -> str | None:
+        """Id файла карты, которая отправляется в чат"""
+        if chat_id in self.variants:
+            return self.variants[chat_id].file_id
+        return self.districts_map_file_id
+
+    def districts_map_for(self, chat_id: int) -> bytes | str:
+        """Идентификатор файла или байты карты для отправки в чат: вариант команды или общая карта"""
+        if chat_id in self.variants:
+            return self.variants[chat_id].districts_map
+        return self.districts_map
+
+    @property
+    def districts_map(self) -> bytes | str:
+        """Идентификатор файла или байты карты для отправки в telegram"""
+        if self.districts_map_file_id:
+            return self.districts_map_file_id
+        if self.districts_map_bytes is None:
+            raise DistrictsMapFileWasNotFoundInMinioError
+        return self.districts_map_bytes
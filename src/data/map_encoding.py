@@ -0,0 +1,128 @@
+import io
+import time
+from typing import TYPE_CHECKING, Any
+
+from src.data.config import MapEncoding
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+ENCODING_FORMATS: dict[str, tuple[str, str]] = {
+    "png": ("png", "image/png"),
+    "png_tuned": ("png", "image/png"),
+    "palette": ("png", "image/png"),
+    "webp": ("webp", "image/webp"),
+    "jpeg": ("jpg", "image/jpeg"),
+}
+"""Расширение файла и тип содержимого по режиму кодирования"""
+
+
+def encode_map(image: "Image.Image", encoding: MapEncoding, colors: list[str]) -> bytes:
+    """
+    Закодировать карту райончиков в заданном режиме, выполняется в пуле потоков
+
+    `colors` - известные цвета карты, в режиме `palette` они попадают в палитру как есть,
+    остальная палитра подбирается по изображению и покрывает подложку и сглаживание границ
+    """
+    image_bio = io.BytesIO()
+    if encoding.mode == "png":
+        image.save(image_bio, format="PNG")
+    elif encoding.mode == "png_tuned":
+        image.save(
+            image_bio,
+            format="PNG",
+            compress_level=encoding.compress_level,
+            optimize=encoding.optimize,
+        )
+    elif encoding.mode == "palette":
+        quantized = _quantize(image, colors, encoding.palette_colors)
+        quantized.save(
+            image_bio,
+            format="PNG",
+            compress_level=encoding.compress_level,
+            optimize=encoding.optimize,
+        )
+        quantized.close()
+    elif encoding.mode == "webp":
+        image.save(image_bio, format="WEBP", quality=encoding.quality, method=encoding.webp_method)
+    else:
+        rgb_image = image.convert("RGB")
+        rgb_image.save(image_bio, format="JPEG", quality=encoding.quality, optimize=True)
+        rgb_image.close()
+    return image_bio.getvalue()
+
+
+def _quantize(image: "Image.Image", colors: list[str], palette_colors: int) -> "Image.Image":
+    """Перевести карту в палитру из известных цветов и цветов, подобранных по изображению"""
+    from PIL import Image, ImageColor
+
+    if image.mode == "RGBA" and image.getextrema()[3][0] < 255:
+        return image.quantize(palette_colors, method=Image.Quantize.FASTOCTREE)
+
+    rgb_image = image.convert("RGB")
+    known_colors = list(dict.fromkeys(ImageColor.getrgb(color)[:3] for color in colors))
+    known_colors = known_colors[: palette_colors - 1]
+    adaptive = rgb_image.quantize(
+        palette_colors - len(known_colors), method=Image.Quantize.FASTOCTREE
+    )
+    adaptive_palette = (adaptive.getpalette() or [])[: 3 * (palette_colors - len(known_colors))]
+    adaptive.close()
+
+    palette_image = Image.new("P", (1, 1))
+    palette_image.putpalette(
+        [channel for color in known_colors for channel in color] + adaptive_palette
+    )
+    quantized = rgb_image.quantize(palette=palette_image, dither=Image.Dither.NONE)
+    palette_image.close()
+    rgb_image.close()
+    return quantized
+
+
+class EncodingMeasurement:
+    """Замер кодирования карты райончиков в одном режиме"""
+
+    def __init__(self, mode: str, durations: list[float], size: int) -> None:
+        self.mode = mode
+        self.durations = durations
+        self.size = size
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "min": min(self.durations),
+            "median": sorted(self.durations)[len(self.durations) // 2],
+            "bytes": self.size,
+        }
+
+
+def measure_encodings(
+    image: "Image.Image", encoding: MapEncoding, colors: list[str], repeats: int = 3
+) -> list[EncodingMeasurement]:
+    """Замерить время и размер кодирования карты во всех режимах с настройками `encoding`"""
+    measurements = []
+    for mode in ENCODING_FORMATS:
+        mode_encoding = encoding.model_copy(update={"mode": mode})
+        durations = []
+        size = 0
+        for _ in range(repeats):
+            start = time.perf_counter()
+            size = len(encode_map(image, mode_encoding, colors))
+            durations.append(time.perf_counter() - start)
+        measurements.append(EncodingMeasurement(mode, durations, size))
+    return measurements
+
+
+def format_measurements(measurements: list[EncodingMeasurement]) -> str:
+    """Замеры кодирования в виде таблицы, размер относительно PNG по умолчанию"""
+    baseline = next(
+        (measurement.size for measurement in measurements if measurement.mode == "png"), 0
+    )
+    lines = [f"{'mode':<12} {'min ms':>9} {'median ms':>10} {'bytes':>10} {'vs png':>7}"]
+    for measurement in measurements:
+        stats = measurement.to_dict()
+        ratio = f"{stats['bytes'] / baseline:.2f}" if baseline else "-"
+        lines.append(
+            f"{stats['mode']:<12} {stats['min'] * 1000:>9.1f} {stats['median'] * 1000:>10.1f} "
+            f"{stats['bytes']:>10} {ratio:>7}"
+        )
+    return "\n".join(lines)
@@ -1,4 +1,7 @@
 import asyncio
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
 from io import BytesIO
 from typing import Literal
 
@@ -7,6 +10,9 @@ from loguru import logger
 from minio import Minio, S3Error
 from urllib3 import BaseHTTPResponse
 
+from src.observability.metrics import STORAGE_BYTES, STORAGE_DURATION, STORAGE_ERRORS
+from src.observability.tracing import TRACER
+
 
 class MinIOClient:
     """Обёртка для удобного асинхронного взаимодействия с MINIO"""
@@ -24,6 +30,24 @@ class MinIOClient:
         )
         self._semaphore = asyncio.Semaphore(50)
 
+    @staticmethod
+    @contextmanager
+    def _measure(operation: str, filename: str) -> Iterator[None]:
+        """Замерить длительность операции с MinIO и учесть ошибки"""
+        start = time.perf_counter()
+        try:
+            with TRACER.span(f"minio {operation}", filename=filename):
+                yield
+        except S3Error as e:
+            if e.code != "NoSuchKey":
+                STORAGE_ERRORS.inc(operation)
+            raise
+        except Exception:
+            STORAGE_ERRORS.inc(operation)
+            raise
+        finally:
+            STORAGE_DURATION.observe(time.perf_counter() - start, operation)
+
     async def _put_object(
         self, bucket: str, filename: str, bio: BytesIO, content_type: str
     ) -> None:
@@ -47,7 +71,9 @@ class MinIOClient:
         """
         async with self._semaphore:
             logger.info(f"Uploading {filename} to MinIO into bukcket {bucket}")
-            await self._put_object(bucket, filename, bio, content_type)
+            with self._measure("upload", filename):
+                await self._put_object(bucket, filename, bio, content_type)
+            STORAGE_BYTES.inc("upload", amount=bio.getbuffer().nbytes)
         logger.success(f"Done uploading {filename} to MinIO into bukcket {bucket}")
 
     async def upload_with_guessed_content_type(
@@ -72,9 +98,13 @@ class MinIOClient:
             return self._client.get_object(bucket, filename)
 
         try:
-            response = await asyncio.get_event_loop().run_in_executor(None, _get_object)
+            with self._measure("download", filename):
+                response = await asyncio.get_event_loop().run_in_executor(None, _get_object)
+                file_bytes = BytesIO(
+                    await asyncio.get_event_loop().run_in_executor(None, response.read)
+                )
             logger.success(f"Done downloading {filename} from MinIO {bucket}")
-            file_bytes = BytesIO(response.read())
+            STORAGE_BYTES.inc("download", amount=file_bytes.getbuffer().nbytes)
             content_type = response.getheader("content-type")
         except S3Error as e:
             if e.code == "NoSuchKey":
@@ -89,6 +119,25 @@ class MinIOClient:
 
         return file_bytes, content_type
 
+    async def stat(self, bucket: str, filename: str) -> str | None:
+        """
+        Асинхронное получение версии файла в бакете: ETag и размер
+
+        Версия меняется при изменении содержимого файла, None - файла нет в бакете
+        """
+
+        def _stat_object() -> str:
+            stat = self._client.stat_object(bucket, filename)
+            return f"{stat.etag}:{stat.size}"
+
+        try:
+            with self._measure("stat", filename):
+                return await asyncio.get_event_loop().run_in_executor(None, _stat_object)
+        except S3Error as e:
+            if e.code == "NoSuchKey":
+                return None
+            raise
+
     async def create_bucket_and_check_if_empty(self, bucket: str) -> bool:
         """Асинхронное создание бакета если его не существует и получение булевой переменной о наличии в нём файлов"""
         logger.info(f"Creating MinIO bucket {bucket}")
@@ -102,4 +151,5 @@ class MinIOClient:
                 return False
             return True
 
-        return await asyncio.get_event_loop().run_in_executor(None, _create_bucket)
+        with self._measure("create_bucket", bucket):
+            return await asyncio.get_event_loop().run_in_executor(None, _create_bucket)
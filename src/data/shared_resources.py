@@ -0,0 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from src.data.config import Config
+from src.data.minio_client import MinIOClient
+from src.observability.metrics import DB_POOL_CHECKED_OUT
+
+
+class SharedResources:
+    """
+    Ресурсы процесса, общие для всех игр: пул соединений с БД, клиент MinIO и пул потоков
+    отрисовки карт
+
+    Параметры подключения берутся из конфига первой игры, таблицы каждой игры находятся
+    в её схеме БД и подставляются через `schema_translate_map`, файлы - в её бакете
+    """
+
+    RENDER_WORKERS = 2
+    """Количество потоков отрисовки и кодирования карт"""
+
+    def __init__(self, config: Config, minio: MinIOClient | None = None) -> None:
+        self.db_address = (
+            f"{config.pg_user}:{config.pg_password}@{config.pg_host}:{config.pg_port}/postgres"
+        )
+        self.db_engine = create_async_engine(
+            f"postgresql+asyncpg://{self.db_address}",
+            echo=False,
+            pool_size=10,
+            max_overflow=2,
+            pool_recycle=300,
+            pool_pre_ping=True,
+            pool_use_lifo=True,
+        )
+        DB_POOL_CHECKED_OUT.set_function(self.db_engine.pool.checkedout)  # type: ignore
+        self.minio = minio or MinIOClient(
+            config.minio_root_user,
+            config.minio_root_password,
+            config.minio_secure,
+            config.minio_host,
+        )
+        self.render_executor = ThreadPoolExecutor(self.RENDER_WORKERS, thread_name_prefix="render")
+
+    def game_db_engine(self, config: Config) -> AsyncEngine:
+        """Движок БД игры, разделяющий общий пул соединений"""
+        if not config.pg_schema:
+            return self.db_engine
+        return self.db_engine.execution_options(schema_translate_map={None: config.pg_schema})
+
+    async def close(self) -> None:
+        """Закрыть соединения с БД и дождаться завершения отрисовок"""
+        logger.info("Closing shared resources")
+        await self.db_engine.dispose()
+        self.render_executor.shutdown(wait=True)
@@ -0,0 +1,249 @@
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+from pytz import timezone
+from sqlalchemy import Table
+from sqlalchemy.schema import CreateSchema
+
+from src.data.config import Config
+from src.data.db_model import DbModel, DistrictsMap, DistrictsMapVariant
+from src.data.shared_resources import SharedResources
+from src.exceptions.snapshot import (
+    SnapshotAssetsWereNotFoundError,
+    SnapshotVersionIsNotSupportedError,
+)
+
+SNAPSHOT_VERSION = 1
+"""Версия формата снимка состояния игры"""
+
+MANIFEST_FILENAME = "manifest.json"
+"""Описание снимка: версия, таблицы и хэши файлов"""
+
+TABLES_DIR = "tables"
+"""Каталог архива с таблицами в двоичном формате COPY"""
+
+ASSETS_DIR = "assets"
+"""Каталог архива с файлами последней карты райончиков"""
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _qualified_name(table: Table, schema: str | None) -> str:
+    """Имя таблицы со схемой игры для запросов в обход SQLAlchemy"""
+    return f'"{schema}"."{table.name}"' if schema else f'"{table.name}"'
+
+
+async def export_snapshot(config: Config, resources: SharedResources, path: Path) -> dict[str, Any]:
+    """
+    Записать снимок состояния игры в архив
+
+    Таблицы выгружаются в двоичном формате COPY в одной транзакции `REPEATABLE READ`,
+    поэтому владение, история и карты согласованы между собой. Исходники карты не
+    вкладываются в архив, а записываются хэшами содержимого, файлы последней карты и её
+    вариантов вкладываются, так как их нет среди исходников. Возвращает описание снимка
+    """
+    manifest: dict[str, Any] = {
+        "version": SNAPSHOT_VERSION,
+        "game": config.game,
+        "created": datetime.now(tz=timezone("Europe/Moscow")).isoformat(),
+        "tables": {},
+        "assets": {},
+        "embedded_assets": [],
+    }
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        async with resources.db_engine.connect() as conn:
+            driver = (await conn.get_raw_connection()).driver_connection
+            async with driver.transaction(isolation="repeatable_read", readonly=True):
+                for table in DbModel.metadata.sorted_tables:
+                    columns = [column.name for column in table.columns]
+                    with archive.open(f"{TABLES_DIR}/{table.name}.copy", "w") as stream:
+
+                        async def write(data: bytes, stream: io.BufferedIOBase = stream) -> None:
+                            stream.write(data)
+
+                        status = await driver.copy_from_table(
+                            table.name,
+                            schema_name=config.pg_schema,
+                            columns=columns,
+                            output=write,
+                            format="binary",
+                        )
+                    manifest["tables"][table.name] = {
+                        "columns": columns,
+                        "rows": int(status.split()[-1]),
+                    }
+                embedded_filenames = await _latest_map_filenames(driver, config.pg_schema)
+
+        static_filenames = [
+            config.districts_map.backing_filename,
+            config.districts_map.text_filename,
+            *(district.mask_filename for district in config.districts_map.default_districts),
+        ]
+        for filename in dict.fromkeys([*static_filenames, *embedded_filenames]):
+            bio, _ = await resources.minio.download(config.minio_bucket, filename)
+            if not bio:
+                raise SnapshotAssetsWereNotFoundError([filename])
+            manifest["assets"][filename] = _sha256(bio.getvalue())
+            if filename in embedded_filenames:
+                archive.writestr(f"{ASSETS_DIR}/{filename}", bio.getvalue())
+                manifest["embedded_assets"].append(filename)
+
+        archive.writestr(MANIFEST_FILENAME, json.dumps(manifest, ensure_ascii=False, indent=2))
+    logger.success(f"Done exporting snapshot of game {config.game} to {path}")
+    return manifest
+
+
+async def _latest_map_filenames(driver: Any, schema: str | None) -> list[str]:
+    """Файлы последней карты райончиков и её вариантов"""
+    districts_maps = _qualified_name(DistrictsMap.__table__, schema)  # type: ignore
+    variants = _qualified_name(DistrictsMapVariant.__table__, schema)  # type: ignore
+    districts_map = await driver.fetchrow(
+        f"SELECT id, filename FROM {districts_maps} ORDER BY timestamp DESC LIMIT 1"
+    )
+    if not districts_map:
+        return []
+    variant_rows = await driver.fetch(
+        f"SELECT filename FROM {variants} WHERE districts_map_id = $1",
+        districts_map["id"],
+    )
+    return [districts_map["filename"], *(row["filename"] for row in variant_rows)]
+
+
+async def restore_snapshot(
+    config: Config, resources: SharedResources, path: Path, data_dir: Path = Path("data")
+) -> dict[str, Any]:
+    """
+    Восстановить состояние игры из снимка, игра на время восстановления должна быть остановлена
+
+    Сначала проверяются файлы: файл в бакете с другим хэшем или без файла заменяется
+    вложенным в архив или исходником из `data_dir` с тем же хэшем, если подходящего файла
+    нет, БД не изменяется. Затем в одной транзакции таблицы очищаются, загружаются через
+    COPY и счётчики идентификаторов выставляются по загруженным строкам, поэтому повторное
+    восстановление того же снимка даёт то же состояние. Возвращает описание снимка
+    """
+    with zipfile.ZipFile(path) as archive:
+        manifest = json.loads(archive.read(MANIFEST_FILENAME))
+        if manifest.get("version") != SNAPSHOT_VERSION:
+            raise SnapshotVersionIsNotSupportedError(manifest.get("version"))
+
+        await _restore_assets(config, resources, archive, manifest, data_dir)
+
+        engine = resources.game_db_engine(config)
+        async with engine.begin() as conn:
+            if config.pg_schema:
+                await conn.execute(CreateSchema(config.pg_schema, if_not_exists=True))
+            await conn.run_sync(DbModel.metadata.create_all)
+
+        tables = [
+            table for table in DbModel.metadata.sorted_tables if table.name in manifest["tables"]
+        ]
+        async with resources.db_engine.connect() as conn:
+            driver = (await conn.get_raw_connection()).driver_connection
+            async with driver.transaction():
+                await driver.execute(
+                    "TRUNCATE "
+                    + ", ".join(_qualified_name(table, config.pg_schema) for table in tables)
+                )
+                for table in tables:
+                    with archive.open(f"{TABLES_DIR}/{table.name}.copy") as stream:
+                        await driver.copy_to_table(
+                            table.name,
+                            source=stream,
+                            schema_name=config.pg_schema,
+                            columns=manifest["tables"][table.name]["columns"],
+                            format="binary",
+                        )
+                    if "id" in table.columns:
+                        qualified_name = _qualified_name(table, config.pg_schema)
+                        await driver.execute(
+                            "SELECT setval(pg_get_serial_sequence($1, 'id'), "
+                            f"coalesce(max(id), 1), max(id) IS NOT NULL) FROM {qualified_name}",
+                            qualified_name,
+                        )
+    logger.success(f"Done restoring game {config.game} from snapshot {path}")
+    return manifest
+
+
+async def _restore_assets(
+    config: Config,
+    resources: SharedResources,
+    archive: zipfile.ZipFile,
+    manifest: dict[str, Any],
+    data_dir: Path,
+) -> None:
+    """Проверить файлы снимка в бакете игры и загрузить недостающие"""
+    await resources.minio.create_bucket_and_check_if_empty(config.minio_bucket)
+    missing = []
+    for filename, digest in manifest["assets"].items():
+        bio, _ = await resources.minio.download(config.minio_bucket, filename)
+        if bio and _sha256(bio.getvalue()) == digest:
+            continue
+        if filename in manifest["embedded_assets"]:
+            asset = archive.read(f"{ASSETS_DIR}/{filename}")
+        elif (data_dir / filename).is_file():
+            asset = (data_dir / filename).read_bytes()
+        else:
+            asset = None
+        if asset is None or _sha256(asset) != digest:
+            missing.append(filename)
+            continue
+        await resources.minio.upload_with_guessed_content_type(
+            config.minio_bucket, filename, io.BytesIO(asset)
+        )
+    if missing:
+        raise SnapshotAssetsWereNotFoundError(missing)
+
+
+def describe_snapshot(manifest: dict[str, Any]) -> str:
+    """Краткое описание снимка для вывода"""
+    tables = ", ".join(f"{name} {table['rows']}" for name, table in manifest["tables"].items())
+    return (
+        f"Snapshot v{manifest['version']} of game {manifest['game']} "
+        f"created {manifest['created']}: {tables}; "
+        f"{len(manifest['assets'])} assets, {len(manifest['embedded_assets'])} embedded"
+    )
+
+
+async def _main(args: argparse.Namespace) -> None:
+    from src.data.config import create_config, parse_game_config
+
+    if args.game_config:
+        from dotenv import find_dotenv, load_dotenv
+
+        load_dotenv(find_dotenv())
+        config = parse_game_config(args.game_config, args.game_config.read_bytes())
+    else:
+        config = create_config()
+    resources = SharedResources(config)
+    try:
+        if args.command == "export":
+            manifest = await export_snapshot(config, resources, args.path)
+        else:
+            manifest = await restore_snapshot(config, resources, args.path, args.data)
+    finally:
+        await resources.close()
+    print(describe_snapshot(manifest))  # noqa: T201
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m src.data.snapshot",
+        description="Снимок состояния игры: владение, история, карты и id файлов в telegram",
+    )
+    parser.add_argument("command", choices=["export", "restore"], help="выгрузить или восстановить")
+    parser.add_argument("path", type=Path, help="файл снимка")
+    parser.add_argument(
+        "--game-config", type=Path, default=None, help="конфиг игры из каталога нескольких игр"
+    )
+    parser.add_argument("--data", type=Path, default=Path("data"), help="исходники карты")
+    asyncio.run(_main(parser.parse_args()))
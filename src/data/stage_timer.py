@@ -0,0 +1,43 @@
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from src.exceptions.stage import StageFailedError
+from src.observability.metrics import Histogram
+from src.observability.tracing import TRACER
+
+
+class StageTimer:
+    """Замер длительности последовательных этапов обработки"""
+
+    def __init__(self, histogram: Histogram | None = None) -> None:
+        self.stage_durations: dict[str, float] = {}
+        self._histogram = histogram
+
+    def _finish_stage(self, name: str, stage_start: float) -> None:
+        self.stage_durations[name] = time.perf_counter() - stage_start
+        if self._histogram:
+            self._histogram.observe(self.stage_durations[name], name)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Замерить этап, ошибка этапа оборачивается в `StageFailedError` с уже собранными замерами"""
+        stage_start = time.perf_counter()
+        try:
+            with TRACER.span(f"stage {name}"):
+                yield
+        except Exception as e:
+            self._finish_stage(name, stage_start)
+            raise StageFailedError(name, self.stage_durations) from e
+        self._finish_stage(name, stage_start)
+
+    def format(self) -> str:
+        """Длительности этапов в читаемом виде"""
+        return format_stage_durations(self.stage_durations)
+
+
+def format_stage_durations(stage_durations: dict[str, float]) -> str:
+    """Длительности этапов в читаемом виде"""
+    return ", ".join(
+        f"{name} {duration * 1000:.0f}ms" for name, duration in stage_durations.items()
+    )
@@ -0,0 +1,321 @@
+import hashlib
+import io
+from typing import TYPE_CHECKING
+
+from src.data.config import MapEncoding
+from src.data.map_encoding import encode_map
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+MASK_OPACITY = 0.83
+"""Непрозрачность цвета владельца поверх подложки карты"""
+
+FULL_MAP_COMPRESS_LEVEL = 1
+"""Уровень сжатия PNG полноразмерной карты и областей: файл большой, важнее скорость кодирования"""
+
+tile_position = tuple[int, int]
+"""Колонка и строка плитки"""
+
+box = tuple[int, int, int, int]
+"""Прямоугольник: левая, верхняя, правая и нижняя границы в пикселях"""
+
+
+def _intersection(first: box, second: box) -> box | None:
+    left, top = max(first[0], second[0]), max(first[1], second[1])
+    right, bottom = min(first[2], second[2]), min(first[3], second[3])
+    if left >= right or top >= bottom:
+        return None
+    return left, top, right, bottom
+
+
+class TiledMapSources:
+    """
+    Декодированные исходники карты высокого разрешения
+
+    Подложка и подписи хранятся целиком, маски райончиков - обрезанными по своим границам,
+    поэтому плитка отрисовывается только из масок райончиков, которые её пересекают.
+    Исходники декодируются один раз и переиспользуются, пока не изменится содержимое
+    файлов исходников
+    """
+
+    def __init__(
+        self,
+        key: str,
+        backing: "Image.Image",
+        text: "Image.Image",
+        masks: list[tuple[box, "Image.Image"]],
+        tile_size: int,
+    ) -> None:
+        self.key = key
+        self.backing = backing
+        self.text = text
+        self.masks = masks
+        self.tile_size = tile_size
+        self.size = backing.size
+        self.tile_boxes: dict[tile_position, box] = {}
+        self.tile_districts: dict[tile_position, list[int]] = {}
+        for row in range(0, self.size[1], tile_size):
+            for col in range(0, self.size[0], tile_size):
+                position = (col // tile_size, row // tile_size)
+                tile_box = (
+                    col,
+                    row,
+                    min(col + tile_size, self.size[0]),
+                    min(row + tile_size, self.size[1]),
+                )
+                self.tile_boxes[position] = tile_box
+                self.tile_districts[position] = [
+                    idx
+                    for idx, (mask_box, _) in enumerate(masks)
+                    if _intersection(tile_box, mask_box)
+                ]
+
+    @staticmethod
+    def create_key(filenames: list[str], versions: list[str], tile_size: int) -> str:
+        """
+        Ключ исходников по названиям и версиям файлов и размеру плитки
+
+        Версия - ETag и размер файла в хранилище, поэтому замена файла исходника под тем же
+        названием меняет ключ исходников и ключи всех плиток
+        """
+        return hashlib.sha256(
+            "\n".join(
+                [
+                    *(
+                        f"{filename}:{version}"
+                        for filename, version in zip(filenames, versions, strict=True)
+                    ),
+                    str(tile_size),
+                ]
+            ).encode()
+        ).hexdigest()
+
+    def tile_key(self, position: tile_position, colors: list[str]) -> str:
+        """Ключ содержимого плитки: исходники, положение и цвета пересекающих её райончиков"""
+        digest = hashlib.sha256(f"{self.key}:{position}".encode())
+        for idx in self.tile_districts[position]:
+            digest.update(f":{idx}={colors[idx]}".encode())
+        return digest.hexdigest()[:32]
+
+    def close(self) -> None:
+        self.backing.close()
+        self.text.close()
+        for _, mask in self.masks:
+            mask.close()
+
+
+class FullMapCanvas:
+    """
+    Полноразмерная карта высокого разрешения в памяти, собранная из плиток
+
+    Между обновлениями карты декодируются и вставляются только плитки, ключ которых изменился,
+    поэтому после смены владельца райончика не декодируется вся карта. Кодируется карта
+    по-прежнему целиком. Цена - несжатая карта в памяти процесса, 4 байта на пиксель.
+    Обновляется в пуле потоков не более чем одной отрисовкой карты одновременно
+    """
+
+    def __init__(self, key: str, size: tuple[int, int], tile_size: int) -> None:
+        self.key = key
+        self.size = size
+        self.tile_size = tile_size
+        self._image: Image.Image | None = None
+        self._tile_keys: dict[tile_position, str] = {}
+
+    def update(self, tiles: dict[tile_position, tuple[str, bytes]]) -> bytes:
+        """
+        Вставить плитки с изменившимися ключами и закодировать карту, выполняется в пуле потоков
+
+        `tiles` - ключ и PNG каждой плитки карты
+        """
+        from PIL import Image
+
+        if self._image is None:
+            self._image = Image.new("RGBA", self.size)
+        for (col, row), (tile_key, tile) in tiles.items():
+            if self._tile_keys.get((col, row)) == tile_key:
+                continue
+            with Image.open(io.BytesIO(tile)) as tile_image:
+                self._image.paste(tile_image, (col * self.tile_size, row * self.tile_size))
+            self._tile_keys[(col, row)] = tile_key
+        image_bio = io.BytesIO()
+        self._image.save(image_bio, format="PNG", compress_level=FULL_MAP_COMPRESS_LEVEL)
+        return image_bio.getvalue()
+
+    def close(self) -> None:
+        if self._image:
+            self._image.close()
+            self._image = None
+        self._tile_keys = {}
+
+
+def decode_sources(
+    key: str,
+    backing: bytes,
+    text: bytes,
+    masks: list[bytes],
+    tile_size: int,
+    max_size: int | None = None,
+) -> TiledMapSources:
+    """
+    Декодировать исходники карты, выполняется в пуле потоков
+
+    Если задан `max_size`, исходники уменьшаются так, чтобы большая сторона не превышала его
+    """
+    from PIL import Image
+
+    backing_image = Image.open(io.BytesIO(backing)).convert("RGBA")
+    if max_size and max(backing_image.size) > max_size:
+        scale = max_size / max(backing_image.size)
+        backing_image = backing_image.resize(
+            (
+                max(round(backing_image.width * scale), 1),
+                max(round(backing_image.height * scale), 1),
+            ),
+            Image.Resampling.LANCZOS,
+        )
+    text_image = Image.open(io.BytesIO(text)).convert("RGBA")
+    if text_image.size != backing_image.size:
+        text_image = text_image.resize(backing_image.size, Image.Resampling.LANCZOS)
+    mask_images = []
+    for mask in masks:
+        mask_image = Image.open(io.BytesIO(mask)).convert("L")
+        if mask_image.size != backing_image.size:
+            mask_image = mask_image.resize(backing_image.size)
+        mask_box = mask_image.getbbox() or (0, 0, 0, 0)
+        mask_images.append((mask_box, mask_image.crop(mask_box)))
+        mask_image.close()
+    return TiledMapSources(key, backing_image, text_image, mask_images, tile_size)
+
+
+def render_tile(
+    sources: TiledMapSources, position: tile_position, colors: list[str], thumbnail_scale: float
+) -> tuple[bytes, "Image.Image"]:
+    """
+    Отрисовать и закодировать плитку карты, выполняется в пуле потоков
+
+    Возвращает PNG плитки и её уменьшенную копию для обзорной карты
+    """
+    tile_box = sources.tile_boxes[position]
+    tile = render_area(sources, tile_box, sources.tile_districts[position], colors)
+
+    tile_bio = io.BytesIO()
+    tile.save(tile_bio, format="PNG")
+    thumbnail = _thumbnail(tile, tile_box, thumbnail_scale)
+    tile.close()
+    return tile_bio.getvalue(), thumbnail
+
+
+def render_area(
+    sources: TiledMapSources, area_box: box, districts: list[int], colors: list[str]
+) -> "Image.Image":
+    """
+    Отрисовать прямоугольник карты с подписями из исходников
+
+    `districts` - номера райончиков, маски которых могут пересекать прямоугольник
+    """
+    from PIL import Image
+
+    image = sources.backing.crop(area_box)
+    for idx in districts:
+        mask_box, mask = sources.masks[idx]
+        area = _intersection(area_box, mask_box)
+        if not area:
+            continue
+        mask_area = mask.crop(
+            (
+                area[0] - mask_box[0],
+                area[1] - mask_box[1],
+                area[2] - mask_box[0],
+                area[3] - mask_box[1],
+            )
+        )
+        mask_evaled = Image.eval(mask_area, lambda x: x * MASK_OPACITY)
+        image_area_box = (
+            area[0] - area_box[0],
+            area[1] - area_box[1],
+            area[2] - area_box[0],
+            area[3] - area_box[1],
+        )
+        color_fill = Image.new("RGBA", mask_area.size, colors[idx])
+        image_area = Image.composite(color_fill, image.crop(image_area_box), mask_evaled)
+        image.paste(image_area, image_area_box[:2])
+        for part in (mask_area, mask_evaled, color_fill, image_area):
+            part.close()
+
+    text_area = sources.text.crop(area_box)
+    image.alpha_composite(text_area)
+    text_area.close()
+    return image
+
+
+def decode_thumbnail(tile: bytes, tile_box: box, thumbnail_scale: float) -> "Image.Image":
+    """Уменьшенная копия плитки, загруженной из хранилища, выполняется в пуле потоков"""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(tile)) as tile_image:
+        return _thumbnail(tile_image, tile_box, thumbnail_scale)
+
+
+def _thumbnail(tile: "Image.Image", tile_box: box, thumbnail_scale: float) -> "Image.Image":
+    """Уменьшенная копия плитки, размер считается от границ, чтобы соседние копии не расходились"""
+    from PIL import Image
+
+    left, top, right, bottom = (round(bound * thumbnail_scale) for bound in tile_box)
+    return tile.resize((max(right - left, 1), max(bottom - top, 1)), Image.Resampling.LANCZOS)
+
+
+def thumbnail_scale(size: tuple[int, int], overview_size: int) -> float:
+    """Масштаб обзорной карты, её большая сторона не превышает `overview_size`"""
+    return min(overview_size / max(size), 1.0)
+
+
+def render_overview(
+    size: tuple[int, int],
+    tile_size: int,
+    thumbnails: dict[tile_position, "Image.Image"],
+    scale: float,
+    encoding: MapEncoding,
+    colors: list[str],
+) -> bytes:
+    """Собрать и закодировать обзорную карту из уменьшенных плиток, выполняется в пуле потоков"""
+    from PIL import Image
+
+    overview = Image.new("RGBA", (round(size[0] * scale), round(size[1] * scale)))
+    for (col, row), thumbnail in thumbnails.items():
+        overview.paste(thumbnail, (round(col * tile_size * scale), round(row * tile_size * scale)))
+    overview_bytes = encode_map(overview, encoding, colors)
+    overview.close()
+    return overview_bytes
+
+
+def assemble_area(area: box, tile_size: int, tiles: dict[tile_position, bytes]) -> bytes:
+    """
+    Собрать область карты из закодированных плиток, выполняется в пуле потоков
+
+    Декодируются только плитки, пересекающие область
+    """
+    from PIL import Image
+
+    image = Image.new("RGBA", (area[2] - area[0], area[3] - area[1]))
+    for (col, row), tile in tiles.items():
+        tile_box = (col * tile_size, row * tile_size, (col + 1) * tile_size, (row + 1) * tile_size)
+        if not _intersection(area, tile_box):
+            continue
+        with Image.open(io.BytesIO(tile)) as tile_image:
+            image.paste(tile_image, (tile_box[0] - area[0], tile_box[1] - area[1]))
+    image_bio = io.BytesIO()
+    image.save(image_bio, format="PNG", compress_level=FULL_MAP_COMPRESS_LEVEL)
+    image.close()
+    return image_bio.getvalue()
+
+
+def tiles_in_area(area: box, tile_size: int, positions: list[tile_position]) -> list[tile_position]:
+    """Плитки, пересекающие область"""
+    return [
+        (col, row)
+        for col, row in positions
+        if _intersection(
+            area, (col * tile_size, row * tile_size, (col + 1) * tile_size, (row + 1) * tile_size)
+        )
+    ]
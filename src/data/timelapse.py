@@ -0,0 +1,126 @@
+import zipfile
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Literal
+
+from src.data.tiled_map import TiledMapSources, render_area
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+timelapse_format = Literal["gif", "frames"]
+
+TIMELAPSE_SIZE = 1024
+"""Большая сторона кадра таймлапса в пикселях"""
+
+FRAME_DURATION = 400
+"""Длительность кадра таймлапса в миллисекундах"""
+
+LAST_FRAME_DURATION = 3000
+"""Длительность последнего кадра таймлапса в миллисекундах"""
+
+FRAME_JPEG_QUALITY = 90
+"""Качество JPEG кадров в архиве кадров"""
+
+
+class TimelapseWriter:
+    """
+    Запись таймлапса владения райончиками в файл по мере применения изменений
+
+    В памяти хранится только текущий кадр: изменение владения перерисовывает из исходников
+    прямоугольник маски изменившегося райончика. В формате `gif` в файл пишется только
+    изменившийся прямоугольник кадра со своей палитрой, в формате `frames` - архив JPEG кадров
+    для сборки видео, например `ffmpeg -framerate 3 -i frame_%06d.jpg timelapse.mp4`. Методы выполняются в пуле потоков
+    """
+
+    def __init__(
+        self, path: Path, sources: TiledMapSources, colors: list[str], fmt: timelapse_format
+    ) -> None:
+        self._sources = sources
+        self._colors = list(colors)
+        self._format = fmt
+        self._frame = render_area(sources, (0, 0, *sources.size), list(range(len(colors))), colors)
+        self._stream: BinaryIO = path.open("wb")
+        self._archive = zipfile.ZipFile(self._stream, "w") if fmt == "frames" else None
+        self._pending: tuple[Image.Image, tuple[int, int]] | None = None
+        self._header_written = False
+        self.frames = 0
+        self._add_frame((0, 0, *sources.size))
+
+    def apply(self, changes: list[tuple[int, str]]) -> None:
+        """Применить изменения владения (номер райончика, цвет) и записать кадр"""
+        changed_box: tuple[int, int, int, int] | None = None
+        for idx, color in changes:
+            if self._colors[idx] == color:
+                continue
+            self._colors[idx] = color
+            mask_box = self._sources.masks[idx][0]
+            if mask_box[0] >= mask_box[2] or mask_box[1] >= mask_box[3]:
+                continue
+            area = render_area(self._sources, mask_box, self._districts_in(mask_box), self._colors)
+            self._frame.paste(area, mask_box[:2])
+            area.close()
+            changed_box = _union(changed_box, mask_box) if changed_box else mask_box
+        if changed_box:
+            self._add_frame(changed_box)
+
+    def _districts_in(self, area_box: tuple[int, int, int, int]) -> list[int]:
+        return [
+            idx
+            for idx, (mask_box, _) in enumerate(self._sources.masks)
+            if mask_box[0] < area_box[2]
+            and area_box[0] < mask_box[2]
+            and mask_box[1] < area_box[3]
+            and area_box[1] < mask_box[3]
+        ]
+
+    def _add_frame(self, changed_box: tuple[int, int, int, int]) -> None:
+        self.frames += 1
+        if self._archive:
+            frame = self._frame.convert("RGB")
+            with self._archive.open(f"frame_{self.frames:06d}.jpg", "w") as frame_stream:
+                frame.save(frame_stream, format="JPEG", quality=FRAME_JPEG_QUALITY)
+            frame.close()
+            return
+        self._write_pending(FRAME_DURATION)
+        changed = self._frame.crop(changed_box).convert("RGB")
+        self._pending = (changed.quantize(256), changed_box[:2])
+        changed.close()
+
+    def _write_pending(self, duration: int) -> None:
+        """Записать предыдущий кадр gif, когда известна его длительность"""
+        from PIL import GifImagePlugin
+
+        if not self._pending:
+            return
+        frame, offset = self._pending
+        if not self._header_written:
+            header, _ = GifImagePlugin.getheader(frame, info={"loop": 0})
+            self._stream.write(b"".join(header))
+            self._header_written = True
+        for data in GifImagePlugin.getdata(
+            frame, offset, duration=duration, include_color_table=True
+        ):
+            self._stream.write(data)
+        frame.close()
+        self._pending = None
+
+    def close(self) -> None:
+        """Дописать последний кадр и закрыть файл"""
+        if self._archive:
+            self._archive.close()
+        else:
+            self._write_pending(LAST_FRAME_DURATION)
+            self._stream.write(b";")
+        self._stream.close()
+        self._frame.close()
+
+
+def _union(
+    first: tuple[int, int, int, int], second: tuple[int, int, int, int]
+) -> tuple[int, int, int, int]:
+    return (
+        min(first[0], second[0]),
+        min(first[1], second[1]),
+        max(first[2], second[2]),
+        max(first[3], second[3]),
+    )
@@ -8,3 +8,19 @@ class KeyboardKeyHintMessageNotSetError(Exception):
 
 class KeyboardKeyHintMessagesNotSetError(Exception):
     """Для реакции на нажатие клавиши для клавиатуры на заданы сообщения"""
+
+
+class ConfigTeamOwningDistrictsWasRemovedError(Exception):
+    """В перезагруженном конфиге нет команды, которой принадлежат райончики"""
+
+
+class ConfigDistrictsWereChangedError(Exception):
+    """В перезагруженном конфиге изменились райончики, которые хранятся в БД"""
+
+
+class ConfigWebhookPathIsDuplicatedError(Exception):
+    """Несколько игр одного процесса принимают события вебхука по одному пути"""
+
+
+class ConfigWebhookServerDiffersError(Exception):
+    """Игры одного процесса с вебхуком заданы с разными адресом или портом сервера вебхука"""
@@ -8,3 +8,11 @@ class DistrictsMapFileWasNotFoundInMinioError(Exception):
 
 class DistrictsMapsTableIsEmptyError(Exception):
     """Таблица карт райончиков не пуста"""
+
+
+class DistrictsMapRegionWasNotFoundError(Exception):
+    """Область карты райончиков не найдена в конфиге режима высокого разрешения"""
+
+
+class DistrictWasNotFoundError(Exception):
+    """Райончик не найден в БД"""
@@ -0,0 +1,8 @@
+class LoadStandSchemaIsNotDedicatedError(Exception):
+    """Нагрузочный стенд запускается только на отдельной схеме БД, чтобы не изменять данные игры"""
+
+    def __init__(self, schema: str | None, prefix: str) -> None:
+        super().__init__(
+            f"Load stand requires a dedicated DB schema starting with {prefix!r}, got {schema!r}"
+        )
+        self.schema = schema
@@ -0,0 +1,2 @@
+class ProfilerIsAlreadyRunningError(Exception):
+    """Профилирование уже запущено"""
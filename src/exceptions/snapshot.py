@@ -0,0 +1,14 @@
+class SnapshotVersionIsNotSupportedError(Exception):
+    """Версия снимка состояния игры не поддерживается"""
+
+    def __init__(self, version: int | None) -> None:
+        super().__init__(f"Snapshot version {version} is not supported")
+        self.version = version
+
+
+class SnapshotAssetsWereNotFoundError(Exception):
+    """Файлы, на которые ссылается снимок состояния игры, не найдены или изменились"""
+
+    def __init__(self, filenames: list[str]) -> None:
+        super().__init__(f"Snapshot assets were not found: {', '.join(filenames)}")
+        self.filenames = filenames
@@ -0,0 +1,7 @@
+class StageFailedError(Exception):
+    """Ошибка на одном из этапов многоэтапной обработки"""
+
+    def __init__(self, stage: str, stage_durations: dict[str, float]) -> None:
+        super().__init__(f"Stage {stage} failed")
+        self.stage = stage
+        self.stage_durations = stage_durations
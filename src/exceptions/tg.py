@@ -12,3 +12,7 @@ class TgMessageTextDoesNotExistError(Exception):
 
 class TgChatDataDoesNotExistError(Exception):
     """Не заданы данные чата"""
+
+
+class TgCallbackQueryDoesNotExistError(Exception):
+    """Не существует нажатия встроенной клавиши"""
@@ -0,0 +1,218 @@
+import html
+import tempfile
+from pathlib import Path
+
+from loguru import logger
+from telegram import Update
+from telegram.constants import MessageLimit, ParseMode
+
+from src.data.analytics import format_stats
+from src.exceptions.profiler import ProfilerIsAlreadyRunningError
+from src.exceptions.tg import TgMessageDoesNotExistError, TgMessageTextDoesNotExistError
+from src.handlers.districts_map import schedule_districts_map_update
+from src.handlers.helpers import notify
+from src.observability.profiler import PROFILER
+from src.tg.context import Context
+
+PROFILE_DEFAULT_DURATION = 10
+"""Длительность снятия профиля по умолчанию в секундах"""
+
+PROFILE_TOP_N = 25
+"""Количество горячих функций в отчёте о профилировании"""
+
+TIMELAPSE_FILENAMES = {"gif": "timelapse.gif", "frames": "timelapse_frames.zip"}
+"""Названия файлов таймлапса по формату"""
+
+MAX_DOCUMENT_SIZE = 50 * 1024 * 1024
+"""Наибольший размер документа, который бот может отправить в telegram"""
+
+TRANSFER_USAGE = (
+    "Usage: /transfer reset, or /transfer followed by lines "
+    "<district> = <team name or - for no owner>"
+)
+"""Подсказка по команде перераспределения райончиков"""
+
+
+async def profile_handler(update: Update, context: Context) -> None:
+    """Снять профиль работающего бота и отправить отчёт в чат администраторов"""
+    if not update.message:
+        raise TgMessageDoesNotExistError
+
+    try:
+        requested_duration = int(context.args[0]) if context.args else PROFILE_DEFAULT_DURATION
+    except ValueError:
+        await update.message.reply_text("Usage: /profile [seconds]")
+        return
+    duration = PROFILER.effective_duration(requested_duration)
+
+    logger.info(f"Profile request for {duration}s")
+
+    if PROFILER.running:
+        await update.message.reply_text("Profile capture is already running")
+        return
+
+    await update.message.reply_text(f"Profile capture started for {duration}s")
+    try:
+        result = await PROFILER.capture(duration)
+    except ProfilerIsAlreadyRunningError:
+        await update.message.reply_text("Profile capture is already running")
+        return
+
+    admin_chat_id = context.bot_data.config.chats.admin
+    await context.bot.send_message(
+        admin_chat_id,
+        f"<pre>{html.escape(result.format_top(PROFILE_TOP_N))}</pre>",
+        parse_mode=ParseMode.HTML,
+    )
+    await context.bot.send_document(
+        admin_chat_id,
+        result.collapsed_stacks(),
+        filename="profile.collapsed.txt",
+        caption="Collapsed stacks for flamegraph.pl / speedscope",
+    )
+
+
+async def timelapse_handler(update: Update, context: Context) -> None:
+    """Записать таймлапс владения райончиками и отправить его в чат администраторов"""
+    if not update.message:
+        raise TgMessageDoesNotExistError
+
+    fmt = context.args[0] if context.args else "gif"
+    if fmt not in TIMELAPSE_FILENAMES:
+        await update.message.reply_text(f"Usage: /timelapse [{'|'.join(TIMELAPSE_FILENAMES)}]")
+        return
+
+    logger.info(f"Timelapse request in format {fmt}")
+    await update.message.reply_text("Timelapse rendering started")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / TIMELAPSE_FILENAMES[fmt]
+        frames = await context.bot_data.create_timelapse(path, fmt)
+        size = path.stat().st_size
+        if size > MAX_DOCUMENT_SIZE:
+            await update.message.reply_text(
+                f"Timelapse with {frames} frames is too large to send: {size // 1024 // 1024} MiB"
+            )
+            return
+        with path.open("rb") as timelapse:
+            await context.bot.send_document(
+                context.bot_data.config.chats.admin,
+                timelapse,
+                filename=path.name,
+                caption=f"Timelapse with {frames} frames",
+            )
+
+
+async def stats_handler(update: Update, context: Context) -> None:
+    """Отправить в чат администраторов статистику владения райончиками за игру"""
+    if not update.message:
+        raise TgMessageDoesNotExistError
+
+    logger.info("Territory stats request")
+    team_stats, district_stats = await context.bot_data.get_territory_stats()
+    for message in _stats_messages(
+        format_stats(context.bot_data.config, team_stats, district_stats)
+    ):
+        await update.message.reply_text(message, parse_mode=ParseMode.HTML)
+
+
+def _stats_messages(stats: str) -> list[str]:
+    """Разбить таблицы статистики по строкам на блоки `<pre>`, каждый помещается в сообщение"""
+    max_length = MessageLimit.MAX_TEXT_LENGTH - len("<pre></pre>")
+    pages: list[list[str]] = [[]]
+    page_length = 0
+    for line in html.escape(stats).split("\n"):
+        if pages[-1] and page_length + len(line) + 1 > max_length:
+            pages.append([])
+            page_length = 0
+        pages[-1].append(line)
+        page_length += len(line) + 1
+    return ["<pre>{}</pre>".format("\n".join(page)) for page in pages]
+
+
+async def transfer_handler(update: Update, context: Context) -> None:
+    """
+    Перераспределить райончики одной транзакцией с одной перерисовкой карты
+
+    `/transfer reset` возвращает распределение райончиков по умолчанию из конфига, иначе
+    каждая строка после команды - `райончик = команда` или `райончик = -` без владельца.
+    Каждая затронутая команда получает одно уведомление о всех своих изменениях
+    """
+    if not update.message:
+        raise TgMessageDoesNotExistError
+    if not update.message.text:
+        raise TgMessageTextDoesNotExistError
+
+    command_parts = update.message.text.split(maxsplit=1)
+    district_owners = _parse_district_owners(
+        command_parts[1] if len(command_parts) > 1 else "", context
+    )
+    if not district_owners:
+        await update.message.reply_text(TRANSFER_USAGE)
+        return
+
+    logger.info(f"Districts transfer request for {len(district_owners)} districts")
+
+    previous_owners = await context.bot_data.set_districts_owners(district_owners)
+    if not previous_owners:
+        await update.message.reply_text("District owners are already up to date")
+        return
+
+    _notify_transfer(context, district_owners, previous_owners)
+    await update.message.reply_text(f"Changed owners of {len(previous_owners)} districts")
+    schedule_districts_map_update(update, context)
+
+
+def _notify_transfer(
+    context: Context,
+    district_owners: dict[str, int | None],
+    previous_owners: dict[str, int | None],
+) -> None:
+    """Отправить каждой затронутой команде одно уведомление о всех её изменениях"""
+    config = context.bot_data.config
+    notification = config.keyboard.get("districts_transfer_notification")
+    if not notification:
+        return
+
+    gained: dict[int, list[str]] = {}
+    lost: dict[int, list[str]] = {}
+    for district_name, previous_owner_chat_id in previous_owners.items():
+        owner_chat_id = district_owners[district_name]
+        if owner_chat_id is not None:
+            gained.setdefault(owner_chat_id, []).append(district_name)
+        if previous_owner_chat_id is not None:
+            lost.setdefault(previous_owner_chat_id, []).append(district_name)
+
+    for chat_id in {**gained, **lost}:
+        if chat_id in config.chats.chat_id_to_team:
+            notify(
+                context,
+                chat_id,
+                notification,
+                gained_districts=", ".join(gained.get(chat_id, [])),
+                lost_districts=", ".join(lost.get(chat_id, [])),
+            )
+
+
+def _parse_district_owners(transfer_text: str, context: Context) -> dict[str, int | None]:
+    """Разобрать `reset` или строки `райончик = команда`, возвращает пустой словарь при ошибке"""
+    config = context.bot_data.config
+    if transfer_text.strip() == "reset":
+        return {
+            district_name: config.chats.default_district_name_to_team_chat_id.get(district_name)
+            for district_name in config.districts_map.distict_names
+        }
+    district_owners: dict[str, int | None] = {}
+    for line in transfer_text.splitlines():
+        if not line.strip():
+            continue
+        district_name, separator, team_name = (part.strip() for part in line.partition("="))
+        if not separator or district_name not in config.districts_map.distict_names:
+            return {}
+        if team_name == "-":
+            district_owners[district_name] = None
+        elif team_name in config.chats.team_name_to_team:
+            district_owners[district_name] = config.chats.team_name_to_team[team_name].chat_id
+        else:
+            return {}
+    return district_owners
@@ -2,10 +2,19 @@ from loguru import logger
 from telegram import Update
 from telegram.ext import ConversationHandler
 
+from src.data.config import key_id
 from src.exceptions.tg import TgChatDataDoesNotExistError
-from src.handlers.districts_map import districts_map_handler
+from src.handlers.districts_map import schedule_districts_map_update
 from src.handlers.helpers import (
+    answer_key_hit,
+    create_callback_data,
+    get_callback_data_idx,
+    get_callback_data_values,
+    get_chat_id_and_func,
+    get_district_owner_already_changed_key_hint,
+    get_inline_keys_to_choose,
     get_key_text,
+    inline_keyboard_key_handler,
     notify,
     notify_all_teams,
     reply_keyboard_key_handler,
@@ -20,8 +29,22 @@ class FightStates:
     DISTRICT_CHOOSE_AWAIT = 4
 
 
+FIGHT_CALLBACK_PREFIX = "f"
+"""Префикс данных встроенных клавиш стрелки: `f:нападающие:защищающиеся:победитель:райончик`"""
+
+FIGHT_CALLBACK_WINNERS = ("a", "d")
+"""Победитель в данных встроенной клавиши: нападающие или защищающиеся"""
+
+FIGHT_CALLBACK_NOTIFY = "n"
+"""Повторное уведомление защищающихся в данных встроенной клавиши"""
+
+
 async def fight_start_handler(update: Update, context: Context) -> int:
     """Начать стрелку за райончик"""
+    if context.bot_data.config.inline_keyboards:
+        await _fight_choose_team(update, context, "district_fight_start_choose_assaulter")
+        return ConversationHandler.END
+
     reply_keys = context.bot_data.config.get_reply_keys_to_choose_teams()
     await reply_keyboard_key_handler(update, context, override_reply_keys=reply_keys)
     return FightStates.ASSAULTER_TEAM_CHOOSE_AWAIT
@@ -153,11 +176,12 @@ async def fight_result_handler(update: Update, context: Context) -> int:
     context.chat_data["loser_team_name"] = loser_team_name
     context.chat_data["loser_team_chat_id"] = loser_team_chat_id
 
-    loser_district_names = await context.bot_data.get_free_disticts_names_of_team_by_chat_id(
-        loser_team_chat_id
+    capturable_district_names = await context.bot_data.get_capturable_districts_names(
+        loser_team_chat_id, winner_team_chat_id
     )
+    context.chat_data["capturable_district_names"] = capturable_district_names
     reply_keys = context.bot_data.config.get_reply_keys_to_choose_from_flat_list(
-        loser_district_names
+        capturable_district_names
     )
 
     key_hit = context.bot_data.config.keyboard["district_fight_choose_district"]
@@ -177,30 +201,87 @@ async def fight_district_handler(update: Update, context: Context) -> int:
     if context.chat_data is None:
         raise TgChatDataDoesNotExistError
     district_name = get_key_text(update, context)
-    context.chat_data["district_name"] = district_name
 
     winner_team_name = context.chat_data["winner_team_name"]
     winner_team_chat_id = context.chat_data["winner_team_chat_id"]
     loser_team_name = context.chat_data["loser_team_name"]
     loser_team_chat_id = context.chat_data["loser_team_chat_id"]
 
+    capturable_district_names = context.chat_data.get("capturable_district_names")
+    if capturable_district_names is not None and district_name not in capturable_district_names:
+        logger.info(
+            f"District {district_name} can not be captured by winner team {winner_team_name} from losser team {loser_team_name}"
+        )
+        await reply_keyboard_key_handler(
+            update,
+            context,
+            override_keyboard_key_hint=context.bot_data.config.keyboard[
+                "district_fight_choose_district"
+            ],
+            override_reply_keys=context.bot_data.config.get_reply_keys_to_choose_from_flat_list(
+                capturable_district_names
+            ),
+            winner_team_name=winner_team_name,
+            loser_team_name=loser_team_name,
+        )
+        return FightStates.DISTRICT_CHOOSE_AWAIT
+    context.chat_data["district_name"] = district_name
+
     logger.info(
         f"Got district for district fight winner team {winner_team_name} losser team {loser_team_name} district name {district_name}"
     )
 
-    key_hit = context.bot_data.config.keyboard["district_fight_done"]
+    config = context.bot_data.config
+    captured = await _capture_district(
+        update,
+        context,
+        district_name,
+        winner_team_name,
+        winner_team_chat_id,
+        loser_team_name,
+        loser_team_chat_id,
+    )
+    if not captured:
+        await reply_keyboard_key_handler(
+            update,
+            context,
+            override_keyboard_key_hint=get_district_owner_already_changed_key_hint(context),
+            override_reply_keys=config.get_reply_keys_from_key_ids(
+                config.keyboard["district_fight_done"].keyboard
+            ),
+            district_name=district_name,
+        )
+        return ConversationHandler.END
+
     await reply_keyboard_key_handler(
         update,
         context,
-        override_keyboard_key_hint=key_hit,
+        override_keyboard_key_hint=config.keyboard["district_fight_done"],
         district_name=district_name,
         winner_team_name=winner_team_name,
         loser_team_name=loser_team_name,
     )
+    return ConversationHandler.END
 
-    await context.bot_data.set_district_owner_and_update_districts_map(
-        district_name, winner_team_chat_id
-    )
+
+async def _capture_district(
+    update: Update,
+    context: Context,
+    district_name: str,
+    winner_team_name: str,
+    winner_team_chat_id: int,
+    loser_team_name: str,
+    loser_team_chat_id: int,
+) -> bool:
+    """
+    Передать райончик проигравшей команды победителю, уведомить команды и обновить карту
+
+    Возвращает False, если райончик уже не у проигравшей команды, тогда команды не уведомляются
+    """
+    if not await context.bot_data.set_district_owner(
+        district_name, winner_team_chat_id, loser_team_chat_id
+    ):
+        return False
 
     notification_all = context.bot_data.config.keyboard["district_fight_notification_all"]
     notification_winner = context.bot_data.config.keyboard["district_fight_notification_winner"]
@@ -233,5 +314,176 @@ async def fight_district_handler(update: Update, context: Context) -> int:
         f"Notified all users for district fight winner team {winner_team_name} losser team {loser_team_name} district name {district_name}"
     )
 
-    await districts_map_handler(update, context)
-    return ConversationHandler.END
+    schedule_districts_map_update(update, context)
+    return True
+
+
+async def fight_callback_handler(update: Update, context: Context) -> None:
+    """
+    Шаг стрелки во встроенной клавиатуре
+
+    Состояние общения не хранится: команды, победитель и райончик передаются в данных
+    клавиши, каждый шаг правит одно сообщение, повторное уведомление защищающихся
+    подтверждается ответом на нажатие. Райончик, который уже нельзя отжать, предлагается
+    выбрать заново
+    """
+    values = get_callback_data_values(update)[1:]
+    _, chat_func = get_chat_id_and_func(update, context)
+    if chat_func != "fight":
+        if update.callback_query:
+            await update.callback_query.answer()
+        return
+
+    teams = context.bot_data.config.chats.teams
+    assaulter_idx = get_callback_data_idx(values, 0, len(teams))
+    if assaulter_idx is None:
+        await _fight_choose_team(update, context, "district_fight_start_choose_assaulter")
+        return
+    defender_idx = get_callback_data_idx(values, 1, len(teams))
+    if defender_idx is None or defender_idx == assaulter_idx:
+        logger.info(
+            f"Got assaulter team for district fight assaulter team {teams[assaulter_idx].name}"
+        )
+        await _fight_choose_team(update, context, "district_fight_choose_defender", assaulter_idx)
+        return
+
+    assaulter, defender = teams[assaulter_idx], teams[defender_idx]
+    step = values[2] if len(values) > 2 else None
+    if step not in FIGHT_CALLBACK_WINNERS:
+        await _fight_result(update, context, assaulter_idx, defender_idx, step)
+        return
+
+    winner, loser = (assaulter, defender) if step == "a" else (defender, assaulter)
+    capturable_district_names = await context.bot_data.get_capturable_districts_names(
+        loser.chat_id, winner.chat_id
+    )
+    distict_names = context.bot_data.config.districts_map.distict_names
+    district_idx = get_callback_data_idx(values, 3, len(distict_names))
+    district_name = distict_names[district_idx] if district_idx is not None else None
+    if district_name not in capturable_district_names:
+        logger.info(
+            f"Got fight results for district fight winner team {winner.name} losser team {loser.name}"
+        )
+        await inline_keyboard_key_handler(
+            update,
+            context,
+            context.bot_data.config.keyboard["district_fight_choose_district"],
+            get_inline_keys_to_choose(
+                context,
+                [
+                    (
+                        name,
+                        create_callback_data(
+                            FIGHT_CALLBACK_PREFIX,
+                            assaulter_idx,
+                            defender_idx,
+                            step,
+                            distict_names.index(name),
+                        ),
+                    )
+                    for name in capturable_district_names
+                ],
+            ),
+            winner_team_name=winner.name,
+            loser_team_name=loser.name,
+        )
+        return
+
+    logger.info(
+        f"Got district for district fight winner team {winner.name} losser team {loser.name} district name {district_name}"
+    )
+    if not await _capture_district(
+        update, context, district_name, winner.name, winner.chat_id, loser.name, loser.chat_id
+    ):
+        await answer_key_hit(
+            update,
+            context,
+            get_district_owner_already_changed_key_hint(context),
+            district_name=district_name,
+        )
+        return
+    await inline_keyboard_key_handler(
+        update,
+        context,
+        context.bot_data.config.keyboard["district_fight_done"],
+        district_name=district_name,
+        winner_team_name=winner.name,
+        loser_team_name=loser.name,
+    )
+
+
+async def _fight_choose_team(
+    update: Update, context: Context, key: key_id, assaulter_idx: int | None = None
+) -> None:
+    """Встроенная клавиатура выбора нападающих или, если они выбраны, защищающихся"""
+    selected = () if assaulter_idx is None else (assaulter_idx,)
+    await inline_keyboard_key_handler(
+        update,
+        context,
+        context.bot_data.config.keyboard[key],
+        get_inline_keys_to_choose(
+            context,
+            [
+                (team.name, create_callback_data(FIGHT_CALLBACK_PREFIX, *selected, idx))
+                for idx, team in enumerate(context.bot_data.config.chats.teams)
+                if idx != assaulter_idx
+            ],
+        ),
+    )
+
+
+async def _fight_result(
+    update: Update, context: Context, assaulter_idx: int, defender_idx: int, step: str | None
+) -> None:
+    """Уведомить защищающихся и показать выбор победителя, повторное уведомление - по запросу"""
+    config = context.bot_data.config
+    assaulter = config.chats.teams[assaulter_idx]
+    defender = config.chats.teams[defender_idx]
+    notify(
+        context,
+        defender.chat_id,
+        config.keyboard["district_fight_notification_defender"],
+        assaulter_team_name=assaulter.name,
+    )
+    logger.info(
+        f"Notified team for district fight assaulter team {assaulter.name} defender team {defender.name}"
+    )
+
+    if step == FIGHT_CALLBACK_NOTIFY:
+        await answer_key_hit(
+            update,
+            context,
+            config.keyboard["district_fight_notify_defender"],
+            defender_team_name=defender.name,
+        )
+        return
+
+    await inline_keyboard_key_handler(
+        update,
+        context,
+        config.keyboard["district_fight_result"],
+        get_inline_keys_to_choose(
+            context,
+            [
+                *(
+                    (
+                        team.name,
+                        create_callback_data(
+                            FIGHT_CALLBACK_PREFIX, assaulter_idx, defender_idx, winner
+                        ),
+                    )
+                    for team, winner in zip(
+                        (assaulter, defender), FIGHT_CALLBACK_WINNERS, strict=True
+                    )
+                ),
+                (
+                    config.keyboard["district_fight_notify_defender"].key,
+                    create_callback_data(
+                        FIGHT_CALLBACK_PREFIX, assaulter_idx, defender_idx, FIGHT_CALLBACK_NOTIFY
+                    ),
+                ),
+            ],
+        ),
+        defender_team_name=defender.name,
+        assaulter_team_name=assaulter.name,
+    )
@@ -3,9 +3,17 @@ from telegram import Update
 from telegram.ext import ConversationHandler
 
 from src.exceptions.tg import TgChatDataDoesNotExistError
-from src.handlers.districts_map import districts_map_handler
+from src.handlers.districts_map import schedule_districts_map_update
 from src.handlers.helpers import (
+    answer_key_hit,
+    create_callback_data,
+    get_callback_data_idx,
+    get_callback_data_values,
+    get_chat_id_and_func,
+    get_district_owner_already_changed_key_hint,
+    get_inline_keys_to_choose,
     get_key_text,
+    inline_keyboard_key_handler,
     notify,
     notify_all_teams,
     reply_keyboard_key_handler,
@@ -19,8 +27,19 @@ class SellStates:
     SELL_CONFIRMATION_AWAIT = 3
 
 
+SELL_CALLBACK_PREFIX = "s"
+"""Префикс данных встроенных клавиш продажи: `s:команда:райончик:подтверждение` по номерам"""
+
+SELL_CALLBACK_CONFIRMED = "y"
+"""Подтверждение продажи в данных встроенной клавиши"""
+
+
 async def sell_start_handler(update: Update, context: Context) -> int:
     """Начать продажу райончика"""
+    if context.bot_data.config.inline_keyboards:
+        await _sell_choose_team(update, context)
+        return ConversationHandler.END
+
     reply_keys = context.bot_data.config.get_reply_keys_to_choose_teams()
     await reply_keyboard_key_handler(update, context, override_reply_keys=reply_keys)
     return SellStates.TEAM_CHOOSE_AWAIT
@@ -86,10 +105,34 @@ async def sell_confirm_handler(update: Update, context: Context) -> int:
 
     logger.info(f"Got confirmation for district selling team {team_name} district {district_name}")
 
+    if not await _sell_district(update, context, team_name, team_chat_id, district_name):
+        config = context.bot_data.config
+        await reply_keyboard_key_handler(
+            update,
+            context,
+            override_keyboard_key_hint=get_district_owner_already_changed_key_hint(context),
+            override_reply_keys=config.get_reply_keys_from_key_ids(
+                config.keyboard["district_sell_confirmed"].keyboard
+            ),
+            district_name=district_name,
+        )
+        return ConversationHandler.END
     await reply_keyboard_key_handler(
         update, context, district_name=district_name, team_name=team_name
     )
-    await context.bot_data.set_district_owner_and_update_districts_map(district_name, team_chat_id)
+    return ConversationHandler.END
+
+
+async def _sell_district(
+    update: Update, context: Context, team_name: str, team_chat_id: int, district_name: str
+) -> bool:
+    """
+    Передать свободный райончик покупателю, уведомить команды и обновить карту
+
+    Возвращает False, если райончик уже не свободен, тогда команды не уведомляются
+    """
+    if not await context.bot_data.set_district_owner(district_name, team_chat_id, None):
+        return False
 
     notification_all = context.bot_data.config.keyboard["district_sell_notification_all"]
     notification_owner = context.bot_data.config.keyboard["district_sell_notification_owner"]
@@ -105,5 +148,112 @@ async def sell_confirm_handler(update: Update, context: Context) -> int:
 
     logger.info(f"Notified users for district selling team {team_name} district {district_name}")
 
-    await districts_map_handler(update, context)
-    return ConversationHandler.END
+    schedule_districts_map_update(update, context)
+    return True
+
+
+async def sell_callback_handler(update: Update, context: Context) -> None:
+    """
+    Шаг продажи райончика во встроенной клавиатуре
+
+    Состояние общения не хранится: команда, райончик и подтверждение передаются номерами
+    в данных клавиши, каждый шаг правит одно сообщение. Райончик, который уже не свободен,
+    предлагается выбрать заново
+    """
+    values = get_callback_data_values(update)[1:]
+    _, chat_func = get_chat_id_and_func(update, context)
+    if chat_func != "bank":
+        if update.callback_query:
+            await update.callback_query.answer()
+        return
+
+    config = context.bot_data.config
+    team_idx = get_callback_data_idx(values, 0, len(config.chats.teams))
+    if team_idx is None:
+        await _sell_choose_team(update, context)
+        return
+    team = config.chats.teams[team_idx]
+
+    free_district_names = await context.bot_data.get_free_disticts_names()
+    district_idx = get_callback_data_idx(values, 1, len(config.districts_map.distict_names))
+    district_name = (
+        config.districts_map.distict_names[district_idx] if district_idx is not None else None
+    )
+    if district_name not in free_district_names:
+        logger.info(f"Got team for district selling team {team.name}")
+        await inline_keyboard_key_handler(
+            update,
+            context,
+            config.keyboard["district_sell_choose_district"],
+            get_inline_keys_to_choose(
+                context,
+                [
+                    (
+                        name,
+                        create_callback_data(
+                            SELL_CALLBACK_PREFIX,
+                            team_idx,
+                            config.districts_map.distict_names.index(name),
+                        ),
+                    )
+                    for name in free_district_names
+                ],
+            ),
+        )
+        return
+
+    if values[2:] != [SELL_CALLBACK_CONFIRMED]:
+        logger.info(f"Got district for district selling team {team.name} district {district_name}")
+        await inline_keyboard_key_handler(
+            update,
+            context,
+            config.keyboard["district_sell_confirm"],
+            get_inline_keys_to_choose(
+                context,
+                [
+                    (
+                        config.keyboard["district_sell_confirmed"].key,
+                        create_callback_data(
+                            SELL_CALLBACK_PREFIX, team_idx, district_idx, SELL_CALLBACK_CONFIRMED
+                        ),
+                    )
+                ],
+            ),
+            district_name=district_name,
+            team_name=team.name,
+        )
+        return
+
+    logger.info(f"Got confirmation for district selling team {team.name} district {district_name}")
+    if not await _sell_district(update, context, team.name, team.chat_id, district_name):
+        await answer_key_hit(
+            update,
+            context,
+            get_district_owner_already_changed_key_hint(context),
+            district_name=district_name,
+        )
+        return
+    await inline_keyboard_key_handler(
+        update,
+        context,
+        config.keyboard["district_sell_confirmed"],
+        district_name=district_name,
+        team_name=team.name,
+    )
+
+
+async def _sell_choose_team(update: Update, context: Context) -> None:
+    """Встроенная клавиатура выбора команды - покупателя"""
+    config = context.bot_data.config
+    await inline_keyboard_key_handler(
+        update,
+        context,
+        config.keyboard["district_sell_start_choose_team"],
+        get_inline_keys_to_choose(
+            context,
+            [
+                (team.name, create_callback_data(SELL_CALLBACK_PREFIX, idx))
+                for idx, team in enumerate(config.chats.teams)
+            ],
+        ),
+    )
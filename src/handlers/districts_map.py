@@ -2,8 +2,12 @@ from loguru import logger
 from telegram import ReplyKeyboardMarkup, Update
 from telegram.constants import ParseMode
 
+from src.data.districts_map_view import FULL_MAP_VARIANT_ID
+from src.data.stage_timer import format_stage_durations
+from src.exceptions.stage import StageFailedError
 from src.exceptions.tg import TgMessageDoesNotExistError
 from src.handlers.helpers import get_chat_id_and_func
+from src.observability.tracing import TRACER
 from src.tg.context import Context
 
 
@@ -11,40 +15,118 @@ async def districts_map_handler(update: Update, context: Context) -> None:
     """Получить карту райончиков"""
     chat_id, chat_func = get_chat_id_and_func(update, context)
 
-    key_hit = context.bot_data.config.keyboard["show_districts_map"]
-
     logger.info(f"District map show request from chat {chat_id} with func {chat_func}")
 
-    chat_id_to_teams = await context.bot_data.get_teams_with_district_num()
-
-    template_context = {
-        "team": chat_id_to_teams[chat_id] if chat_func == "team" else None,
-        "teams": sorted(
-            [team for team_chat_id, team in chat_id_to_teams.items() if team_chat_id != chat_id],
-            key=lambda team: team["name"],
-        ),
-    }
-
-    message_template = key_hit.get_message_template()
-    message_markdown = message_template.render(context=template_context)
-
-    (
-        district_map,
-        district_map_set_file_id,
-    ) = await context.bot_data.get_districts_map_and_notify_to_set_file_id()
+    districts_map_view = context.bot_data.districts_map_view
 
-    if not update.message:
+    message = update.effective_message
+    if not message:
         raise TgMessageDoesNotExistError
 
     reply_markup = context.bot_data.config.get_reply_keys_from_key_ids(
         context.bot_data.config.help_messages[chat_func].keyboard
     )
-    sent_message = await update.message.reply_photo(
-        district_map,
-        caption=message_markdown,
+    sent_message = await message.reply_photo(
+        districts_map_view.districts_map_for(chat_id),
+        caption=districts_map_view.captions[chat_id],
         parse_mode=ParseMode.MARKDOWN,
         reply_markup=ReplyKeyboardMarkup(reply_markup) if reply_markup else None,
     )
 
-    if district_map_set_file_id and len(sent_message.photo):
-        await context.bot_data.set_districts_map_file_id(sent_message.photo[-1].file_id)
+    variant_chat_id = chat_id if chat_id in districts_map_view.variants else None
+    if not districts_map_view.file_id_for(chat_id) and len(sent_message.photo):
+        _save_file_id(
+            context,
+            districts_map_view.districts_map_id,
+            sent_message.photo[-1].file_id,
+            variant_chat_id,
+        )
+
+    full_map = districts_map_view.variants.get(FULL_MAP_VARIANT_ID)
+    if full_map:
+        sent_document = await message.reply_document(
+            full_map.districts_map, filename="districts_map.png"
+        )
+        if not full_map.file_id and sent_document.document:
+            _save_file_id(
+                context,
+                districts_map_view.districts_map_id,
+                sent_document.document.file_id,
+                FULL_MAP_VARIANT_ID,
+            )
+
+
+async def districts_map_region_handler(update: Update, context: Context) -> None:
+    """Получить область карты райончиков высокого разрешения"""
+    chat_id, chat_func = get_chat_id_and_func(update, context)
+    region_name = " ".join(context.args or [])
+
+    logger.info(
+        f"District map region {region_name} request from chat {chat_id} with func {chat_func}"
+    )
+
+    if not update.message:
+        raise TgMessageDoesNotExistError
+
+    tiled = context.bot_data.config.districts_map.tiled
+    if not tiled:
+        logger.info("Districts map tiled mode is disabled, ignoring region request")
+        return
+
+    if region_name not in tiled.regions:
+        await update.message.reply_text(f"{tiled.regions_hint}: {', '.join(tiled.regions)}")
+        return
+
+    districts_map_id, region_map = await context.bot_data.get_districts_map_region(region_name)
+    sent_message = await update.message.reply_document(region_map, filename=f"{region_name}.png")
+    if isinstance(region_map, bytes) and sent_message.document:
+        context.bot_data.set_districts_map_region_file_id(
+            districts_map_id, region_name, sent_message.document.file_id
+        )
+
+
+def _save_file_id(
+    context: Context, districts_map_id: int, file_id: str, chat_id: int | None
+) -> None:
+    """Запомнить идентификатор файла карты в снимке и сохранить его в БД в фоне"""
+    if context.bot_data.set_districts_map_view_file_id(districts_map_id, file_id, chat_id):
+        context.application.create_task(
+            TRACER.detach(
+                "save districts map file id",
+                context.bot_data.save_districts_map_file_id(districts_map_id, file_id, chat_id),
+            )
+        )
+
+
+def schedule_districts_map_update(update: Update, context: Context) -> None:
+    """
+    Запустить фоновое обновление карты райончиков
+
+    После отрисовки и выгрузки карта отправляется в чат, из которого пришло сообщение,
+    ошибки этапов обновления отправляются в чат администраторов
+    """
+    context.application.create_task(
+        TRACER.detach("districts map update", _update_districts_map_and_reply(update, context))
+    )
+
+
+async def _update_districts_map_and_reply(update: Update, context: Context) -> None:
+    """Обновить карту райончиков и ответить ей на сообщение"""
+    try:
+        timer = await context.bot_data.update_districts_map()
+    except StageFailedError as e:
+        logger.opt(exception=e).error(f"Districts map update failed on stage {e.stage}")
+        context.bot_data.error_reporter.report(
+            e.__cause__ or e,
+            f"Districts map update failed on stage {e.stage} "
+            f"({format_stage_durations(e.stage_durations)})",
+        )
+        return
+
+    if timer:
+        logger.info(f"Districts map updated: {timer.format()}")
+
+    context.application.create_task(
+        TRACER.detach("districts map reply", districts_map_handler(update, context)),
+        update=update,
+    )
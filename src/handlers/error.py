@@ -1,6 +1,4 @@
-import html
 import json
-import traceback
 
 from loguru import logger
 from telegram import Bot, Update
@@ -13,12 +11,16 @@ async def error_handler(update: object, context: Context) -> None:
     """
     Обработчик ошибки:
 
-    * Возвращает пользователю сообщение об ошибке
+    * Возвращает пользователю сообщение об ошибке, не чаще заданного интервала для каждого чата
 
-    * Отправляет сообщение об ошибке во все группы суперадминистраторов
+    * Передаёт ошибку в `ErrorReporter` для отправки в чат администраторов
     """
     try:
-        if isinstance(update, Update) and update.effective_chat:
+        if (
+            isinstance(update, Update)
+            and update.effective_chat
+            and context.bot_data.error_reporter.should_reply_to_user(update.effective_chat.id)
+        ):
             bot: Bot = context.bot
             await bot.send_message(
                 update.effective_chat.id,
@@ -32,44 +34,22 @@ async def error_handler(update: object, context: Context) -> None:
         logger.error("There was no error in context, skipping")
         return
 
-    tb_list = traceback.format_exception(None, context.error, context.error.__traceback__)
-    tb_string = "".join(tb_list)
+    logger.opt(exception=context.error).error("Exception while handling an update")
 
-    logger.error(f"Exception while handling an update:\n{tb_string}")
-
-    update_str = (
-        update.to_dict()
-        if isinstance(update, Update)
-        else update
-        if isinstance(update, dict)
-        else str(update)
-    )
-    messages_parts = [
-        "An exception was raised while handling an update",
-        f"update = {html.escape(json.dumps(update_str, indent=2, ensure_ascii=False))}",
-        f"context.chat_data = {html.escape(str(context.chat_data))}",
-        f"context.user_data = {html.escape(str(context.user_data))}",
-        f"{html.escape(tb_string)}",
-    ]
-    messages = []
-    for message_part_idx, message_part in enumerate(messages_parts):
-        curr_len = len(message_part)
-        template = "<pre>{message_part}</pre>\n\n" if message_part_idx > 0 else "{message_part}\n"
-        if len(messages) > 0 and (len(messages[-1]) + curr_len <= 4096):
-            messages[-1] += template.format(message_part=message_part)
-        elif curr_len <= 4096:
-            messages.append(template.format(message_part=message_part))
-        else:
-            messages += [
-                template.format(
-                    message_part=message_part[
-                        message_part_text_start_idx : message_part_text_start_idx + 4096
-                    ]
-                )
-                for message_part_text_start_idx in range(0, curr_len, 4096)
-            ]
-
-    for message in messages:
-        await context.application.bot.send_message(
-            context.bot_data.config.chats.admin, message, parse_mode=ParseMode.HTML
+    def details() -> list[str]:
+        update_str = (
+            update.to_dict()
+            if isinstance(update, Update)
+            else update
+            if isinstance(update, dict)
+            else str(update)
         )
+        return [
+            f"update = {json.dumps(update_str, indent=2, ensure_ascii=False)}",
+            f"context.chat_data = {context.chat_data}",
+            f"context.user_data = {context.user_data}",
+        ]
+
+    context.bot_data.error_reporter.report(
+        context.error, "An exception was raised while handling an update", details
+    )
@@ -1,13 +1,19 @@
+import asyncio
+
 from loguru import logger
-from telegram import ReplyKeyboardMarkup, Update
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, Update
 from telegram.constants import ParseMode
+from telegram.error import BadRequest
 
 from src.data.config import KeyboardKeyHit, chat_func
 from src.exceptions.tg import (
+    TgCallbackQueryDoesNotExistError,
     TgChatDoesNotExistError,
     TgMessageDoesNotExistError,
     TgMessageTextDoesNotExistError,
 )
+from src.observability.metrics import NOTIFICATIONS_PENDING
+from src.observability.tracing import TRACER
 from src.tg.context import Context
 
 
@@ -26,6 +32,20 @@ def get_help_key_hint(update: Update, context: Context) -> KeyboardKeyHit:
     return context.bot_data.config.help_messages[chat_func]
 
 
+DISTRICT_OWNER_ALREADY_CHANGED = KeyboardKeyHit(
+    key="Райончик уже передан",
+    message="⚠️ Райончик {{ context.district_name }} уже передан, повторное подтверждение не учтено",
+)
+"""Ответ на повторную передачу райончика, если его нет в клавиатуре конфига"""
+
+
+def get_district_owner_already_changed_key_hint(context: Context) -> KeyboardKeyHit:
+    """Получить ответ на повторную передачу райончика из конфига или встроенный"""
+    return context.bot_data.config.keyboard.get(
+        "district_owner_already_changed", DISTRICT_OWNER_ALREADY_CHANGED
+    )
+
+
 def get_key_text(update: Update, _: Context) -> str:
     """Получить текст нажатой клавиши"""
     if not update.message:
@@ -51,6 +71,30 @@ def get_key_hint_with_chat_id_and_func(
     return key_hit, chat_id, chat_func
 
 
+def _render_key_hit(
+    context: Context,
+    key_hit: KeyboardKeyHit,
+    chat_id: int,
+    chat_func: chat_func,
+    additional_template_context: dict[str, str | int],
+) -> list[str]:
+    """Сообщения реакции на нажатие клавиши"""
+    template_context = {}
+    if chat_func == "team":
+        template_context |= {"team": context.bot_data.config.chats.chat_id_to_team[chat_id]}
+    if additional_template_context:
+        template_context |= additional_template_context
+
+    messages_templates = []
+    if key_hit.message:
+        messages_templates.append(key_hit.get_message_template())
+    if key_hit.messages:
+        messages_templates += key_hit.get_messages_templates()
+    return [
+        message_template.render(context=template_context) for message_template in messages_templates
+    ]
+
+
 async def reply_keyboard_key_handler(
     update: Update,
     context: Context,
@@ -65,12 +109,6 @@ async def reply_keyboard_key_handler(
     else:
         key_hit, chat_id, chat_func = get_key_hint_with_chat_id_and_func(update, context)
 
-    template_context = {}
-    if chat_func == "team":
-        template_context |= {"team": context.bot_data.config.chats.chat_id_to_team[chat_id]}
-    if additional_template_context:
-        template_context |= additional_template_context
-
     reply_markup = None
     reply_keys = context.bot_data.config.get_reply_keys_from_key_ids(key_hit.keyboard)
     if override_reply_keys:
@@ -81,19 +119,116 @@ async def reply_keyboard_key_handler(
     if not update.message:
         raise TgMessageDoesNotExistError
 
-    if key_hit.message:
-        message_template = key_hit.get_message_template()
-        message_markdown = message_template.render(context=template_context)
+    for message_markdown in _render_key_hit(
+        context, key_hit, chat_id, chat_func, additional_template_context
+    ):
         await update.message.reply_markdown(message_markdown, reply_markup=reply_markup)
 
-    if key_hit.messages:
-        messages_templates = key_hit.get_messages_templates()
-        messages_markdowns = [
-            message_template.render(context=template_context)
-            for message_template in messages_templates
-        ]
-        for message_markdown in messages_markdowns:
-            await update.message.reply_markdown(message_markdown, reply_markup=reply_markup)
+
+CALLBACK_DATA_SEPARATOR = ":"
+"""Разделитель значений в данных встроенной клавиши"""
+
+CANCEL_CALLBACK_DATA = "x"
+"""Данные встроенной клавиши Отмена"""
+
+CALLBACK_ANSWER_MAX_LENGTH = 200
+"""Наибольшая длина текста ответа на нажатие встроенной клавиши"""
+
+MARKDOWN_MARKUP = str.maketrans("", "", "*_`")
+"""Удаление разметки Markdown из текста ответа на нажатие встроенной клавиши"""
+
+
+def create_callback_data(*values: str | int) -> str:
+    """Данные встроенной клавиши: шаг общения целиком, не более 64 байт"""
+    return CALLBACK_DATA_SEPARATOR.join(str(value) for value in values)
+
+
+def get_callback_data_values(update: Update) -> list[str]:
+    """Значения из данных нажатой встроенной клавиши"""
+    if not update.callback_query:
+        raise TgCallbackQueryDoesNotExistError
+    return (update.callback_query.data or "").split(CALLBACK_DATA_SEPARATOR)
+
+
+def get_callback_data_idx(values: list[str], position: int, size: int) -> int | None:
+    """Номер из значений данных встроенной клавиши, если он есть и меньше `size`"""
+    if len(values) <= position or not values[position].isdigit():
+        return None
+    idx = int(values[position])
+    return idx if idx < size else None
+
+
+def get_inline_keys_to_choose(
+    context: Context, options: list[tuple[str, str]]
+) -> list[list[InlineKeyboardButton]]:
+    """Встроенная клавиатура выбора по два варианта в строке с клавишей Отмена"""
+    buttons = [InlineKeyboardButton(text, callback_data=data) for text, data in options]
+    return [
+        *(buttons[idx : idx + 2] for idx in range(0, len(buttons), 2)),
+        [
+            InlineKeyboardButton(
+                context.bot_data.config.keyboard["cancel"].key, callback_data=CANCEL_CALLBACK_DATA
+            )
+        ],
+    ]
+
+
+async def inline_keyboard_key_handler(
+    update: Update,
+    context: Context,
+    key_hit: KeyboardKeyHit,
+    inline_keys: list[list[InlineKeyboardButton]] | None = None,
+    **additional_template_context: str | int,
+) -> None:
+    """
+    Ответ одним сообщением со встроенной клавиатурой
+
+    На нажатие клавиши клавиатуры отправляется новое сообщение, на нажатие встроенной
+    клавиши ответ на нажатие и правка сообщения с клавиатурой отправляются одновременно
+    """
+    chat_id, chat_func = get_chat_id_and_func(update, context)
+    message_markdown = "\n\n".join(
+        _render_key_hit(context, key_hit, chat_id, chat_func, additional_template_context)
+    )
+    reply_markup = InlineKeyboardMarkup(inline_keys) if inline_keys else None
+
+    if update.callback_query:
+        try:
+            await asyncio.gather(
+                update.callback_query.answer(),
+                update.callback_query.edit_message_text(
+                    message_markdown, parse_mode=ParseMode.MARKDOWN, reply_markup=reply_markup
+                ),
+            )
+        except BadRequest as e:
+            if "not modified" not in e.message:
+                raise
+            logger.info("Inline keyboard message is already up to date")
+        return
+
+    if not update.message:
+        raise TgMessageDoesNotExistError
+    await update.message.reply_markdown(message_markdown, reply_markup=reply_markup)
+
+
+async def answer_key_hit(
+    update: Update, context: Context, key_hit: KeyboardKeyHit, **template_context: str | int
+) -> None:
+    """Ответить на нажатие встроенной клавиши всплывающим текстом без нового сообщения"""
+    if not update.callback_query:
+        raise TgCallbackQueryDoesNotExistError
+    chat_id, chat_func = get_chat_id_and_func(update, context)
+    message_markdown = "\n\n".join(
+        _render_key_hit(context, key_hit, chat_id, chat_func, template_context)
+    )
+    await update.callback_query.answer(
+        message_markdown.translate(MARKDOWN_MARKUP)[:CALLBACK_ANSWER_MAX_LENGTH]
+    )
+
+
+async def cancel_callback_handler(update: Update, context: Context) -> None:
+    """Нажатие встроенной клавиши Отмена: сообщение с клавиатурой заменяется сообщением отмены"""
+    await inline_keyboard_key_handler(update, context, context.bot_data.config.keyboard["cancel"])
 
 
 def notify(
@@ -103,9 +238,15 @@ def notify(
     **template_context: int | str,
 ) -> None:
     message_markdown = notification.get_message_template().render(context=template_context)
-    context.application.create_task(
-        context.bot.send_message(chat_id, message_markdown, ParseMode.MARKDOWN)
+    NOTIFICATIONS_PENDING.inc()
+    task = context.application.create_task(
+        TRACER.detach(
+            "notify",
+            context.bot.send_message(chat_id, message_markdown, ParseMode.MARKDOWN),
+            chat_id=chat_id,
+        )
     )
+    task.add_done_callback(lambda _: NOTIFICATIONS_PENDING.dec())
 
 
 def notify_all_teams(
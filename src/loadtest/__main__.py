@@ -0,0 +1,66 @@
+import argparse
+import asyncio
+from pathlib import Path
+
+from src.data.config import create_config
+from src.loadtest.harness import FLOWS, LOAD_SCHEMA_PREFIX, LoadTest
+from src.observability.logs import setup_logging
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.loadtest",
+        description="Нагрузочное тестирование бота с имитацией Bot API и MinIO в памяти процесса",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=60, help="длительность подачи нагрузки, с"
+    )
+    for flow in FLOWS:
+        parser.add_argument(
+            f"--{flow}-rate", type=float, default=1.0, help=f"интенсивность сценария {flow}, 1/с"
+        )
+    parser.add_argument(
+        "--operators", type=int, default=1, help="количество операторов банка и стрелок"
+    )
+    parser.add_argument(
+        "--think-time", type=float, default=0.0, help="среднее время между шагами общения, с"
+    )
+    parser.add_argument("--api-latency", type=float, default=0.05, help="задержка Bot API, с")
+    parser.add_argument("--storage-latency", type=float, default=0.01, help="задержка MinIO, с")
+    parser.add_argument(
+        "--inline-keyboards",
+        action="store_true",
+        help="продажа и стрелка во встроенных клавиатурах",
+    )
+    parser.add_argument("--seed", type=int, default=None, help="зерно генератора событий")
+    parser.add_argument(
+        "--pg-schema",
+        default=LOAD_SCHEMA_PREFIX,
+        help=f"схема БД стенда, должна начинаться с {LOAD_SCHEMA_PREFIX}",
+    )
+    parser.add_argument("--log-level", default="WARNING", help="уровень лога бота")
+    parser.add_argument("--json", type=Path, default=None, help="сохранить отчёт в JSON")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    config = create_config().model_copy(update={"pg_schema": args.pg_schema})
+    if args.inline_keyboards:
+        config = config.model_copy(update={"inline_keyboards": True})
+    setup_logging([config], args.log_level)
+
+    load_test = LoadTest(
+        config,
+        rates={flow: getattr(args, f"{flow}_rate") for flow in FLOWS},
+        duration=args.duration,
+        api_latency=args.api_latency,
+        storage_latency=args.storage_latency,
+        operators=args.operators,
+        think_time=args.think_time,
+        seed=args.seed,
+    )
+    report = asyncio.run(load_test.run())
+    print(report.format())  # noqa: T201
+    if args.json:
+        report.save(args.json)
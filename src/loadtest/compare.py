@@ -0,0 +1,52 @@
+import argparse
+import json
+from pathlib import Path
+from typing import Any
+
+from src.loadtest.harness import PERCENTILES
+
+
+def _format_change(base: float, new: float) -> str:
+    if not base:
+        return f"{new * 1000:.1f}"
+    return f"{base * 1000:.1f}->{new * 1000:.1f} ({(new - base) / base * 100:+.0f}%)"
+
+
+def compare_reports(base: dict[str, Any], new: dict[str, Any]) -> str:
+    """Сравнение распределений длительности обработчиков двух отчётов"""
+    lines = [
+        f"Updates {base['updates']} -> {new['updates']}, "
+        f"unhandled {base['unhandled']} -> {new['unhandled']}",
+        "",
+        f"{'handler':<32} {'count':>11} {'errors':>9} "
+        + " ".join(f"{f'p{quantile * 100:g} ms':>24}" for quantile in PERCENTILES),
+    ]
+    empty: dict[str, Any] = {"count": 0, "errors": 0} | {
+        f"p{quantile * 100:g}": 0.0 for quantile in PERCENTILES
+    }
+    for handler_name in sorted(base["handlers"].keys() | new["handlers"].keys()):
+        base_stats = base["handlers"].get(handler_name, empty)
+        new_stats = new["handlers"].get(handler_name, empty)
+        counts = f"{base_stats['count']}/{new_stats['count']}"
+        errors = f"{base_stats['errors']}/{new_stats['errors']}"
+        lines.append(
+            f"{handler_name:<32} {counts:>11} {errors:>9} "
+            + " ".join(
+                f"{_format_change(base_stats[key], new_stats[key]):>24}"
+                for key in (f"p{quantile * 100:g}" for quantile in PERCENTILES)
+            )
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m src.loadtest.compare",
+        description="Сравнение отчётов нагрузочного стенда двух сборок",
+    )
+    parser.add_argument("base", type=Path, help="отчёт базовой сборки")
+    parser.add_argument("new", type=Path, help="отчёт новой сборки")
+    args = parser.parse_args()
+    print(  # noqa: T201
+        compare_reports(json.loads(args.base.read_text()), json.loads(args.new.read_text()))
+    )
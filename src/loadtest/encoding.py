@@ -0,0 +1,62 @@
+import argparse
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from src.data.config import Config, create_config
+from src.data.districts_map_render import render_districts_maps
+from src.data.map_encoding import format_measurements, measure_encodings
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+def render_default_map(config: Config, data_dir: Path) -> "Image.Image":
+    """Отрисовать карту с владельцами райончиков по умолчанию из исходников в `data_dir`"""
+    districts_map = config.districts_map
+    default_owners = config.chats.default_district_name_to_team_chat_id
+    mask_colors = [
+        (
+            (data_dir / district.mask_filename).read_bytes(),
+            config.chats.chat_id_to_team[default_owners[district.name]].map_color
+            if district.name in default_owners
+            else districts_map.none_map_color,
+        )
+        for district in districts_map.default_districts
+    ]
+    image, _ = render_districts_maps(
+        (data_dir / districts_map.backing_filename).read_bytes(),
+        mask_colors,
+        (data_dir / districts_map.text_filename).read_bytes(),
+        {},
+    )
+    return image
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m src.loadtest.encoding",
+        description="Замер времени и размера кодирования карты райончиков во всех режимах",
+    )
+    parser.add_argument("--data", type=Path, default=Path("data"), help="исходники карты")
+    parser.add_argument("--repeats", type=int, default=3, help="количество повторов замера")
+    parser.add_argument("--json", type=Path, default=None, help="сохранить замеры в JSON")
+    args = parser.parse_args()
+
+    config = create_config()
+    image = render_default_map(config, args.data)
+    measurements = measure_encodings(
+        image,
+        config.districts_map.encoding,
+        [
+            config.districts_map.none_map_color,
+            *(team.map_color for team in config.chats.teams),
+        ],
+        args.repeats,
+    )
+    print(f"Districts map {image.width}x{image.height}")  # noqa: T201
+    print(format_measurements(measurements))  # noqa: T201
+    if args.json:
+        args.json.write_text(
+            json.dumps([measurement.to_dict() for measurement in measurements], indent=2)
+        )
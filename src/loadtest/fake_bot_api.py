@@ -0,0 +1,110 @@
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter
+from typing import Any
+
+from telegram._utils.defaultvalue import DEFAULT_NONE
+from telegram._utils.types import ODVInput
+from telegram.request import BaseRequest, RequestData
+
+from src.observability.metrics import TELEGRAM_REQUEST_DURATION
+from src.observability.tracing import TRACER
+from src.tg.request import get_api_method
+
+FAKE_BOT_ID = 1
+"""Идентификатор имитируемого бота"""
+
+MESSAGE_METHODS = {"sendMessage", "sendPhoto", "sendDocument"}
+"""Методы, в ответ на которые возвращается отправленное сообщение"""
+
+
+class FakeBotApiRequest(BaseRequest):
+    """
+    Имитация Telegram Bot API внутри процесса
+
+    Отвечает на методы, которые использует бот, с заданной задержкой и учитывает
+    количество вызовов по методам. Отправленным фотографиям присваиваются новые file_id
+    """
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self._message_ids = itertools.count(1)
+
+    @property
+    def read_timeout(self) -> float | None:
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,  # noqa: ARG002
+        request_data: RequestData | None = None,
+        read_timeout: ODVInput[float] = DEFAULT_NONE,  # noqa: ARG002
+        write_timeout: ODVInput[float] = DEFAULT_NONE,  # noqa: ARG002
+        connect_timeout: ODVInput[float] = DEFAULT_NONE,  # noqa: ARG002
+        pool_timeout: ODVInput[float] = DEFAULT_NONE,  # noqa: ARG002
+    ) -> tuple[int, bytes]:
+        api_method = get_api_method(url)
+        self.calls[api_method] += 1
+        start = time.perf_counter()
+        try:
+            with TRACER.span(f"telegram {api_method}"):
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                parameters = request_data.parameters if request_data else {}
+                result = self._result(api_method, parameters)
+        finally:
+            TELEGRAM_REQUEST_DURATION.observe(time.perf_counter() - start, api_method)
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+    def _result(self, api_method: str, parameters: dict[str, Any]) -> Any:
+        if api_method == "getMe":
+            return {
+                "id": FAKE_BOT_ID,
+                "is_bot": True,
+                "first_name": "Load Test",
+                "username": "load_test_bot",
+                "can_join_groups": True,
+                "can_read_all_group_messages": True,
+                "supports_inline_queries": False,
+            }
+        if api_method == "getMyName":
+            return {"name": ""}
+        if api_method in ("getMyCommands", "getUpdates"):
+            return []
+        if api_method in MESSAGE_METHODS:
+            return self._message(api_method, parameters)
+        return True
+
+    def _message(self, api_method: str, parameters: dict[str, Any]) -> dict[str, Any]:
+        chat_id = int(parameters["chat_id"])
+        message_id = next(self._message_ids)
+        message: dict[str, Any] = {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup", "title": str(chat_id)},
+            "from": {"id": FAKE_BOT_ID, "is_bot": True, "first_name": "Load Test"},
+        }
+        if api_method == "sendMessage":
+            message["text"] = parameters.get("text", "")
+        elif api_method == "sendPhoto":
+            file_id = parameters.get("photo") or f"fake-photo-{message_id}"
+            message["photo"] = [
+                {"file_id": file_id, "file_unique_id": file_id, "width": 1, "height": 1}
+            ]
+            message["caption"] = parameters.get("caption")
+        else:
+            message["document"] = {
+                "file_id": f"fake-document-{message_id}",
+                "file_unique_id": f"fake-document-{message_id}",
+            }
+        return message
@@ -0,0 +1,466 @@
+import abc
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+from telegram import Update
+
+from src.application import create_application
+from src.data.config import Config
+from src.exceptions.loadtest import LoadStandSchemaIsNotDedicatedError
+from src.handlers.district_fight import FIGHT_CALLBACK_PREFIX, FIGHT_CALLBACK_WINNERS
+from src.handlers.district_sell import SELL_CALLBACK_CONFIRMED, SELL_CALLBACK_PREFIX
+from src.handlers.helpers import CANCEL_CALLBACK_DATA, create_callback_data
+from src.loadtest.fake_bot_api import FakeBotApiRequest
+from src.loadtest.storage import InMemoryMinIOClient
+from src.observability.instrumentation import HANDLER_OBSERVERS
+from src.tg.persistence import Persistence
+
+FLOWS = ("help", "map", "sell", "fight")
+"""Сценарии нагрузки: команда помощи, карта райончиков, продажа и стрелка"""
+
+PERCENTILES = (0.5, 0.95, 0.99)
+"""Перцентили задержки в отчёте"""
+
+OPERATOR_USER_ID_START = 100_000
+"""Начало идентификаторов виртуальных пользователей"""
+
+LOAD_SCHEMA_PREFIX = "loadtest"
+"""Префикс схемы БД нагрузочного стенда, данные игры в других схемах стенд не изменяет"""
+
+
+def percentile(sorted_values: list[float], quantile: float) -> float:
+    """Перцентиль по ближайшему рангу из отсортированного списка"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(quantile * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class HandlerStats:
+    """Длительности и ошибки одного обработчика"""
+
+    def __init__(self) -> None:
+        self.durations: list[float] = []
+        self.errors = 0
+
+    def to_dict(self, duration: float) -> dict[str, Any]:
+        durations = sorted(self.durations)
+        return {
+            "count": len(durations),
+            "errors": self.errors,
+            "throughput": len(durations) / duration if duration else 0.0,
+            **{f"p{quantile * 100:g}": percentile(durations, quantile) for quantile in PERCENTILES},
+        }
+
+
+class LoadTestReport:
+    """Отчёт нагрузочного тестирования"""
+
+    def __init__(self) -> None:
+        self.duration = 0.0
+        self.updates = 0
+        self.unhandled = 0
+        self.flows_started: Counter[str] = Counter()
+        self.flows_done: Counter[str] = Counter()
+        self.handlers: dict[str, HandlerStats] = {}
+        self.telegram_calls: Counter[str] = Counter()
+
+    def observe(self, handler_name: str, duration: float, error: BaseException | None) -> None:
+        stats = self.handlers.setdefault(handler_name, HandlerStats())
+        stats.durations.append(duration)
+        if error is not None:
+            stats.errors += 1
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "duration": self.duration,
+            "updates": self.updates,
+            "unhandled": self.unhandled,
+            "flows_started": dict(self.flows_started),
+            "flows_done": dict(self.flows_done),
+            "handlers": {
+                handler_name: stats.to_dict(self.duration)
+                for handler_name, stats in sorted(self.handlers.items())
+            },
+            "telegram_calls": dict(self.telegram_calls),
+        }
+
+    def save(self, path: Path) -> None:
+        path.write_text(json.dumps(self.to_dict(), ensure_ascii=False, indent=2))
+
+    def format(self) -> str:
+        """Отчёт в виде таблицы"""
+        report = self.to_dict()
+        lines = [
+            f"Load test {self.duration:.1f}s: {self.updates} updates "
+            f"({self.updates / max(self.duration, 1e-9):.1f}/s), {self.unhandled} unhandled"
+        ]
+        if self.flows_started:
+            lines.append(
+                "Flows: "
+                + ", ".join(
+                    f"{flow} {self.flows_done[flow]}/{self.flows_started[flow]}"
+                    for flow in FLOWS
+                    if self.flows_started[flow]
+                )
+            )
+        lines += [
+            "",
+            f"{'handler':<32} {'count':>7} {'errors':>7} {'rps':>8} "
+            + " ".join(f"{f'p{quantile * 100:g} ms':>9}" for quantile in PERCENTILES),
+        ]
+        for handler_name, stats in report["handlers"].items():
+            lines.append(
+                f"{handler_name:<32} {stats['count']:>7} {stats['errors']:>7} "
+                f"{stats['throughput']:>8.2f} "
+                + " ".join(
+                    f"{stats[f'p{quantile * 100:g}'] * 1000:>9.1f}" for quantile in PERCENTILES
+                )
+            )
+        lines += [
+            "",
+            "Telegram calls: "
+            + ", ".join(f"{method} {count}" for method, count in self.telegram_calls.most_common()),
+        ]
+        return "\n".join(lines)
+
+
+class LoadStand(abc.ABC):
+    """
+    Стенд для подачи нагрузки на бота
+
+    Собирает настоящее приложение через `create_application` с имитацией Bot API и MinIO
+    в памяти процесса, БД используется локальная в отдельной схеме с префиксом
+    `LOAD_SCHEMA_PREFIX`. События поступают в очередь обновлений приложения как при опросе
+    Telegram, длительность обработчиков учитывается в отчёте
+    """
+
+    UPDATE_TIMEOUT = 30.0
+    """Время ожидания обработки события в секундах, после него событие считается необработанным"""
+
+    DRAIN_TIMEOUT = 60.0
+    """Время ожидания фоновых задач (уведомлений и обновления карты) после подачи нагрузки"""
+
+    def __init__(
+        self, config: Config, api_latency: float = 0.0, storage_latency: float = 0.0
+    ) -> None:
+        if not (config.pg_schema or "").startswith(LOAD_SCHEMA_PREFIX):
+            raise LoadStandSchemaIsNotDedicatedError(config.pg_schema, LOAD_SCHEMA_PREFIX)
+        self.config = config.model_copy(update={"updates_record_path": None})
+        self.report = LoadTestReport()
+        self._api = FakeBotApiRequest(api_latency)
+        self._app = create_application(
+            self.config,
+            persistence=Persistence(self.config, minio=InMemoryMinIOClient(storage_latency)),
+            request=self._api,
+            get_updates_request=FakeBotApiRequest(),
+        )
+        self._pending: dict[int, asyncio.Future[bool]] = {}
+
+    async def run(self) -> LoadTestReport:
+        """Подать нагрузку и вернуть отчёт"""
+        app = self._app
+        HANDLER_OBSERVERS.append(self._observe)
+        try:
+            async with app:
+                if app.post_init:
+                    await app.post_init(app)
+                await app.start()
+                try:
+                    loop = asyncio.get_running_loop()
+                    await asyncio.sleep(0)
+                    background_tasks = len(asyncio.all_tasks())
+                    start = loop.time()
+                    await self._load()
+                    self.report.duration = loop.time() - start
+                    await self._drain(background_tasks)
+                finally:
+                    await app.stop()
+                    if app.post_stop:
+                        await app.post_stop(app)
+        finally:
+            HANDLER_OBSERVERS.remove(self._observe)
+
+        self.report.telegram_calls = self._api.calls
+        return self.report
+
+    @abc.abstractmethod
+    async def _load(self) -> None:
+        """Подать нагрузку и дождаться обработки поданных событий"""
+
+    def _observe(
+        self, handler_name: str, update: object, duration: float, error: BaseException | None
+    ) -> None:
+        self.report.observe(handler_name, duration, error)
+        if not isinstance(update, Update):
+            return
+        future = self._pending.pop(update.update_id, None)
+        if future and not future.done():
+            future.set_result(error is None)
+
+    async def _put(self, update_data: dict[str, Any]) -> asyncio.Future[bool]:
+        """
+        Поместить событие в очередь обновлений приложения
+
+        Результат завершается после первого обработчика события с признаком отсутствия ошибки.
+        Событие, которое не подходит ни одному обработчику, сразу учитывается в отчёте
+        как необработанное, чтобы его ожидание не задерживало следующие события
+        """
+        future = asyncio.get_running_loop().create_future()
+        update = Update.de_json(update_data, self._app.bot)
+        self.report.updates += 1
+        if self._has_handler(update):
+            self._pending[update_data["update_id"]] = future
+        else:
+            self.report.unhandled += 1
+            future.set_result(False)
+        await self._app.update_queue.put(update)
+        return future
+
+    def _has_handler(self, update: Update) -> bool:
+        """Подходит ли событие хотя бы одному обработчику, кроме служебных групп"""
+        return any(
+            handler.check_update(update) not in (None, False)
+            for group, handlers in self._app.handlers.items()
+            if group >= 0
+            for handler in handlers
+        )
+
+    async def _wait(self, update_id: int, future: asyncio.Future[bool]) -> bool:
+        """Дождаться обработки события, не обработанные за `UPDATE_TIMEOUT` учитываются в отчёте"""
+        try:
+            return await asyncio.wait_for(future, self.UPDATE_TIMEOUT)
+        except TimeoutError:
+            self._pending.pop(update_id, None)
+            self.report.unhandled += 1
+            return False
+
+    async def _drain(self, background_tasks: int) -> None:
+        """Дождаться, пока количество задач не вернётся к исходному"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.DRAIN_TIMEOUT
+        while len(asyncio.all_tasks()) > background_tasks and loop.time() < deadline:  # noqa: ASYNC110
+            await asyncio.sleep(0.1)
+
+
+class LoadTest(LoadStand):
+    """
+    Нагрузочное тестирование бота синтетическими потоками событий
+
+    Сценарии запускаются пуассоновским потоком с заданной интенсивностью в секунду,
+    шаги общения выполняют виртуальные операторы банка и стрелок, каждый со своим
+    пользователем, и следующий шаг отправляется после завершения обработчика предыдущего
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        rates: dict[str, float],
+        duration: float,
+        api_latency: float = 0.0,
+        storage_latency: float = 0.0,
+        operators: int = 1,
+        think_time: float = 0.0,
+        seed: int | None = None,
+    ) -> None:
+        super().__init__(config, api_latency, storage_latency)
+        self.rates = rates
+        self.duration = duration
+        self.think_time = think_time
+        self.operators = operators
+        self._random = random.Random(seed)
+        self._update_ids = itertools.count(1)
+        self._operators: dict[str, asyncio.Queue[int]] = {}
+
+    async def _load(self) -> None:
+        """Запускать сценарии до истечения времени и дождаться их завершения"""
+        user_ids = itertools.count(OPERATOR_USER_ID_START)
+        for flow in ("sell", "fight"):
+            self._operators[flow] = asyncio.Queue()
+            for _ in range(self.operators):
+                self._operators[flow].put_nowait(next(user_ids))
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.duration
+        flows: set[asyncio.Task] = set()
+
+        async def _arrivals(flow: str, rate: float) -> None:
+            while True:
+                await asyncio.sleep(self._random.expovariate(rate))
+                if loop.time() >= deadline:
+                    return
+                task = asyncio.create_task(self._run_flow(flow))
+                flows.add(task)
+                task.add_done_callback(flows.discard)
+
+        logger.info(f"Starting load test for {self.duration}s with rates {self.rates}")
+        await asyncio.gather(
+            *(_arrivals(flow, rate) for flow, rate in self.rates.items() if rate > 0)
+        )
+        if flows:
+            logger.info(f"Waiting for {len(flows)} flows to finish")
+            await asyncio.wait(flows)
+        logger.success("Done load test")
+
+    async def _run_flow(self, flow: str) -> None:
+        self.report.flows_started[flow] += 1
+        if flow in self._operators:
+            user_id = await self._operators[flow].get()
+            try:
+                done = await getattr(self, f"_{flow}_flow")(user_id)
+            finally:
+                self._operators[flow].put_nowait(user_id)
+        else:
+            done = await getattr(self, f"_{flow}_flow")()
+        if done:
+            self.report.flows_done[flow] += 1
+
+    async def _help_flow(self) -> bool:
+        chat_id = self._random.choice(self.config.chats.all_chat_ids)
+        return await self._send(chat_id, self._random_user_id(), "/help")
+
+    async def _map_flow(self) -> bool:
+        chat_id = self._random.choice(self.config.chats.all_chat_ids)
+        key = self.config.keyboard["show_districts_map"].key
+        return await self._send(chat_id, self._random_user_id(), key)
+
+    async def _sell_flow(self, user_id: int) -> bool:
+        chat_id = self.config.chats.bank
+        district_owners = self._app.bot_data.districts_map_view.district_owners
+        free_district_names = [name for name, owner in district_owners.items() if owner is None]
+        team_idx = self._random.randrange(len(self.config.chats.teams))
+        district_name = self._random.choice(free_district_names or list(district_owners))
+        start_key = self.config.keyboard["district_sell_start_choose_team"].key
+        if self.config.inline_keyboards:
+            district_idx = self.config.districts_map.distict_names.index(district_name)
+            return await self._send(chat_id, user_id, start_key) and await self._press_steps(
+                chat_id,
+                user_id,
+                [
+                    create_callback_data(SELL_CALLBACK_PREFIX, team_idx),
+                    create_callback_data(SELL_CALLBACK_PREFIX, team_idx, district_idx),
+                    create_callback_data(
+                        SELL_CALLBACK_PREFIX, team_idx, district_idx, SELL_CALLBACK_CONFIRMED
+                    ),
+                ],
+            )
+        steps = [
+            start_key,
+            self.config.chats.teams[team_idx].name,
+            district_name,
+            self.config.keyboard["district_sell_confirmed"].key,
+        ]
+        return await self._send_steps(chat_id, user_id, steps)
+
+    async def _fight_flow(self, user_id: int) -> bool:
+        chat_id = self.config.chats.fight
+        teams = self.config.chats.teams
+        assaulter_idx, defender_idx = self._random.sample(range(len(teams)), 2)
+        winner = self._random.choice(FIGHT_CALLBACK_WINNERS)
+        assaulter, defender = teams[assaulter_idx], teams[defender_idx]
+        winner_team, loser = (assaulter, defender) if winner == "a" else (defender, assaulter)
+        start_key = self.config.keyboard["district_fight_start_choose_assaulter"].key
+        fight_values = (assaulter_idx, defender_idx, winner)
+        if self.config.inline_keyboards:
+            done = await self._send(chat_id, user_id, start_key) and await self._press_steps(
+                chat_id,
+                user_id,
+                [
+                    create_callback_data(FIGHT_CALLBACK_PREFIX, *fight_values[:step])
+                    for step in range(1, len(fight_values) + 1)
+                ],
+            )
+        else:
+            done = await self._send_steps(
+                chat_id, user_id, [start_key, assaulter.name, defender.name, winner_team.name]
+            )
+        if not done:
+            return False
+
+        district_owners = self._app.bot_data.districts_map_view.district_owners
+        loser_district_names = [
+            name for name, owner in district_owners.items() if owner == loser.chat_id
+        ]
+        if self.config.inline_keyboards:
+            if not loser_district_names:
+                return await self._press(chat_id, user_id, CANCEL_CALLBACK_DATA)
+            district_idx = self.config.districts_map.distict_names.index(
+                self._random.choice(loser_district_names)
+            )
+            return await self._press(
+                chat_id,
+                user_id,
+                create_callback_data(FIGHT_CALLBACK_PREFIX, *fight_values, district_idx),
+            )
+        if not loser_district_names:
+            return await self._send(chat_id, user_id, self.config.keyboard["cancel"].key)
+        return await self._send(chat_id, user_id, self._random.choice(loser_district_names))
+
+    async def _send_steps(self, chat_id: int, user_id: int, steps: list[str]) -> bool:
+        for step in steps:
+            if not await self._send(chat_id, user_id, step):
+                return False
+            if self.think_time:
+                await asyncio.sleep(self._random.expovariate(1 / self.think_time))
+        return True
+
+    async def _press_steps(self, chat_id: int, user_id: int, steps: list[str]) -> bool:
+        for step in steps:
+            if not await self._press(chat_id, user_id, step):
+                return False
+            if self.think_time:
+                await asyncio.sleep(self._random.expovariate(1 / self.think_time))
+        return True
+
+    def _random_user_id(self) -> int:
+        return OPERATOR_USER_ID_START + 2 * self.operators + self._random.randrange(1000)
+
+    async def _send(self, chat_id: int, user_id: int, text: str) -> bool:
+        """Отправить сообщение в очередь обновлений и дождаться завершения обработчика"""
+        update_id = next(self._update_ids)
+        message: dict[str, Any] = {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup", "title": str(chat_id)},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"Operator {user_id}"},
+            "text": text,
+        }
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+
+        future = await self._put({"update_id": update_id, "message": message})
+        if await self._wait(update_id, future):
+            return True
+        if not future.done():
+            logger.warning(f"Update {update_id} with text {text} was not handled in chat {chat_id}")
+        return False
+
+    async def _press(self, chat_id: int, user_id: int, data: str) -> bool:
+        """Нажать встроенную клавишу под сообщением бота и дождаться завершения обработчика"""
+        update_id = next(self._update_ids)
+        callback_query: dict[str, Any] = {
+            "id": str(update_id),
+            "from": {"id": user_id, "is_bot": False, "first_name": f"Operator {user_id}"},
+            "chat_instance": str(chat_id),
+            "data": data,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "supergroup", "title": str(chat_id)},
+                "text": "",
+            },
+        }
+        future = await self._put({"update_id": update_id, "callback_query": callback_query})
+        if await self._wait(update_id, future):
+            return True
+        if not future.done():
+            logger.warning(f"Update {update_id} with data {data} was not handled in chat {chat_id}")
+        return False
@@ -0,0 +1,126 @@
+import argparse
+import asyncio
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+from telegram import Update
+
+from src.data.config import Config, create_config
+from src.loadtest.harness import LOAD_SCHEMA_PREFIX, LoadStand
+from src.observability.logs import setup_logging
+from src.tg.update_recorder import read_recording
+
+
+class UpdatesReplay(LoadStand):
+    """
+    Воспроизведение записи входящих событий
+
+    События подаются с исходными интервалами, ускоренными в `speed` раз, или без пауз,
+    если скорость не задана. Событие подаётся не раньше, чем обработано предыдущее событие
+    того же пользователя в том же чате, иначе шаги общения при ускорении обгоняют друг друга.
+    События, не подходящие ни одному обработчику (например, обычные сообщения в чатах),
+    учитываются в отчёте как необработанные и не задерживают следующие события отправителя
+    """
+
+    UPDATE_TIMEOUT = 10.0
+
+    def __init__(
+        self,
+        config: Config,
+        recording: Path,
+        speed: float | None = 1.0,
+        api_latency: float = 0.0,
+        storage_latency: float = 0.0,
+    ) -> None:
+        super().__init__(config, api_latency, storage_latency)
+        self.recording = recording
+        self.speed = speed
+
+    async def _load(self) -> None:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        first_time: float | None = None
+        replays: list[asyncio.Task[bool]] = []
+        last_replay_by_sender: dict[tuple[int | None, int | None], asyncio.Task[bool]] = {}
+
+        logger.info(f"Replaying {self.recording} at speed {self.speed or 'max'}")
+        for recorded_time, update_data in read_recording(self.recording):
+            if first_time is None:
+                first_time = recorded_time
+            if self.speed:
+                delay = (recorded_time - first_time) / self.speed - (loop.time() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            update = Update.de_json(update_data, self._app.bot)
+            sender = (
+                update.effective_chat.id if update.effective_chat else None,
+                update.effective_user.id if update.effective_user else None,
+            )
+            replay = asyncio.create_task(
+                self._replay_update(update_data, last_replay_by_sender.get(sender))
+            )
+            last_replay_by_sender[sender] = replay
+            replays.append(replay)
+
+        if replays:
+            await asyncio.wait(replays)
+        logger.success(f"Done replaying {len(replays)} updates")
+
+    async def _replay_update(
+        self, update_data: dict[str, Any], previous: asyncio.Task[bool] | None
+    ) -> bool:
+        if previous:
+            await asyncio.wait([previous])
+        future = await self._put(update_data)
+        return await self._wait(update_data["update_id"], future)
+
+
+def parse_speed(value: str) -> float | None:
+    """Скорость воспроизведения: множитель или `max`"""
+    if value == "max":
+        return None
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed should be positive or max")
+    return speed
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.loadtest.replay",
+        description="Воспроизведение записи входящих событий с имитацией Bot API и MinIO",
+    )
+    parser.add_argument("recording", type=Path, help="запись UPDATES_RECORD_PATH")
+    parser.add_argument(
+        "--speed", type=parse_speed, default=1.0, help="ускорение воспроизведения или max"
+    )
+    parser.add_argument("--api-latency", type=float, default=0.05, help="задержка Bot API, с")
+    parser.add_argument("--storage-latency", type=float, default=0.01, help="задержка MinIO, с")
+    parser.add_argument(
+        "--pg-schema",
+        default=LOAD_SCHEMA_PREFIX,
+        help=f"схема БД стенда, должна начинаться с {LOAD_SCHEMA_PREFIX}",
+    )
+    parser.add_argument("--log-level", default="WARNING", help="уровень лога бота")
+    parser.add_argument("--json", type=Path, default=None, help="сохранить отчёт в JSON")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    config = create_config().model_copy(update={"pg_schema": args.pg_schema})
+    setup_logging([config], args.log_level)
+
+    replay = UpdatesReplay(
+        config,
+        args.recording,
+        speed=args.speed,
+        api_latency=args.api_latency,
+        storage_latency=args.storage_latency,
+    )
+    report = asyncio.run(replay.run())
+    print(report.format())  # noqa: T201
+    if args.json:
+        report.save(args.json)
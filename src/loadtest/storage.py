@@ -0,0 +1,57 @@
+import asyncio
+import hashlib
+from io import BytesIO
+
+from loguru import logger
+
+from src.data.minio_client import MinIOClient
+from src.observability.metrics import STORAGE_BYTES
+
+
+class InMemoryMinIOClient(MinIOClient):
+    """
+    MinIO в памяти процесса для нагрузочного тестирования
+
+    Повторяет поведение `MinIOClient`, в том числе замеры операций, с заданной задержкой.
+    Пустой бакет заполняется исходниками карты при инициализации данных бота как обычно
+    """
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.host = "memory"
+        self._minio_secure = False
+        self.base_url = "memory://"
+        self._semaphore = asyncio.Semaphore(50)
+        self.latency = latency
+        self._buckets: dict[str, dict[str, tuple[bytes, str]]] = {}
+
+    async def _put_object(
+        self, bucket: str, filename: str, bio: BytesIO, content_type: str
+    ) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self._buckets.setdefault(bucket, {})[filename] = (bio.getvalue(), content_type)
+
+    async def download(self, bucket: str, filename: str) -> tuple[BytesIO | None, str | None]:
+        with self._measure("download", filename):
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            stored = self._buckets.get(bucket, {}).get(filename)
+        if stored is None:
+            logger.info(f"File {filename} not found in memory bucket {bucket}")
+            return None, "application/octet-stream"
+        file_bytes, content_type = stored
+        STORAGE_BYTES.inc("download", amount=len(file_bytes))
+        return BytesIO(file_bytes), content_type
+
+    async def stat(self, bucket: str, filename: str) -> str | None:
+        with self._measure("stat", filename):
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            stored = self._buckets.get(bucket, {}).get(filename)
+        if stored is None:
+            return None
+        file_bytes, _ = stored
+        return f"{hashlib.md5(file_bytes).hexdigest()}:{len(file_bytes)}"
+
+    async def create_bucket_and_check_if_empty(self, bucket: str) -> bool:
+        return not self._buckets.setdefault(bucket, {})
@@ -1,31 +1,93 @@
-from loguru import logger
-from telegram.ext import Application, ContextTypes
+import os
+from pathlib import Path
 
-from src.configurator import Configurator
-from src.data.config import create_config
-from src.handlers.error import error_handler
-from src.tg.context import Context
-from src.tg.persistence import Persistence
+from src.observability.startup import STARTUP
+
+
+def run_game() -> None:
+    """Запустить одну игру с конфигом `config/config.yaml`"""
+    from src.application import create_application
+    from src.data.config import create_config
+    from src.observability.logs import setup_logging
+    from src.observability.tracing import TRACER
+
+    STARTUP.mark("imports")
 
-if __name__ == "__main__":
-    logger.info("Starting...")
     config = create_config()
+    setup_logging([config])
+    TRACER.configure(config.tracing_export_path, config.tracing_slow_threshold)
+    STARTUP.mark("config")
+
+    app = create_application(config)
+    STARTUP.mark("application")
+    if config.webhook_url:
+        import asyncio
+
+        from src.tg.runner import run_applications
+
+        asyncio.run(run_applications([(app, config)]))
+    else:
+        app.run_polling()
+
+
+def run_games(games_config_dir: Path) -> None:
+    """
+    Запустить в одном процессе игры с конфигами из каталога
+
+    Игры разделяют пул соединений с БД, клиент MinIO и пул потоков отрисовки карт,
+    процессные настройки (метрики, трассировка, наблюдение за циклом событий) берутся
+    из конфига первой игры
+    """
+    import asyncio
 
-    persistence = Persistence(config)
-    configurator = Configurator(config)
-
-    app = (
-        Application.builder()
-        .token(config.token)
-        .post_init(configurator.application_post_init)
-        .persistence(persistence)
-        .context_types(ContextTypes(Context))
-        .build()
-    )
-    app.add_error_handler(error_handler, block=False)
-    app.add_handlers(configurator.create_basic_handlers())
-    app.add_handler(configurator.create_district_sell_conversation_handler())
-    app.add_handler(configurator.create_district_fight_conversation_handler())
-    app.run_polling()
+    from src.application import create_application
+    from src.data.config import create_game_configs
+    from src.data.shared_resources import SharedResources
+    from src.observability.logs import setup_logging
+    from src.observability.tracing import TRACER
+    from src.tg.persistence import Persistence
+    from src.tg.runner import run_applications
+
+    STARTUP.mark("imports")
+
+    configs = create_game_configs(games_config_dir)
+    first_config = next(iter(configs.values()))
+    setup_logging(list(configs.values()))
+    TRACER.configure(first_config.tracing_export_path, first_config.tracing_slow_threshold)
+    STARTUP.mark("config")
+
+    resources = SharedResources(first_config)
+    games = [
+        (
+            create_application(
+                config,
+                Persistence(config, resources=resources),
+                game_config_path=config_path,
+                process_services=config is first_config,
+            ),
+            config,
+        )
+        for config_path, config in configs.items()
+    ]
+    STARTUP.mark("application")
+    asyncio.run(run_applications(games, resources))
+
+
+if __name__ == "__main__":
+    STARTUP.install_import_timer()
+
+    from dotenv import find_dotenv, load_dotenv
+    from loguru import logger
+
+    from src.observability.tracing import TRACER
+
+    logger.info("Starting...")
+    load_dotenv(find_dotenv())
+    games_config_dir = os.getenv("GAMES_CONFIG_DIR")
+    if games_config_dir:
+        run_games(Path(games_config_dir))
+    else:
+        run_game()
+    TRACER.shutdown()
 
     logger.info("Done! Have a great day!")
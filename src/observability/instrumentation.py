@@ -0,0 +1,64 @@
+import functools
+import time
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from loguru import logger
+from telegram import Update
+
+from src.observability.metrics import HANDLER_DURATION, HANDLER_ERRORS
+from src.observability.tracing import TRACER
+from src.tg.context import Context
+
+T = TypeVar("T")
+UpdateT = TypeVar("UpdateT")
+
+handler_observer = Callable[[str, object, float, BaseException | None], None]
+"""Наблюдатель завершения обработчика: имя обработчика, событие, длительность и ошибка"""
+
+HANDLER_OBSERVERS: list[handler_observer] = []
+"""Наблюдатели завершения обработчиков, используются нагрузочным тестированием"""
+
+
+def instrument_handler(
+    callback: Callable[[UpdateT, Context], Awaitable[T]],
+) -> Callable[[UpdateT, Context], Awaitable[T]]:
+    """
+    Обернуть обработчик замером длительности и подсчётом ошибок по его имени
+
+    Обработчик выполняется в отрезке трассировки, который начинает трассировку события,
+    записи лога обработчика и запущенных им задач получают поля обработчика и чата
+    """
+    handler_name = callback.__name__
+
+    @functools.wraps(callback)
+    async def instrumented_callback(update: UpdateT, context: Context) -> T:
+        chat_id = (
+            update.effective_chat.id
+            if isinstance(update, Update) and update.effective_chat
+            else None
+        )
+        start = time.perf_counter()
+        error: BaseException | None = None
+        try:
+            with (
+                logger.contextualize(
+                    handler=handler_name,
+                    chat_id=chat_id,
+                    chat_func=context.bot_data.config.chats.chat_id_to_func.get(chat_id),
+                    game=context.bot_data.config.game,
+                ),
+                TRACER.span(f"handler {handler_name}", chat_id=chat_id),
+            ):
+                return await callback(update, context)
+        except Exception as e:
+            HANDLER_ERRORS.inc(handler_name)
+            error = e
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            HANDLER_DURATION.observe(duration, handler_name)
+            for observer in HANDLER_OBSERVERS:
+                observer(handler_name, update, duration, error)
+
+    return instrumented_callback
@@ -0,0 +1,194 @@
+import json
+import sys
+import time
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger
+
+from src.data.config import Config
+from src.observability.metrics import LOG_RECORDS_SAMPLED
+from src.observability.tracing import add_trace_id_to_log_record
+
+if TYPE_CHECKING:
+    from loguru import Message, Record
+
+LOG_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | "
+    "<dim>{extra[trace_id]}</dim> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+)
+"""Формат стандартного лога с идентификатором трассировки"""
+
+REDACTED = "***"
+"""Замена секретов в логе"""
+
+SECRET_MIN_LENGTH = 4
+"""Минимальная длина скрываемого значения, чтобы не заменять в логе короткие совпадения"""
+
+SAMPLED_LEVEL_NO = 30
+"""Записи ниже этого уровня (`WARNING`) прореживаются по месту в коде"""
+
+
+def config_secrets(configs: list[Config]) -> list[str]:
+    """Значения конфигов, которые не должны попадать в лог"""
+    secrets = {
+        secret
+        for config in configs
+        for secret in (
+            config.token,
+            config.pg_password,
+            config.minio_root_password,
+            config.webhook_secret_token,
+        )
+        if secret and len(secret) >= SECRET_MIN_LENGTH
+    }
+    return sorted(secrets, key=len, reverse=True)
+
+
+class LogFilter:
+    """
+    Отбор записей лога: уровни по логгерам и прореживание повторяющихся записей
+
+    Уровень записи определяется самым длинным совпадающим префиксом имени модуля в `levels`.
+    Записи ниже `WARNING` из одного места в коде пропускаются не чаще `sample_rate`
+    в секунду, количество пропущенных добавляется к следующей пропущенной в лог записи
+    из того же места. Если места, где записи прореживались, затихли дольше чем на секунду,
+    их количество добавляется к ближайшей пропущенной в лог записи из любого места.
+    Выполняется в потоке, который пишет в лог, поэтому только сравнивает и считает
+    """
+
+    def __init__(self, level: str, levels: dict[str, str], sample_rate: float | None) -> None:
+        self._level_no = logger.level(level).no
+        self._levels = {name: logger.level(level).no for name, level in levels.items()}
+        self._name_level_no: dict[str | None, int] = {}
+        self._sample_rate = sample_rate
+        self._windows: dict[tuple[str | None, int], list[float]] = {}
+        self._expired_check = 0.0
+
+    def _level_no_for(self, name: str | None) -> int:
+        level_no = self._name_level_no.get(name)
+        if level_no is None:
+            matched = [
+                prefix
+                for prefix in self._levels
+                if name and (name == prefix or name.startswith(f"{prefix}."))
+            ]
+            level_no = self._levels[max(matched, key=len)] if matched else self._level_no
+            self._name_level_no[name] = level_no
+        return level_no
+
+    def __call__(self, record: "Record") -> bool:
+        level_no = record["level"].no
+        if level_no < self._level_no_for(record["name"]):
+            return False
+        if not self._sample_rate:
+            return True
+
+        now = time.monotonic()
+        if level_no >= SAMPLED_LEVEL_NO:
+            self._add_expired_sampled(record, now)
+            return True
+        key = (record["name"], record["line"])
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= 1.0:
+            sampled = int(window[2]) if window else 0
+            self._windows[key] = [now, 1, 0]
+            if sampled:
+                record["message"] += f" [{sampled} similar records sampled out]"
+            self._add_expired_sampled(record, now)
+            return True
+        if window[1] < self._sample_rate:
+            window[1] += 1
+            self._add_expired_sampled(record, now)
+            return True
+        window[2] += 1
+        LOG_RECORDS_SAMPLED.inc()
+        return False
+
+    def _add_expired_sampled(self, record: "Record", now: float) -> None:
+        """
+        Добавить к записи количество пропущенных записей из мест, окно которых закончилось
+
+        Закончившиеся окна удаляются, места проверяются не чаще раза в секунду
+        """
+        if now - self._expired_check < 1.0:
+            return
+        self._expired_check = now
+        expired = [key for key, window in self._windows.items() if now - window[0] >= 1.0]
+        for name, line in expired:
+            sampled = int(self._windows.pop((name, line))[2])
+            if sampled:
+                record["message"] += f" [{sampled} records from {name}:{line} sampled out]"
+
+
+class LogSink:
+    """
+    Запись лога в stderr со скрытием секретов, выполняется в фоновом потоке loguru
+
+    В формате JSON каждая запись - одна строка, контекст записи: идентификатор трассировки,
+    чат, функция чата, обработчик и игра - со скрытыми секретами лежит в поле `extra`
+    """
+
+    def __init__(self, secrets: list[str], *, json_logs: bool) -> None:
+        self._secrets = secrets
+        self._json_logs = json_logs
+
+    def _redact(self, text: str) -> str:
+        for secret in self._secrets:
+            if secret in text:
+                text = text.replace(secret, REDACTED)
+        return text
+
+    def _redact_value(self, value: Any) -> Any:
+        """Скрыть секреты в значении контекста, значения без строк остаются как есть"""
+        if isinstance(value, str):
+            return self._redact(value)
+        if isinstance(value, dict):
+            return {str(key): self._redact_value(item) for key, item in value.items()}
+        if isinstance(value, list | tuple | set):
+            return [self._redact_value(item) for item in value]
+        if value is None or isinstance(value, int | float):
+            return value
+        return self._redact(str(value))
+
+    def __call__(self, message: "Message") -> None:
+        if not self._json_logs:
+            sys.stderr.write(self._redact(message))
+            sys.stderr.flush()
+            return
+
+        record = message.record
+        entry: dict[str, Any] = {
+            "time": record["time"].isoformat(),
+            "level": record["level"].name,
+            "logger": record["name"],
+            "function": record["function"],
+            "line": record["line"],
+            "message": self._redact(record["message"]),
+            "extra": self._redact_value(record["extra"]),
+        }
+        exception = message[len(record["message"]) :].strip()
+        if record["exception"] and exception:
+            entry["exception"] = self._redact(exception)
+        sys.stderr.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        sys.stderr.flush()
+
+
+def setup_logging(configs: list[Config], level: str | None = None) -> None:
+    """
+    Настроить лог процесса по первому конфигу, секреты скрываются для всех конфигов
+
+    Записи передаются в фоновый поток через очередь loguru, поэтому запись в stderr,
+    скрытие секретов и JSON не задерживают цикл событий. `level` заменяет уровень из конфига
+    """
+    config = configs[0]
+    logger.configure(patcher=add_trace_id_to_log_record)
+    logger.remove()
+    logger.add(
+        LogSink(config_secrets(configs), json_logs=config.log_json),
+        format="{message}" if config.log_json else LOG_FORMAT,
+        level=0,
+        filter=LogFilter(level or config.log_level, config.log_levels, config.log_sample_rate),
+        colorize=not config.log_json and sys.stderr.isatty(),
+        enqueue=True,
+    )
@@ -0,0 +1,30 @@
+import sys
+from typing import Any
+
+from pydantic import BaseModel
+
+
+def get_object_size(obj: Any) -> int:
+    """
+    Оценка памяти, занятой объектом и всеми достижимыми из него контейнерами
+
+    Учитываются словари, списки, кортежи, множества и модели pydantic, каждый объект
+    считается один раз
+    """
+    seen: set[int] = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, BaseModel):
+            stack.append(item.__dict__)
+        elif isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, list | tuple | set | frozenset):
+            stack.extend(item)
+    return size
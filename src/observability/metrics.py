@@ -0,0 +1,325 @@
+import abc
+import math
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+from loguru import logger
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+"""Границы корзин гистограмм по умолчанию в секундах"""
+
+OVERFLOW_LABEL = "other"
+"""Значение метки для серий сверх ограничения количества серий метрики"""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return (
+        "{"
+        + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in labels.items())
+        + "}"
+    )
+
+
+class _Metric(abc.ABC):
+    """Базовая метрика с ограниченным количеством серий"""
+
+    type_name = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        max_series: int = 64,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.max_series = max_series
+        self._overflowed = False
+        REGISTRY.register(self)
+
+    def _key(self, label_values: tuple[str, ...], series: dict) -> tuple[str, ...]:
+        """Ключ серии, при превышении количества серий метки заменяются на `OVERFLOW_LABEL`"""
+        if len(label_values) != len(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}")
+        if label_values in series or len(series) < self.max_series:
+            return label_values
+        if not self._overflowed:
+            self._overflowed = True
+            logger.warning(f"Metric {self.name} exceeded {self.max_series} series")
+        return tuple(OVERFLOW_LABEL for _ in label_values)
+
+    def _labels(self, key: tuple[str, ...], **extra: str) -> dict[str, str]:
+        return dict(zip(self.labelnames, key, strict=True)) | extra
+
+    def render(self) -> list[str]:
+        """Представление метрики в текстовом формате Prometheus"""
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self._render_samples(),
+        ]
+
+    @abc.abstractmethod
+    def _render_samples(self) -> list[str]:
+        """Строки значений серий метрики"""
+
+
+class Counter(_Metric):
+    """Монотонно возрастающий счётчик"""
+
+    type_name = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        max_series: int = 64,
+    ) -> None:
+        self._values: dict[tuple[str, ...], float] = {}
+        super().__init__(name, documentation, labelnames, max_series)
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        key = self._key(label_values, self._values)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self._labels(key))} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(_Metric):
+    """Значение, которое может как расти, так и уменьшаться"""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        max_series: int = 64,
+    ) -> None:
+        self._values: dict[tuple[str, ...], float] = {}
+        self._functions: dict[tuple[str, ...], Callable[[], float]] = {}
+        super().__init__(name, documentation, labelnames, max_series)
+
+    def set(self, value: float, *label_values: str) -> None:
+        self._values[self._key(label_values, self._values)] = value
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        key = self._key(label_values, self._values)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *label_values: str, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    def get(self, *label_values: str) -> float:
+        if label_values in self._functions:
+            return self._functions[label_values]()
+        return self._values.get(label_values, 0)
+
+    def set_function(self, function: Callable[[], float], *label_values: str) -> None:
+        """Вычислять значение в момент сбора метрик"""
+        self._functions[self._key(label_values, self._functions)] = function
+
+    def collect(self) -> dict[tuple[str, ...], float]:
+        """Значения всех серий, включая вычисляемые"""
+        values = dict(self._values)
+        for key, function in self._functions.items():
+            try:
+                values[key] = function()
+            except Exception as e:
+                logger.warning(f"Metric {self.name} function failed: {e}")
+        return values
+
+    def _render_samples(self) -> list[str]:
+        values = self.collect()
+        return [
+            f"{self.name}{_format_labels(self._labels(key))} {_format_value(value)}"
+            for key, value in values.items()
+        ]
+
+
+class _HistogramSeries:
+    """Серия гистограммы"""
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram(_Metric):
+    """Гистограмма распределения значений по корзинам"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        max_series: int = 64,
+    ) -> None:
+        self.buckets = (*sorted(buckets), math.inf)
+        self._series: dict[tuple[str, ...], _HistogramSeries] = {}
+        super().__init__(name, documentation, labelnames, max_series)
+
+    def observe(self, value: float, *label_values: str) -> None:
+        key = self._key(label_values, self._series)
+        series = self._series.get(key)
+        if not series:
+            series = self._series[key] = _HistogramSeries(self.buckets)
+        for idx, bucket in enumerate(self.buckets):
+            if value <= bucket:
+                series.bucket_counts[idx] += 1
+                break
+        series.count += 1
+        series.sum += value
+
+    @contextmanager
+    def time(self, *label_values: str) -> Iterator[None]:
+        """Замерить длительность выполнения блока"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def _render_samples(self) -> list[str]:
+        samples = []
+        for key, series in self._series.items():
+            cumulative = 0
+            for bucket, bucket_count in zip(self.buckets, series.bucket_counts, strict=True):
+                cumulative += bucket_count
+                labels = self._labels(key, le=_format_value(bucket))
+                samples.append(f"{self.name}_bucket{_format_labels(labels)} {cumulative}")
+            labels = _format_labels(self._labels(key))
+            samples.append(f"{self.name}_sum{labels} {_format_value(series.sum)}")
+            samples.append(f"{self.name}_count{labels} {series.count}")
+        return samples
+
+
+class MetricsRegistry:
+    """Реестр метрик приложения"""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        lines = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HANDLER_DURATION = Histogram(
+    "bot_handler_duration_seconds", "Длительность обработчиков сообщений", ("handler",)
+)
+HANDLER_ERRORS = Counter("bot_handler_errors_total", "Ошибки обработчиков сообщений", ("handler",))
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "bot_db_pool_checkout_wait_seconds",
+    "Ожидание соединения из пула БД по операциям BotData",
+    ("operation",),
+)
+DB_OPERATION_DURATION = Histogram(
+    "bot_db_operation_duration_seconds",
+    "Длительность операций BotData с БД после получения соединения",
+    ("operation",),
+)
+DB_POOL_CHECKED_OUT = Gauge("bot_db_pool_checked_out", "Занятые соединения пула БД")
+
+STORAGE_DURATION = Histogram(
+    "bot_storage_duration_seconds", "Длительность операций с MinIO", ("operation",)
+)
+STORAGE_BYTES = Counter("bot_storage_bytes_total", "Переданные в MinIO байты", ("operation",))
+STORAGE_ERRORS = Counter("bot_storage_errors_total", "Ошибки операций с MinIO", ("operation",))
+
+RENDER_STAGE_DURATION = Histogram(
+    "bot_districts_map_stage_duration_seconds",
+    "Длительность этапов обновления карты райончиков",
+    ("stage",),
+)
+
+NOTIFICATIONS_PENDING = Gauge(
+    "bot_notifications_pending", "Уведомления, ожидающие отправки фоновыми задачами"
+)
+
+LOOP_LAG = Histogram(
+    "bot_event_loop_lag_seconds",
+    "Задержка планирования цикла событий",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_BLOCKS = Counter("bot_event_loop_blocks_total", "Блокировки цикла событий дольше порога")
+PROCESS_RSS = Gauge("bot_process_rss_bytes", "Резидентная память процесса")
+
+GAME_DB_SESSIONS = Gauge("bot_game_db_sessions", "Открытые сессии БД по играм", ("game",))
+GAME_MEMORY = Gauge("bot_game_memory_bytes", "Оценка памяти состояния по играм", ("game",))
+
+LOG_RECORDS_SAMPLED = Counter(
+    "bot_log_records_sampled_total", "Повторяющиеся записи лога, пропущенные прореживанием"
+)
+
+STARTUP_DURATION = Gauge(
+    "bot_startup_duration_seconds", "Длительность этапов запуска процесса", ("phase",)
+)
+
+TELEGRAM_REQUEST_DURATION = Histogram(
+    "bot_telegram_request_duration_seconds",
+    "Длительность запросов к Telegram Bot API",
+    ("method",),
+)
+TELEGRAM_REQUEST_ERRORS = Counter(
+    "bot_telegram_request_errors_total",
+    "Ошибки запросов к Telegram Bot API",
+    ("method", "error"),
+)
+TELEGRAM_POOL_IN_FLIGHT = Gauge(
+    "bot_telegram_pool_in_flight", "Выполняющиеся запросы к Telegram Bot API по пулам", ("pool",)
+)
+TELEGRAM_POOL_WAIT = Histogram(
+    "bot_telegram_pool_wait_seconds",
+    "Ожидание свободного соединения пула Telegram Bot API",
+    ("pool",),
+)
+
+STANDINGS_BROADCAST_SENDS = Counter(
+    "bot_standings_broadcast_sends_total",
+    "Отправки рассылки положения команд: загрузкой карты, по id файла и с ошибкой",
+    ("result",),
+)
+
+REPLICA_LEADER = Gauge(
+    "bot_replica_leader", "Признак ведущей реплики, которая отрисовывает карту райончиков"
+)
+REPLICA_EVENTS = Counter(
+    "bot_replica_events_total", "События, полученные от других реплик", ("event",)
+)
@@ -0,0 +1,65 @@
+import asyncio
+import contextlib
+from collections.abc import Iterator
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+from src.observability.metrics import REGISTRY
+
+if TYPE_CHECKING:
+    import uvicorn
+    from fastapi import FastAPI
+
+
+def create_embedded_server(app: "FastAPI", host: str, port: int) -> "uvicorn.Server":
+    """Сервер uvicorn без перехвата сигналов - ими управляет приложение telegram"""
+    import uvicorn
+
+    class _Server(uvicorn.Server):
+        def install_signal_handlers(self) -> None:
+            pass
+
+        @contextlib.contextmanager
+        def capture_signals(self) -> Iterator[None]:
+            yield
+
+    return _Server(uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="off"))
+
+
+def _create_server(host: str, port: int) -> "uvicorn.Server":
+    """Сервер метрик, uvicorn и fastapi загружаются только при включённых метриках"""
+    from fastapi import FastAPI
+    from fastapi.responses import PlainTextResponse
+
+    async def _metrics() -> PlainTextResponse:
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+    app = FastAPI(docs_url=None, redoc_url=None, openapi_url=None)
+    app.add_api_route("/metrics", _metrics, response_class=PlainTextResponse)
+    return create_embedded_server(app, host, port)
+
+
+class MetricsServer:
+    """HTTP сервер для отдачи метрик в формате Prometheus"""
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self._server = _create_server(host, port)
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Запустить сервер в текущем цикле событий"""
+        logger.info(f"Starting metrics server on {self.host}:{self.port}")
+        self._task = asyncio.create_task(self._server.serve())
+
+    async def stop(self) -> None:
+        """Остановить сервер"""
+        if not self._task:
+            return
+        self._server.should_exit = True
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        logger.info("Metrics server stopped")
@@ -0,0 +1,163 @@
+import asyncio
+import functools
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+
+from loguru import logger
+
+from src.exceptions.profiler import ProfilerIsAlreadyRunningError
+
+frame_key = tuple[str, int, str]
+"""Файл, строка начала функции и имя функции"""
+
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("thread.py", "_worker"),
+    ("queue.py", "get"),
+}
+"""Функции, выборки в которых считаются ожиданием и не попадают в список горячих функций"""
+
+
+class ProfileResult:
+    """Результат профилирования по выборкам стеков"""
+
+    def __init__(self, duration: float, interval: float) -> None:
+        self.duration = duration
+        self.interval = interval
+        self.samples = 0
+        self.idle_samples = 0
+        self.self_counts: Counter[frame_key] = Counter()
+        self.total_counts: Counter[frame_key] = Counter()
+        self.stacks: Counter[str] = Counter()
+
+    def add_sample(self, thread_name: str, stack: list[frame_key]) -> None:
+        """Учесть выборку стека потока, стек от внешнего вызова к внутреннему"""
+        self.samples += 1
+        self.stacks[
+            ";".join(
+                [
+                    thread_name,
+                    *(f"{name} ({_file_name(file)}:{line})" for file, line, name in stack),
+                ]
+            )
+        ] += 1
+        if not stack:
+            return
+        file, _, name = stack[-1]
+        if (_file_name(file), name) in IDLE_FRAMES:
+            self.idle_samples += 1
+            return
+        self.self_counts[stack[-1]] += 1
+        for frame in set(stack):
+            self.total_counts[frame] += 1
+
+    def format_top(self, top_n: int) -> str:
+        """Самые горячие функции по собственному и суммарному времени"""
+        busy_samples = self.samples - self.idle_samples
+        lines = [
+            f"Profile {self.duration:.0f}s, interval {self.interval * 1000:.0f}ms: "
+            f"{self.samples} samples, {busy_samples} busy",
+            "",
+            "  self%  total%  function",
+        ]
+        for frame, self_count in self.self_counts.most_common(top_n):
+            file, line, name = frame
+            lines.append(
+                f"{self_count / max(busy_samples, 1) * 100:6.1f}  "
+                f"{self.total_counts[frame] / max(busy_samples, 1) * 100:6.1f}  "
+                f"{name} ({_short_path(file)}:{line})"
+            )
+        return "\n".join(lines)
+
+    def collapsed_stacks(self) -> bytes:
+        """Стеки в свёрнутом формате для flamegraph.pl и speedscope"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.items()).encode()
+
+
+@functools.cache
+def _file_name(file: str) -> str:
+    return Path(file).name
+
+
+def _short_path(file: str) -> str:
+    parts = Path(file).parts
+    if "src" in parts:
+        return "/".join(parts[parts.index("src") :])
+    return "/".join(parts[-2:])
+
+
+def _frame_stack(frame: FrameType | None) -> list[frame_key]:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class SamplingProfiler:
+    """
+    Профилировщик по выборкам стеков всех потоков процесса
+
+    Во время снятия профиля отдельный поток периодически считывает стеки цикла событий
+    и пула потоков, вне снятия профиля профилировщик не создаёт накладных расходов
+    """
+
+    INTERVAL = 0.005
+    """Интервал между выборками в секундах"""
+
+    MAX_DURATION = 120
+    """Максимальная длительность снятия профиля в секундах"""
+
+    def __init__(self) -> None:
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    @classmethod
+    def effective_duration(cls, duration: float) -> float:
+        """Длительность снятия профиля, ограниченная от 1 секунды до `MAX_DURATION`"""
+        return min(max(duration, 1), cls.MAX_DURATION)
+
+    async def capture(self, duration: float) -> ProfileResult:
+        """Снять профиль в течение заданного количества секунд"""
+        if self.running:
+            raise ProfilerIsAlreadyRunningError
+        async with self._lock:
+            duration = self.effective_duration(duration)
+            result = ProfileResult(duration, self.INTERVAL)
+            stop_event = threading.Event()
+            sampler = threading.Thread(
+                target=self._sample,
+                args=(result, stop_event),
+                name="sampling-profiler",
+                daemon=True,
+            )
+            logger.info(f"Starting profile capture for {duration}s")
+            sampler.start()
+            try:
+                await asyncio.sleep(duration)
+            finally:
+                stop_event.set()
+                await asyncio.get_running_loop().run_in_executor(None, sampler.join)
+            logger.info(f"Done profile capture with {result.samples} samples")
+            return result
+
+    def _sample(self, result: ProfileResult, stop_event: threading.Event) -> None:
+        sampler_thread_id = threading.get_ident()
+        while not stop_event.wait(self.INTERVAL):
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():  # noqa: SLF001
+                if thread_id == sampler_thread_id:
+                    continue
+                result.add_sample(thread_names.get(thread_id, str(thread_id)), _frame_stack(frame))
+
+
+PROFILER = SamplingProfiler()
@@ -0,0 +1,105 @@
+import builtins
+import importlib.util
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from typing import Any
+
+from loguru import logger
+
+from src.observability.metrics import STARTUP_DURATION
+
+TOP_IMPORTS = 10
+"""Количество пакетов с наибольшим временем импорта в отчёте о запуске"""
+
+
+class StartupProfile:
+    """
+    Профиль запуска процесса: длительности этапов и время импорта по пакетам
+
+    На время запуска `builtins.__import__` подменяется обёрткой, которая учитывает
+    собственное время импорта (без вложенных импортов других модулей) по пакетам верхнего
+    уровня. Учитываются только импорты в основном потоке. После отчёта об окончании
+    запуска обёртка снимается
+    """
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self.import_times: Counter[str] = Counter()
+        self._last_mark = self.start
+        self._import_stack: list[float] = []
+        self._thread_id = threading.get_ident()
+        self._original_import: Callable[..., Any] | None = None
+
+    def install_import_timer(self) -> None:
+        """Начать учёт времени импорта"""
+        if self._original_import:
+            return
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def uninstall_import_timer(self) -> None:
+        """Закончить учёт времени импорта"""
+        if self._original_import:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(
+        self,
+        name: str,
+        globals: dict[str, Any] | None = None,  # noqa: A002
+        locals: dict[str, Any] | None = None,  # noqa: A002
+        fromlist: tuple[str, ...] = (),
+        level: int = 0,
+    ) -> Any:
+        original_import = self._original_import or builtins.__import__
+        module_name = name
+        if level:
+            package = (globals or {}).get("__package__") or ""
+            module_name = importlib.util.resolve_name("." * level + name, package)
+        module = sys.modules.get(module_name)
+        if threading.get_ident() != self._thread_id or (
+            module is not None and all(hasattr(module, item) for item in fromlist or ())
+        ):
+            return original_import(name, globals, locals, fromlist, level)
+
+        start = time.perf_counter()
+        self._import_stack.append(0.0)
+        try:
+            return original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._import_stack.pop()
+            self.import_times[module_name.split(".", 1)[0]] += elapsed - nested
+            if self._import_stack:
+                self._import_stack[-1] += elapsed
+
+    def mark(self, phase: str) -> None:
+        """Завершить этап запуска, длительность считается от предыдущей отметки"""
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last_mark
+        STARTUP_DURATION.set(self.phases[phase], phase)
+        self._last_mark = now
+
+    def format(self) -> str:
+        """Отчёт о запуске: этапы и пакеты с наибольшим временем импорта"""
+        total = self._last_mark - self.start
+        phases = ", ".join(
+            f"{phase} {duration * 1000:.0f}ms" for phase, duration in self.phases.items()
+        )
+        imports = ", ".join(
+            f"{package} {duration * 1000:.0f}ms"
+            for package, duration in self.import_times.most_common(TOP_IMPORTS)
+        )
+        return f"Started in {total * 1000:.0f}ms: {phases}; slowest imports: {imports or 'not measured'}"
+
+    def report(self) -> None:
+        """Вывести отчёт о запуске в лог и снять учёт времени импорта"""
+        self.uninstall_import_timer()
+        logger.info(self.format())
+
+
+STARTUP = StartupProfile()
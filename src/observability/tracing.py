@@ -0,0 +1,245 @@
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+from collections.abc import Awaitable, Coroutine, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from loguru import Record
+
+T = TypeVar("T")
+
+SERVICE_NAME = "zhiguli-game-bot"
+"""Имя сервиса в экспортируемых трассировках"""
+
+
+class Span:
+    """Отрезок трассировки"""
+
+    def __init__(self, trace: "Trace", name: str, parent: "Span | None", **attributes: Any) -> None:
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent = parent
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+        self.error: str | None = None
+
+    @property
+    def duration(self) -> float:
+        """Длительность отрезка в секундах"""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def to_otlp(self) -> dict[str, Any]:
+        """Представление отрезка в формате OTLP/JSON"""
+        otlp_span: dict[str, Any] = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [
+                {"key": key, "value": {"stringValue": str(value)}}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent:
+            otlp_span["parentSpanId"] = self.parent.span_id
+        return otlp_span
+
+
+class Trace:
+    """Трассировка обработки одного события - дерево отрезков"""
+
+    def __init__(self, tracer: "Tracer") -> None:
+        self.tracer = tracer
+        self.trace_id = os.urandom(16).hex()
+        self.spans: list[Span] = []
+        self._holds = 0
+
+    def hold(self) -> None:
+        """Не завершать трассировку до вызова `release`"""
+        self._holds += 1
+
+    def release(self) -> None:
+        """Снять удержание трассировки, трассировка завершается вместе с последним удержанием"""
+        self._holds -= 1
+        if self._holds == 0:
+            self.tracer.finish(self)
+
+    @property
+    def root(self) -> Span:
+        return self.spans[0]
+
+    @property
+    def duration(self) -> float:
+        """Длительность от начала первого до окончания последнего отрезка в секундах"""
+        end_ns = max(span.end_ns or time.time_ns() for span in self.spans)
+        return (end_ns - self.root.start_ns) / 1e9
+
+    def format_tree(self) -> str:
+        """Дерево отрезков в читаемом виде"""
+        children: dict[str | None, list[Span]] = {}
+        for span in self.spans:
+            children.setdefault(span.parent.span_id if span.parent else None, []).append(span)
+
+        lines = []
+
+        def _format(span: Span, depth: int) -> None:
+            offset = (span.start_ns - self.root.start_ns) / 1e6
+            attributes = " ".join(f"{key}={value}" for key, value in span.attributes.items())
+            error = f" ERROR {span.error}" if span.error else ""
+            lines.append(
+                f"{'  ' * depth}{span.name} +{offset:.0f}ms {span.duration * 1000:.1f}ms"
+                f"{' ' + attributes if attributes else ''}{error}"
+            )
+            for child in sorted(children.get(span.span_id, []), key=lambda s: s.start_ns):
+                _format(child, depth + 1)
+
+        _format(self.root, 0)
+        return "\n".join(lines)
+
+    def to_otlp(self) -> dict[str, Any]:
+        """Представление трассировки в формате OTLP/JSON"""
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {"key": "service.name", "value": {"stringValue": SERVICE_NAME}}
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [span.to_otlp() for span in self.spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+class Tracer:
+    """
+    Лёгкая трассировка обработки событий
+
+    Отрезки привязываются к текущему контексту, поэтому задачи asyncio, созданные внутри отрезка,
+    продолжают трассировку родителя. Завершённые трассировки выгружаются в файл в формате OTLP/JSON
+    (по строке на трассировку, совместимо с приёмником `otlpjsonfile` OpenTelemetry Collector),
+    а трассировки дольше порога выводятся в лог целиком
+    """
+
+    def __init__(self) -> None:
+        self.slow_threshold: float | None = None
+        self._export_queue: queue.SimpleQueue[dict[str, Any] | None] | None = None
+        self._export_thread: threading.Thread | None = None
+
+    def configure(self, export_path: str | None, slow_threshold: float | None) -> None:
+        """Настроить выгрузку трассировок и порог медленных трассировок в секундах"""
+        self.slow_threshold = slow_threshold
+        if export_path and not self._export_thread:
+            self._export_queue = queue.SimpleQueue()
+            self._export_thread = threading.Thread(
+                target=self._export_loop,
+                args=(Path(export_path), self._export_queue),
+                name="trace-exporter",
+                daemon=True,
+            )
+            self._export_thread.start()
+            logger.info(f"Exporting traces to {export_path}")
+
+    def shutdown(self) -> None:
+        """Дождаться выгрузки накопленных трассировок"""
+        if self._export_queue and self._export_thread:
+            self._export_queue.put(None)
+            self._export_thread.join(timeout=5)
+            self._export_queue = None
+            self._export_thread = None
+
+    @staticmethod
+    def _export_loop(path: Path, export_queue: "queue.SimpleQueue[dict[str, Any] | None]") -> None:
+        with path.open("a", encoding="utf-8") as stream:
+            while (otlp_trace := export_queue.get()) is not None:
+                stream.write(json.dumps(otlp_trace, ensure_ascii=False) + "\n")
+                if export_queue.empty():
+                    stream.flush()
+
+    def finish(self, trace: Trace) -> None:
+        """Завершить трассировку: выгрузить и вывести в лог, если она медленная"""
+        if self._export_queue:
+            self._export_queue.put(trace.to_otlp())
+        if self.slow_threshold is not None and trace.duration >= self.slow_threshold:
+            logger.warning(
+                f"Slow trace {trace.trace_id} {trace.duration * 1000:.0f}ms:\n{trace.format_tree()}"
+            )
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """Отрезок трассировки, вне трассировки начинает новую"""
+        parent = _current_span.get()
+        trace = parent.trace if parent else Trace(self)
+        span = Span(trace, name, parent, **attributes)
+        trace.spans.append(span)
+        trace.hold()
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current_span.reset(token)
+            trace.release()
+
+    def detach(
+        self, name: str, coroutine: Awaitable[T], **attributes: Any
+    ) -> Coroutine[Any, Any, T]:
+        """
+        Обернуть корутину для запуска отдельной задачей в рамках текущей трассировки
+
+        Трассировка удерживается с момента вызова, поэтому не завершится до начала задачи
+        """
+        parent = _current_span.get()
+        if parent:
+            parent.trace.hold()
+
+        async def _traced() -> T:
+            try:
+                with self.span(name, **attributes):
+                    return await coroutine
+            finally:
+                if parent:
+                    parent.trace.release()
+
+        return _traced()
+
+
+TRACER = Tracer()
+
+
+def get_trace_id() -> str | None:
+    """Идентификатор текущей трассировки"""
+    span = _current_span.get()
+    return span.trace.trace_id if span else None
+
+
+def add_trace_id_to_log_record(record: "Record") -> None:
+    """Добавить идентификатор текущей трассировки в запись loguru"""
+    record["extra"].setdefault("trace_id", get_trace_id() or "-")
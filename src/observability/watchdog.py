@@ -0,0 +1,145 @@
+import asyncio
+import contextlib
+import resource
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+
+from loguru import logger
+
+from src.observability.metrics import (
+    DB_POOL_CHECKED_OUT,
+    GAME_DB_SESSIONS,
+    GAME_MEMORY,
+    LOOP_BLOCKS,
+    LOOP_LAG,
+    NOTIFICATIONS_PENDING,
+    PROCESS_RSS,
+)
+from src.tg.error_reporter import ErrorReporter
+
+
+def get_rss_bytes() -> int:
+    """Текущий размер резидентной памяти процесса"""
+    statm = Path("/proc/self/statm")
+    if statm.exists():
+        return int(statm.read_text().split()[1]) * resource.getpagesize()
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Watchdog:
+    """
+    Наблюдение за задержкой цикла событий и ресурсами процесса
+
+    Задача в цикле событий обновляет отметку времени с периодом `TICK`, отдельный поток
+    следит за отметкой и, если цикл заблокирован дольше порога, снимает стек потока цикла.
+    После разблокировки цикла блокировка выводится в лог и отправляется в чат администраторов
+    не чаще, чем раз в `ALERT_COOLDOWN`
+    """
+
+    TICK = 0.1
+    """Период обновления отметки времени цикла событий в секундах"""
+
+    RESOURCES_LOG_INTERVAL = 60.0
+    """Период вывода потребления ресурсов в лог в секундах"""
+
+    ALERT_COOLDOWN = 300.0
+    """Минимальный интервал между оповещениями о блокировке в секундах"""
+
+    def __init__(self, lag_threshold: float, error_reporter: ErrorReporter) -> None:
+        self.lag_threshold = lag_threshold
+        self._error_reporter = error_reporter
+        self._heartbeat = time.monotonic()
+        self._blocked_stack: str | None = None
+        self._last_alert: float | None = None
+        self._loop_thread_id: int | None = None
+        self._stop_event = threading.Event()
+        self._monitor: threading.Thread | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Запустить наблюдение в текущем цикле событий"""
+        logger.info(f"Starting watchdog with loop lag threshold {self.lag_threshold}s")
+        self._loop_thread_id = threading.get_ident()
+        PROCESS_RSS.set_function(get_rss_bytes)
+        self._heartbeat = time.monotonic()
+        self._stop_event.clear()
+        self._monitor = threading.Thread(target=self._monitor_loop, name="watchdog", daemon=True)
+        self._monitor.start()
+        self._task = asyncio.create_task(self._tick_loop())
+
+    async def stop(self) -> None:
+        """Остановить наблюдение"""
+        self._stop_event.set()
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._monitor:
+            self._monitor.join(timeout=1)
+            self._monitor = None
+
+    async def _tick_loop(self) -> None:
+        last_resources_log = time.monotonic()
+        while True:
+            tick_start = time.monotonic()
+            await asyncio.sleep(self.TICK)
+            now = time.monotonic()
+            self._heartbeat = now
+            lag = now - tick_start - self.TICK
+            LOOP_LAG.observe(max(lag, 0))
+
+            if lag >= self.lag_threshold:
+                self._on_blocked(lag)
+
+            if now - last_resources_log >= self.RESOURCES_LOG_INTERVAL:
+                last_resources_log = now
+                self._log_resources()
+
+    def _monitor_loop(self) -> None:
+        """Поток, снимающий стек цикла событий во время блокировки"""
+        while not self._stop_event.wait(self.TICK):
+            if self._blocked_stack is not None or self._loop_thread_id is None:
+                continue
+            if time.monotonic() - self._heartbeat < self.lag_threshold + self.TICK:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)  # noqa: SLF001
+            if frame is not None:
+                self._blocked_stack = "".join(traceback.format_stack(frame))
+
+    def _on_blocked(self, lag: float) -> None:
+        LOOP_BLOCKS.inc()
+        blocked_stack, self._blocked_stack = self._blocked_stack, None
+        message = f"Event loop was blocked for {lag * 1000:.0f}ms"
+        logger.warning(
+            f"{message}, blocking stack:\n{blocked_stack or 'not captured'}\n{self._resources()}"
+        )
+
+        now = time.monotonic()
+        if self._last_alert is not None and now - self._last_alert < self.ALERT_COOLDOWN:
+            return
+        self._last_alert = now
+        self._error_reporter.send(
+            [f"{message} ({self._resources()})", blocked_stack or "Blocking stack was not captured"]
+        )
+
+    def _resources(self) -> str:
+        resources = (
+            f"rss {PROCESS_RSS.get() / 1024 / 1024:.0f}MB, "
+            f"db connections {DB_POOL_CHECKED_OUT.get():.0f}, "
+            f"pending notifications {NOTIFICATIONS_PENDING.get():.0f}, "
+            f"tasks {len(asyncio.all_tasks())}"
+        )
+        games = GAME_MEMORY.collect()
+        if len(games) > 1:
+            resources += "; " + ", ".join(
+                f"{game} {memory / 1024 / 1024:.1f}MB {GAME_DB_SESSIONS.get(game):.0f} db sessions"
+                for (game,), memory in games.items()
+            )
+        return resources
+
+    def _log_resources(self) -> None:
+        logger.info(f"Resources: {self._resources()}")
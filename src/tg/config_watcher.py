@@ -0,0 +1,99 @@
+import asyncio
+import contextlib
+import hashlib
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+import yaml
+from loguru import logger
+from pydantic import ValidationError
+
+from src.data.config import Config, describe_config
+from src.tg.error_reporter import ErrorReporter
+
+
+class ConfigWatcher:
+    """
+    Наблюдение за файлом конфига
+
+    Файл проверяется с периодом `interval`, при изменении содержимого конфиг разбирается
+    и проверяется в пуле потоков и передаётся в `on_reload`. Если новый конфиг не прошёл
+    проверку, остаётся прежний конфиг, а ошибка отправляется в чат администраторов
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        interval: float,
+        parse: Callable[[bytes], Config],
+        on_reload: Callable[[Config], Awaitable[None]],
+        error_reporter: ErrorReporter,
+    ) -> None:
+        self.path = path
+        self.interval = interval
+        self._parse = parse
+        self._on_reload = on_reload
+        self._error_reporter = error_reporter
+        self._stat: tuple[int, int] | None = None
+        self._digest: str | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Запустить наблюдение, текущее содержимое файла считается загруженным"""
+        logger.info(f"Watching {self.path} for changes every {self.interval}s")
+        self._stat = self._read_stat()
+        self._digest = hashlib.sha256(self.path.read_bytes()).hexdigest()
+        self._task = asyncio.create_task(self._watch_loop())
+
+    async def stop(self) -> None:
+        """Остановить наблюдение"""
+        if not self._task:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def _watch_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.exception(f"Config reload failed: {e}")
+                self._error_reporter.report(e, "Config reload failed, keeping previous config")
+
+    def _read_stat(self) -> tuple[int, int] | None:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    async def check(self) -> bool:
+        """Перезагрузить конфиг, если файл изменился, возвращает признак перезагрузки"""
+        stat = self._read_stat()
+        if stat is None or stat == self._stat:
+            return False
+        self._stat = stat
+
+        loop = asyncio.get_running_loop()
+        config_yaml = await loop.run_in_executor(None, self.path.read_bytes)
+        digest = hashlib.sha256(config_yaml).hexdigest()
+        if digest == self._digest:
+            return False
+        self._digest = digest
+
+        logger.info(f"Config {self.path} changed, reloading")
+        try:
+            config = await loop.run_in_executor(None, self._parse, config_yaml)
+        except (ValidationError, yaml.YAMLError) as e:
+            logger.error(f"Config {self.path} is invalid, keeping previous config: {e}")
+            self._error_reporter.send(
+                [f"Config {self.path} is invalid, keeping previous config", str(e)]
+            )
+            return False
+
+        await self._on_reload(config)
+        logger.success(f"Reloaded config {digest[:12]}: {describe_config(config)}")
+        return True
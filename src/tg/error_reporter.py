@@ -0,0 +1,216 @@
+import asyncio
+import contextlib
+import hashlib
+import html
+import time
+import traceback
+from collections.abc import Callable
+
+from loguru import logger
+from telegram import Bot
+from telegram.constants import ParseMode
+from telegram.error import RetryAfter, TelegramError
+
+from src.data.config import Config
+
+MESSAGE_MAX_LEN = 4096
+MESSAGE_PART_CHUNK_LEN = 3072
+"""Длина части сообщения после экранирования HTML"""
+
+HTML_ENTITY_MAX_LEN = len("&quot;")
+"""Длина самой длинной сущности, которую создаёт `html.escape`"""
+
+
+class _ErrorWindow:
+    """Повторения одной ошибки в пределах окна агрегации"""
+
+    def __init__(self, title: str) -> None:
+        self.title = title
+        self.first_seen = time.monotonic()
+        self.repeats = 0
+
+
+class ErrorReporter:
+    """
+    Отправка ошибок в чат администраторов с дедупликацией и ограничением частоты
+
+    Ошибки различаются по отпечатку - типу исключения и месту в коде, где оно возникло.
+    Подробный отчёт отправляется только при первом появлении ошибки в окне агрегации,
+    повторения подсчитываются и отправляются одной сводкой по окончании окна.
+    Сообщения отправляются фоновой задачей из ограниченной очереди
+    """
+
+    AGGREGATION_WINDOW = 60.0
+    """Окно агрегации повторяющихся ошибок в секундах"""
+
+    QUEUE_SIZE = 50
+    """Максимальное количество сообщений, ожидающих отправки"""
+
+    SEND_INTERVAL = 3.0
+    """Пауза между отправками сообщений в чат администраторов в секундах"""
+
+    USER_REPLY_INTERVAL = 30.0
+    """Минимальный интервал между сообщениями об ошибке в один чат пользователей в секундах"""
+
+    def __init__(self, config: Config) -> None:
+        self.config = config
+        self._queue: asyncio.Queue[str] = asyncio.Queue(self.QUEUE_SIZE)
+        self._windows: dict[str, _ErrorWindow] = {}
+        self._user_replied_at: dict[int, float] = {}
+        self._dropped = 0
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self, bot: Bot) -> None:
+        """Запустить фоновую отправку сообщений"""
+        self._tasks = [
+            asyncio.create_task(self._send_loop(bot)),
+            asyncio.create_task(self._flush_loop()),
+        ]
+
+    async def stop(self) -> None:
+        """Остановить фоновую отправку сообщений"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+
+    def should_reply_to_user(self, chat_id: int) -> bool:
+        """Следует ли отправить сообщение об ошибке в чат пользователей"""
+        now = time.monotonic()
+        replied_at = self._user_replied_at.get(chat_id)
+        if replied_at is not None and now - replied_at < self.USER_REPLY_INTERVAL:
+            return False
+        self._user_replied_at[chat_id] = now
+        return True
+
+    @staticmethod
+    def fingerprint(error: BaseException) -> str:
+        """Отпечаток ошибки по типу исключения и месту его возникновения"""
+        frames = traceback.extract_tb(error.__traceback__)
+        location = f"{frames[-1].filename}:{frames[-1].lineno}:{frames[-1].name}" if frames else ""
+        error_type = f"{type(error).__module__}.{type(error).__qualname__}"
+        return hashlib.sha1(f"{error_type}|{location}".encode()).hexdigest()[:12]
+
+    def report(
+        self,
+        error: BaseException,
+        title: str,
+        details: Callable[[], list[str]] | None = None,
+    ) -> None:
+        """
+        Сообщить об ошибке
+
+        Детали вычисляются только для первого появления ошибки в окне агрегации
+        """
+        fingerprint = self.fingerprint(error)
+        error_window = self._windows.get(fingerprint)
+        if error_window:
+            error_window.repeats += 1
+            logger.info(f"Error {fingerprint} repeated {error_window.repeats} times in window")
+            return
+
+        error_window = _ErrorWindow(f"{type(error).__name__}: {error}"[:200])
+        self._windows[fingerprint] = error_window
+
+        tb_string = "".join(traceback.format_exception(None, error, error.__traceback__))
+        self.send([f"{title} [{fingerprint}]", *(details() if details else []), tb_string])
+
+    def send(self, messages_parts: list[str]) -> None:
+        """Отправить произвольное сообщение в чат администраторов без дедупликации"""
+        for message in self._split_messages(messages_parts):
+            self._enqueue(message)
+
+    def _enqueue(self, message: str) -> None:
+        """Поставить сообщение в очередь на отправку без ожидания"""
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self._dropped += 1
+            logger.warning("Error reporter queue is full, message dropped")
+
+    def _flush(self) -> None:
+        """Отправить сводку по повторениям и закрыть истёкшие окна агрегации"""
+        now = time.monotonic()
+        digest_lines = []
+        for fingerprint, error_window in list(self._windows.items()):
+            if now - error_window.first_seen < self.AGGREGATION_WINDOW:
+                continue
+            if error_window.repeats:
+                digest_lines.append(
+                    f"[{fingerprint}] {html.escape(error_window.title)} - "
+                    f"ещё {error_window.repeats} раз"
+                )
+            del self._windows[fingerprint]
+
+        if self._dropped:
+            digest_lines.append(f"Не отправлено сообщений об ошибках: {self._dropped}")
+            self._dropped = 0
+
+        if digest_lines:
+            digest = "\n".join(["Повторения ошибок за последнее время:", *digest_lines])
+            self._enqueue(digest[:MESSAGE_MAX_LEN])
+
+    async def _flush_loop(self) -> None:
+        """Периодическая отправка сводок"""
+        while True:
+            await asyncio.sleep(self.AGGREGATION_WINDOW / 4)
+            self._flush()
+
+    async def _send_loop(self, bot: Bot) -> None:
+        """
+        Отправка сообщений из очереди с паузами между ними
+
+        Ошибка отправки одного сообщения не останавливает отправку остальных
+        """
+        while True:
+            message = await self._queue.get()
+            try:
+                await bot.send_message(self.config.chats.admin, message, parse_mode=ParseMode.HTML)
+            except RetryAfter as e:
+                logger.warning(f"Error reporter hit flood control, retry after {e.retry_after}")
+                await asyncio.sleep(e.retry_after)
+                self._enqueue(message)
+            except TelegramError as e:
+                logger.error(f"Was not able to send error report: {e}")
+            except Exception as e:
+                logger.exception(f"Was not able to send error report: {e}")
+            await asyncio.sleep(self.SEND_INTERVAL)
+
+    @staticmethod
+    def _split_messages(messages_parts: list[str]) -> list[str]:
+        """Разбить части сообщения об ошибке на сообщения с учётом ограничения длины"""
+        messages: list[str] = []
+        for message_part_idx, message_part in enumerate(messages_parts):
+            template = (
+                "<pre>{message_part}</pre>\n\n" if message_part_idx > 0 else "{message_part}\n"
+            )
+            escaped_part = html.escape(message_part)
+            message = template.format(message_part=escaped_part)
+            if len(messages) > 0 and (len(messages[-1]) + len(message) <= MESSAGE_MAX_LEN):
+                messages[-1] += message
+            elif len(message) <= MESSAGE_MAX_LEN:
+                messages.append(message)
+            else:
+                messages += [
+                    template.format(message_part=chunk)
+                    for chunk in ErrorReporter._split_escaped(escaped_part)
+                ]
+        return messages
+
+    @staticmethod
+    def _split_escaped(escaped_part: str) -> list[str]:
+        """Разбить экранированный текст на части, не разрывая сущности HTML"""
+        chunks = []
+        start = 0
+        while start < len(escaped_part):
+            end = min(start + MESSAGE_PART_CHUNK_LEN, len(escaped_part))
+            entity_start = escaped_part.rfind("&", max(end - HTML_ENTITY_MAX_LEN + 1, start), end)
+            if end < len(escaped_part) and entity_start > start:
+                entity_end = escaped_part.find(";", entity_start)
+                if entity_end >= end:
+                    end = entity_start
+            chunks.append(escaped_part[start:end])
+            start = end
+        return chunks
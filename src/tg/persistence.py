@@ -2,6 +2,8 @@ from loguru import logger
 from telegram.ext import BasePersistence, PersistenceInput
 
 from src.data.config import Config
+from src.data.minio_client import MinIOClient
+from src.data.shared_resources import SharedResources
 from src.tg.bot_data import BotData
 
 conversation_key = tuple[int | str, ...]
@@ -14,6 +16,8 @@ class Persistence(BasePersistence[dict, dict, BotData]):
         self,
         config: Config,
         update_interval: float = 60,
+        minio: MinIOClient | None = None,
+        resources: SharedResources | None = None,
     ) -> None:
         super().__init__(
             store_data=PersistenceInput(
@@ -22,10 +26,12 @@ class Persistence(BasePersistence[dict, dict, BotData]):
             update_interval=update_interval,
         )
         self._config = config
+        self._minio = minio
+        self._resources = resources
 
     async def get_bot_data(self) -> BotData:
         logger.info("Initializating bot data")
-        bot_data = BotData(config=self._config)
+        bot_data = BotData(config=self._config, minio=self._minio, resources=self._resources)
         await bot_data.init()
         logger.info("Done initializating bot data")
         return bot_data
@@ -0,0 +1,170 @@
+import asyncio
+import contextlib
+import json
+import os
+import socket
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any
+
+import asyncpg
+from loguru import logger
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.observability.metrics import REPLICA_EVENTS, REPLICA_LEADER
+
+replica_event = dict[str, Any]
+"""Событие реплики: идентификатор реплики, тип события и его значения"""
+
+
+class ReplicaSync:
+    """
+    Синхронизация состояния реплик бота через Postgres
+
+    Реплики сообщают друг другу об изменениях владения райончиками, новых картах
+    и идентификаторах файлов через `NOTIFY` в транзакции изменения, поэтому событие
+    доставляется только после фиксации и в порядке фиксации. События обрабатываются
+    по одному в порядке получения, собственные события реплики пропускаются.
+
+    Ведущая реплика удерживает сессионную рекомендательную блокировку на соединении
+    прослушивания. При потере соединения блокировка снимается, и её захватывает одна
+    из оставшихся реплик при очередной проверке
+    """
+
+    CHANNEL = "districts"
+    """Канал уведомлений Postgres, к названию добавляется название игры"""
+
+    LEADER_LOCK_KEY = 20240001
+    """Ключ рекомендательной блокировки ведущей реплики, второй ключ - хэш названия игры"""
+
+    INIT_LOCK_KEY = 20240002
+    """Ключ рекомендательной блокировки инициализации БД и MinIO"""
+
+    CHECK_INTERVAL = 5.0
+    """Период проверки соединения и попытки захвата блокировки ведущей реплики в секундах"""
+
+    def __init__(
+        self,
+        dsn: str,
+        game: str,
+        on_event: Callable[[replica_event], Awaitable[None]],
+        on_leadership: Callable[[bool], None],
+        on_reconnect: Callable[[], Awaitable[None]],
+    ) -> None:
+        self.replica_id = f"{socket.gethostname()}-{os.getpid()}"
+        self.is_leader = False
+        self.channel = f"{self.CHANNEL}_{game}"
+        self._game = game
+        self._dsn = dsn
+        self._on_event = on_event
+        self._on_leadership = on_leadership
+        self._on_reconnect = on_reconnect
+        self._connection: asyncpg.Connection | None = None
+        self._events: asyncio.Queue[replica_event] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Подключиться к каналу уведомлений и запустить обработку событий"""
+        logger.info(f"Starting replica sync as {self.replica_id}")
+        await self._connect()
+        self._tasks = [
+            asyncio.create_task(self._check_loop()),
+            asyncio.create_task(self._events_loop()),
+        ]
+
+    async def stop(self) -> None:
+        """Остановить обработку событий, блокировка ведущей реплики снимается с соединением"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+        await self._close()
+        self._set_leader(is_leader=False)
+        logger.info("Replica sync stopped")
+
+    @contextlib.asynccontextmanager
+    async def init_lock(self) -> AsyncIterator[None]:
+        """Блокировка, под которой реплики по очереди инициализируют БД и MinIO"""
+        if not self._connection:
+            raise ConnectionError("Replica sync is not connected")
+        await self._connection.execute(
+            "SELECT pg_advisory_lock($1, hashtext($2))", self.INIT_LOCK_KEY, self._game
+        )
+        try:
+            yield
+        finally:
+            await self._connection.execute(
+                "SELECT pg_advisory_unlock($1, hashtext($2))", self.INIT_LOCK_KEY, self._game
+            )
+
+    async def notify(self, session: AsyncSession, event: str, **values: Any) -> None:
+        """Отправить событие другим репликам после фиксации транзакции сессии"""
+        payload = json.dumps({"replica": self.replica_id, "event": event, **values})
+        await session.execute(select(func.pg_notify(self.channel, payload)))
+
+    async def _connect(self) -> None:
+        self._connection = await asyncpg.connect(self._dsn)
+        await self._connection.add_listener(self.channel, self._on_notification)
+        await self._try_lead()
+
+    async def _close(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection and not connection.is_closed():
+            with contextlib.suppress(Exception):
+                await connection.close(timeout=1)
+
+    async def _try_lead(self) -> None:
+        if self.is_leader or not self._connection:
+            return
+        if await self._connection.fetchval(
+            "SELECT pg_try_advisory_lock($1, hashtext($2))", self.LEADER_LOCK_KEY, self._game
+        ):
+            self._set_leader(is_leader=True)
+
+    def _set_leader(self, *, is_leader: bool) -> None:
+        if is_leader == self.is_leader:
+            return
+        self.is_leader = is_leader
+        REPLICA_LEADER.set(int(is_leader))
+        logger.info(f"Replica {self.replica_id} is {'now' if is_leader else 'no longer'} leader")
+        self._on_leadership(is_leader)
+
+    async def _check_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.CHECK_INTERVAL)
+            try:
+                if not self._connection or self._connection.is_closed():
+                    self._set_leader(is_leader=False)
+                    await self._close()
+                    logger.info("Reconnecting replica sync")
+                    await self._connect()
+                    await self._on_reconnect()
+                    continue
+                await self._connection.fetchval("SELECT 1")
+                await self._try_lead()
+            except Exception as e:
+                logger.warning(f"Replica sync connection failed: {e}")
+                self._set_leader(is_leader=False)
+                await self._close()
+
+    def _on_notification(
+        self,
+        _connection: asyncpg.Connection,
+        _pid: int,
+        _channel: str,
+        payload: str,
+    ) -> None:
+        event: replica_event = json.loads(payload)
+        if event["replica"] != self.replica_id:
+            self._events.put_nowait(event)
+
+    async def _events_loop(self) -> None:
+        while True:
+            event = await self._events.get()
+            REPLICA_EVENTS.inc(event["event"])
+            try:
+                await self._on_event(event)
+            except Exception as e:
+                logger.exception(f"Replica event {event['event']} handling failed: {e}")
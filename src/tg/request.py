@@ -0,0 +1,198 @@
+import asyncio
+import contextlib
+import importlib.util
+import re
+import time
+from typing import Any
+
+import httpx
+from loguru import logger
+from telegram._utils.defaultvalue import DEFAULT_NONE, DefaultValue
+from telegram._utils.types import ODVInput
+from telegram.error import TimedOut
+from telegram.request import BaseRequest, HTTPXRequest, RequestData
+
+from src.data.config import TelegramPool, TelegramTransport
+from src.observability.metrics import (
+    TELEGRAM_POOL_IN_FLIGHT,
+    TELEGRAM_POOL_WAIT,
+    TELEGRAM_REQUEST_DURATION,
+    TELEGRAM_REQUEST_ERRORS,
+)
+from src.observability.tracing import TRACER
+
+_API_METHOD_RE = re.compile(r"^[a-zA-Z]{1,64}$")
+
+UNTRACED_API_METHODS = frozenset({"getUpdates"})
+"""
+Методы Bot API без отрезков трассировки: долгий опрос обновлений не относится к событию
+и в каждом цикле опроса превышал бы порог медленной трассировки
+"""
+
+
+def get_api_method(url: str) -> str:
+    """Название метода Bot API по адресу запроса, загрузки файлов объединяются в `file`"""
+    api_method = url.rsplit("/", 1)[-1]
+    if "/file/bot" in url or not _API_METHOD_RE.match(api_method):
+        return "file"
+    return api_method
+
+
+class InstrumentedHTTPXRequest(HTTPXRequest):
+    """
+    Запросы к Telegram Bot API с замером длительности и ошибок по методам
+
+    Одновременные запросы ограничены размером пула: ожидание свободного места и
+    выполняющиеся запросы учитываются в метриках пула `pool_name`
+    """
+
+    def __init__(
+        self, connection_pool_size: int = 1, *, pool_name: str = "default", **kwargs: Any
+    ) -> None:
+        super().__init__(connection_pool_size, **kwargs)
+        self.pool_name = pool_name
+        self._slots = asyncio.Semaphore(connection_pool_size)
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: RequestData | None = None,
+        read_timeout: ODVInput[float] = DEFAULT_NONE,
+        write_timeout: ODVInput[float] = DEFAULT_NONE,
+        connect_timeout: ODVInput[float] = DEFAULT_NONE,
+        pool_timeout: ODVInput[float] = DEFAULT_NONE,
+    ) -> tuple[int, bytes]:
+        if isinstance(pool_timeout, DefaultValue):
+            pool_timeout = self._client.timeout.pool
+        wait_start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), pool_timeout)
+        except TimeoutError as e:
+            raise TimedOut(
+                f"Pool timeout: all {self.pool_name} pool connections are occupied"
+            ) from e
+        finally:
+            TELEGRAM_POOL_WAIT.observe(time.perf_counter() - wait_start, self.pool_name)
+        TELEGRAM_POOL_IN_FLIGHT.inc(self.pool_name)
+        try:
+            return await self._do_instrumented_request(
+                url,
+                method,
+                request_data,
+                read_timeout,
+                write_timeout,
+                connect_timeout,
+                pool_timeout,
+            )
+        finally:
+            TELEGRAM_POOL_IN_FLIGHT.dec(self.pool_name)
+            self._slots.release()
+
+    async def _do_instrumented_request(
+        self,
+        url: str,
+        method: str,
+        request_data: RequestData | None,
+        read_timeout: ODVInput[float],
+        write_timeout: ODVInput[float],
+        connect_timeout: ODVInput[float],
+        pool_timeout: float | None,
+    ) -> tuple[int, bytes]:
+        api_method = get_api_method(url)
+        start = time.perf_counter()
+        try:
+            with (
+                contextlib.nullcontext()
+                if api_method in UNTRACED_API_METHODS
+                else TRACER.span(f"telegram {api_method}")
+            ):
+                status_code, payload = await super().do_request(
+                    url,
+                    method,
+                    request_data,
+                    read_timeout,
+                    write_timeout,
+                    connect_timeout,
+                    pool_timeout,
+                )
+        except Exception as e:
+            TELEGRAM_REQUEST_ERRORS.inc(api_method, type(e).__name__)
+            raise
+        finally:
+            TELEGRAM_REQUEST_DURATION.observe(time.perf_counter() - start, api_method)
+        if status_code >= 400:
+            TELEGRAM_REQUEST_ERRORS.inc(api_method, f"http_{status_code}")
+        return status_code, payload
+
+
+def create_pool_request(pool_name: str, pool: TelegramPool) -> InstrumentedHTTPXRequest:
+    """Запросы пула соединений по конфигу, без установленного `h2` используется HTTP/1.1"""
+    http_version = pool.http_version
+    if http_version == "2" and not importlib.util.find_spec("h2"):
+        logger.warning(f"Package h2 is not installed, {pool_name} pool falls back to HTTP/1.1")
+        http_version = "1.1"
+    return InstrumentedHTTPXRequest(
+        pool.connection_pool_size,
+        read_timeout=pool.read_timeout,
+        write_timeout=pool.write_timeout,
+        connect_timeout=pool.connect_timeout,
+        pool_timeout=pool.pool_timeout,
+        media_write_timeout=pool.write_timeout,
+        http_version=http_version,
+        httpx_kwargs={
+            "limits": httpx.Limits(
+                max_connections=pool.connection_pool_size,
+                max_keepalive_connections=pool.keepalive_connections,
+                keepalive_expiry=pool.keepalive_expiry,
+            )
+        },
+        pool_name=pool_name,
+    )
+
+
+class TransportRequest(BaseRequest):
+    """
+    Запросы к Telegram Bot API, разделённые по пулам соединений
+
+    Запросы с файлами и скачивание файлов выполняются в пуле `media`,
+    остальные запросы - в пуле `send`
+    """
+
+    def __init__(self, transport: TelegramTransport) -> None:
+        self._send = create_pool_request("send", transport.send)
+        self._media = create_pool_request("media", transport.media)
+
+    @property
+    def read_timeout(self) -> float | None:
+        return self._send.read_timeout
+
+    async def initialize(self) -> None:
+        await asyncio.gather(self._send.initialize(), self._media.initialize())
+
+    async def shutdown(self) -> None:
+        await asyncio.gather(self._send.shutdown(), self._media.shutdown())
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: RequestData | None = None,
+        read_timeout: ODVInput[float] = DEFAULT_NONE,
+        write_timeout: ODVInput[float] = DEFAULT_NONE,
+        connect_timeout: ODVInput[float] = DEFAULT_NONE,
+        pool_timeout: ODVInput[float] = DEFAULT_NONE,
+    ) -> tuple[int, bytes]:
+        is_media = (request_data is not None and request_data.contains_files) or (
+            get_api_method(url) == "file"
+        )
+        request = self._media if is_media else self._send
+        return await request.do_request(
+            url,
+            method,
+            request_data,
+            read_timeout,
+            write_timeout,
+            connect_timeout,
+            pool_timeout,
+        )
@@ -0,0 +1,161 @@
+import asyncio
+import signal
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+from loguru import logger
+from telegram import Update
+from telegram.ext import Application
+
+from src.data.config import Config
+from src.data.shared_resources import SharedResources
+from src.exceptions.config import (
+    ConfigWebhookPathIsDuplicatedError,
+    ConfigWebhookServerDiffersError,
+)
+from src.observability.metrics_server import create_embedded_server
+
+if TYPE_CHECKING:
+    import uvicorn
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+"""Заголовок, в котором Telegram передаёт секрет вебхука"""
+
+game_application = tuple[Application, Config]
+"""Приложение игры и её конфиг"""
+
+
+def webhook_path(config: Config) -> str:
+    """Путь адреса вебхука игры, по которому сервер принимает её события"""
+    return urlsplit(config.webhook_url).path or "/"
+
+
+def check_webhook_games(webhook_games: list[game_application]) -> None:
+    """
+    Проверить, что игры с вебхуком можно обслужить одним сервером
+
+    Пути адресов вебхука должны различаться, адрес и порт сервера - совпадать
+    """
+    paths: dict[str, str] = {}
+    _, first_config = webhook_games[0]
+    for _, config in webhook_games:
+        path = webhook_path(config)
+        if path in paths:
+            raise ConfigWebhookPathIsDuplicatedError(
+                f"Games {paths[path]} and {config.game} use the same webhook path {path}"
+            )
+        paths[path] = config.game
+        if (config.webhook_host, config.webhook_port) != (
+            first_config.webhook_host,
+            first_config.webhook_port,
+        ):
+            raise ConfigWebhookServerDiffersError(
+                f"Game {config.game} webhook server {config.webhook_host}:{config.webhook_port} "
+                f"differs from {first_config.webhook_host}:{first_config.webhook_port}"
+            )
+
+
+def _create_webhook_server(webhook_games: list[game_application]) -> "uvicorn.Server":
+    """
+    Сервер приёма событий от Telegram, события передаются в очередь приложения игры
+
+    Игры различаются по пути адреса вебхука, адрес и порт сервера общие для игр с вебхуком
+    """
+    from fastapi import FastAPI, Request, Response
+
+    def _create_route(application: Application, config: Config) -> None:
+        async def _webhook(request: Request) -> Response:
+            if (
+                config.webhook_secret_token
+                and request.headers.get(SECRET_TOKEN_HEADER) != config.webhook_secret_token
+            ):
+                return Response(status_code=403)
+            update = Update.de_json(await request.json(), application.bot)
+            if update:
+                await application.update_queue.put(update)
+            return Response()
+
+        app.add_api_route(webhook_path(config), _webhook, methods=["POST"])
+
+    app = FastAPI(docs_url=None, redoc_url=None, openapi_url=None)
+    for application, config in webhook_games:
+        _create_route(application, config)
+    _, config = webhook_games[0]
+    return create_embedded_server(app, config.webhook_host, config.webhook_port)
+
+
+async def _start(application: Application, config: Config) -> None:
+    """Инициализировать и запустить приложение игры с получением событий опросом или вебхуком"""
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    if config.webhook_url:
+        await application.bot.set_webhook(
+            config.webhook_url,
+            allowed_updates=Update.ALL_TYPES,
+            secret_token=config.webhook_secret_token,
+        )
+    elif application.updater:
+        await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+    await application.start()
+    logger.info(f"Game {config.game} started")
+
+
+async def _stop(application: Application) -> None:
+    """Остановить приложение игры"""
+    if application.updater and application.updater.running:
+        await application.updater.stop()
+    if application.running:
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+    await application.shutdown()
+    if application.post_shutdown:
+        await application.post_shutdown(application)
+
+
+async def run_applications(
+    games: list[game_application], resources: SharedResources | None = None
+) -> None:
+    """
+    Запустить приложения игр в одном цикле событий до сигнала остановки
+
+    События игр с адресом вебхука принимает один сервер вебхука, остальные игры
+    получают события опросом. Конфликты путей и адресов вебхука проверяются до запуска игр
+    """
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for stop_signal in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(stop_signal, stop_event.set)
+
+    webhook_games = [(application, config) for application, config in games if config.webhook_url]
+    if webhook_games:
+        check_webhook_games(webhook_games)
+    server = _create_webhook_server(webhook_games) if webhook_games else None
+    started: list[Application] = []
+    try:
+        for application, config in games:
+            started.append(application)
+            await _start(application, config)
+
+        stop_task = asyncio.create_task(stop_event.wait())
+        server_task = asyncio.create_task(server.serve()) if server else None
+        if server:
+            _, webhook_config = webhook_games[0]
+            logger.info(
+                f"Receiving updates with webhook on {webhook_config.webhook_host}:{webhook_config.webhook_port}"
+            )
+        await asyncio.wait(
+            [task for task in (stop_task, server_task) if task],
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+
+        stop_task.cancel()
+        if server and server_task:
+            server.should_exit = True
+            await server_task
+    finally:
+        for application in reversed(started):
+            await _stop(application)
+        if resources:
+            await resources.close()
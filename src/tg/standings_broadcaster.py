@@ -0,0 +1,202 @@
+import asyncio
+import contextlib
+
+from loguru import logger
+from telegram import Bot, Message
+from telegram.constants import ParseMode
+from telegram.error import RetryAfter, TelegramError
+from telegram.ext import Application
+
+from src.data.config import StandingsBroadcast
+from src.data.districts_map_view import DistrictsMapView
+from src.exceptions.stage import StageFailedError
+from src.observability.metrics import STANDINGS_BROADCAST_SENDS
+from src.observability.tracing import TRACER
+from src.tg.bot_data import BotData
+from src.tg.context import Context
+
+photo_send = tuple[int, bytes | str, str, asyncio.Future[Message | None]]
+"""Отправка карты: чат, байты или id файла карты, подпись и результат отправки"""
+
+
+class StandingsBroadcaster:
+    """
+    Рассылка карты райончиков с положением команд в чаты команд по расписанию `JobQueue`
+
+    Рассылка собирается из снимка карты в памяти без обращения к БД: подписи уже отрисованы
+    снимком для каждого чата. Карта, которой ещё нет в telegram, загружается один раз
+    в первый чат, остальные чаты получают её по id файла. Сообщения отправляются
+    фоновой задачей из очереди не чаще `messages_per_second` в секунду
+    """
+
+    OWNER_CHANGES_CHECK_INTERVAL = 10.0
+    """Период проверки количества райончиков, сменивших владельца, в секундах"""
+
+    def __init__(self, broadcast: StandingsBroadcast) -> None:
+        self.broadcast = broadcast
+        self._queue: asyncio.Queue[photo_send] = asyncio.Queue()
+        self._lock = asyncio.Lock()
+        self._broadcast_owners: dict[str, int | None] | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self, application: Application) -> None:
+        """Запустить фоновую отправку и задачи рассылки"""
+        if not application.job_queue:
+            logger.warning("Job queue is not available, standings broadcast is disabled")
+            return
+        self._task = asyncio.create_task(self._send_loop(application.bot))
+        if self.broadcast.interval:
+            application.job_queue.run_repeating(
+                self._interval_job, self.broadcast.interval, first=self.broadcast.interval
+            )
+        if self.broadcast.owner_changes:
+            application.job_queue.run_repeating(
+                self._owner_changes_job, self.OWNER_CHANGES_CHECK_INTERVAL
+            )
+
+    async def stop(self) -> None:
+        """Остановить фоновую отправку, задачи рассылки останавливаются вместе с `JobQueue`"""
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def _changed_districts(self, districts_map_view: DistrictsMapView) -> int:
+        """Количество райончиков, сменивших владельца с прошлой рассылки"""
+        if self._broadcast_owners is None:
+            return len(districts_map_view.district_owners)
+        return sum(
+            owner_chat_id != self._broadcast_owners.get(district_name)
+            for district_name, owner_chat_id in districts_map_view.district_owners.items()
+        )
+
+    async def _interval_job(self, context: Context) -> None:
+        await self._broadcast(context, min_changed_districts=1)
+
+    async def _owner_changes_job(self, context: Context) -> None:
+        if self._broadcast_owners is None:
+            self._broadcast_owners = context.bot_data.districts_map_view.district_owners
+            return
+        await self._broadcast(context, min_changed_districts=self.broadcast.owner_changes or 1)
+
+    async def _broadcast(self, context: Context, min_changed_districts: int) -> None:
+        """Разослать карту, если с прошлой рассылки сменили владельца не меньше заданного райончиков"""
+        bot_data = context.bot_data
+        if not bot_data.is_render_leader or self._lock.locked():
+            return
+        if self._changed_districts(bot_data.districts_map_view) < min_changed_districts:
+            return
+        async with self._lock:
+            with TRACER.span("standings broadcast"):
+                try:
+                    await bot_data.update_districts_map()
+                except StageFailedError as e:
+                    logger.opt(exception=e).error(
+                        f"Districts map update before standings broadcast failed on stage {e.stage}"
+                    )
+                    bot_data.error_reporter.report(
+                        e.__cause__ or e, "Districts map update before standings broadcast failed"
+                    )
+                    return
+
+                districts_map_view = bot_data.districts_map_view
+                self._broadcast_owners = districts_map_view.district_owners
+                chat_ids_by_variant: dict[int | None, list[int]] = {}
+                for chat_id in bot_data.config.chats.team_chat_ids:
+                    variant_chat_id = chat_id if chat_id in districts_map_view.variants else None
+                    chat_ids_by_variant.setdefault(variant_chat_id, []).append(chat_id)
+
+                logger.info(
+                    f"Broadcasting standings to {len(bot_data.config.chats.team_chat_ids)} chats"
+                )
+                await asyncio.gather(
+                    *(
+                        self._broadcast_districts_map(
+                            bot_data, districts_map_view, variant_chat_id, chat_ids
+                        )
+                        for variant_chat_id, chat_ids in chat_ids_by_variant.items()
+                    )
+                )
+
+    async def _broadcast_districts_map(
+        self,
+        bot_data: BotData,
+        districts_map_view: DistrictsMapView,
+        variant_chat_id: int | None,
+        chat_ids: list[int],
+    ) -> None:
+        """
+        Разослать карту или вариант карты команды в чаты
+
+        Пока у карты нет id файла, она отправляется по одному чату, после первой успешной
+        загрузки остальные чаты получают её по id файла одновременно. Ошибка отправки
+        в один чат уже записана в лог фоновой отправкой и не прерывает рассылку
+        """
+        districts_map = districts_map_view.districts_map_for(chat_ids[0])
+        pending_chat_ids = list(chat_ids)
+        while pending_chat_ids and isinstance(districts_map, bytes):
+            chat_id = pending_chat_ids.pop(0)
+            message = None
+            with contextlib.suppress(Exception):
+                message = await self._submit(
+                    chat_id, districts_map, districts_map_view.captions[chat_id]
+                )
+            if message and message.photo:
+                districts_map = message.photo[-1].file_id
+                if bot_data.set_districts_map_view_file_id(
+                    districts_map_view.districts_map_id, districts_map, variant_chat_id
+                ):
+                    await bot_data.save_districts_map_file_id(
+                        districts_map_view.districts_map_id, districts_map, variant_chat_id
+                    )
+        await asyncio.gather(
+            *(
+                self._submit(chat_id, districts_map, districts_map_view.captions[chat_id])
+                for chat_id in pending_chat_ids
+            ),
+            return_exceptions=True,
+        )
+
+    def _submit(self, chat_id: int, districts_map: bytes | str, caption: str) -> asyncio.Future:
+        """Поставить карту в очередь на отправку, результат - отправленное сообщение или None"""
+        future: asyncio.Future[Message | None] = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((chat_id, districts_map, caption, future))
+        return future
+
+    async def _send_loop(self, bot: Bot) -> None:
+        """
+        Отправка карт из очереди с паузами между отправками
+
+        Ошибка отправки одной карты завершает с ошибкой только её результат,
+        отправка остальных карт продолжается
+        """
+        while True:
+            chat_id, districts_map, caption, future = await self._queue.get()
+            result = "upload" if isinstance(districts_map, bytes) else "file_id"
+            message = None
+            try:
+                message = await bot.send_photo(
+                    chat_id, districts_map, caption=caption, parse_mode=ParseMode.MARKDOWN
+                )
+            except RetryAfter as e:
+                logger.warning(
+                    f"Standings broadcast hit flood control, retry after {e.retry_after}"
+                )
+                await asyncio.sleep(e.retry_after)
+                self._queue.put_nowait((chat_id, districts_map, caption, future))
+                continue
+            except TelegramError as e:
+                logger.error(f"Was not able to send standings to chat {chat_id}: {e}")
+                result = "error"
+            except Exception as e:
+                logger.exception(f"Was not able to send standings to chat {chat_id}: {e}")
+                STANDINGS_BROADCAST_SENDS.inc("error")
+                if not future.done():
+                    future.set_exception(e)
+                await asyncio.sleep(1 / self.broadcast.messages_per_second)
+                continue
+            STANDINGS_BROADCAST_SENDS.inc(result)
+            if not future.done():
+                future.set_result(message)
+            await asyncio.sleep(1 / self.broadcast.messages_per_second)
@@ -0,0 +1,79 @@
+import gzip
+import json
+import queue
+import threading
+import time
+import zlib
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+from telegram import Update
+
+from src.tg.context import Context
+
+TOKEN_PLACEHOLDER = "<token>"
+"""Замена токена бота в записанных событиях"""
+
+
+class UpdateRecorder:
+    """
+    Запись входящих событий для последующего воспроизведения
+
+    Каждое событие с временем поступления дописывается строкой JSON в сжатый gzip файл,
+    запись в файл выполняется отдельным потоком. Токен бота, если он встречается
+    в событии, заменяется на `TOKEN_PLACEHOLDER`
+    """
+
+    def __init__(self, path: str, token: str) -> None:
+        self.path = Path(path)
+        self._token = token
+        self._queue: queue.SimpleQueue[str | None] | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Запустить поток записи"""
+        logger.info(f"Recording updates to {self.path}")
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._write_loop, args=(self._queue,), name="update-recorder", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Дописать накопленные события и остановить поток записи"""
+        if self._queue and self._thread:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._queue = None
+            self._thread = None
+
+    async def record_handler(self, update: Update, _: Context) -> None:
+        """Обработчик всех событий, помещающий событие в очередь записи"""
+        if not self._queue:
+            return
+        line = json.dumps(
+            {"time": time.time(), "update": update.to_dict()}, ensure_ascii=False
+        ).replace(self._token, TOKEN_PLACEHOLDER)
+        self._queue.put(line)
+
+    def _write_loop(self, records: "queue.SimpleQueue[str | None]") -> None:
+        with gzip.open(self.path, "at", encoding="utf-8") as stream:
+            while (line := records.get()) is not None:
+                stream.write(line + "\n")
+                if records.empty():
+                    stream.flush()
+
+
+def read_recording(path: Path) -> Iterator[tuple[float, dict[str, Any]]]:
+    """Время поступления и событие из записи `UpdateRecorder`"""
+    with gzip.open(path, "rt", encoding="utf-8") as stream:
+        try:
+            for line in stream:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                yield record["time"], record["update"]
+        except (EOFError, gzip.BadGzipFile, zlib.error, json.JSONDecodeError):
+            logger.warning(f"Recording {path} is damaged, replaying records before the damage")
@@ -0,0 +1,22 @@
+import pytest
+
+from src.data.config import CONFIG_PATH, Config, parse_config
+
+CONFIG_ENV = {
+    "TOKEN": "123456:test-token",
+    "PG_USER": "bot",
+    "PG_PASSWORD": "pg-secret",
+    "MINIO_ROOT_USER": "minio",
+    "MINIO_ROOT_PASSWORD": "minio-secret",
+    "MINIO_HOST": "localhost:9000",
+    "MINIO_BUCKET": "data",
+}
+"""Переменные окружения конфига для тестов"""
+
+
+@pytest.fixture
+def config(monkeypatch: pytest.MonkeyPatch) -> Config:
+    """Конфиг из `config/config.yaml` с тестовыми переменными окружения"""
+    for name, value in CONFIG_ENV.items():
+        monkeypatch.setenv(name, value)
+    return parse_config(CONFIG_PATH.read_bytes())
@@ -0,0 +1,49 @@
+import io
+
+from PIL import Image
+
+from src.data.adjacency import LABELS_PER_IMAGE, compute_adjacency, create_key
+
+
+def _mask(size: tuple[int, int], mask_box: tuple[int, int, int, int]) -> bytes:
+    mask = Image.new("L", size, 0)
+    mask.paste(255, mask_box)
+    mask_bio = io.BytesIO()
+    mask.save(mask_bio, format="PNG")
+    return mask_bio.getvalue()
+
+
+def test_create_key() -> None:
+    assert create_key(["a.png", "b.png"], 2) == create_key(["a.png", "b.png"], 2)
+    assert create_key(["a.png", "b.png"], 2) != create_key(["a.png", "b.png"], 3)
+    assert create_key(["a.png", "b.png"], 2) != create_key(["b.png", "a.png"], 2)
+
+
+def test_neighbours_within_border() -> None:
+    size = (20, 10)
+    masks = [
+        _mask(size, (0, 0, 5, 10)),
+        _mask(size, (6, 0, 10, 10)),
+        _mask(size, (16, 0, 20, 10)),
+        _mask(size, (0, 0, 0, 0)),
+    ]
+    names = ["Запад", "Центр", "Восток", "Пустой"]
+    assert compute_adjacency(names, masks, 2) == {
+        "Запад": ["Центр"],
+        "Центр": ["Запад"],
+        "Восток": [],
+        "Пустой": [],
+    }
+    assert compute_adjacency(names, masks, 1) == {name: [] for name in names}
+
+
+def test_neighbours_across_label_images() -> None:
+    count = LABELS_PER_IMAGE + 10
+    size = (count, 1)
+    names = [str(idx) for idx in range(count)]
+    masks = [_mask(size, (idx, 0, idx + 1, 1)) for idx in range(count)]
+    neighbours = compute_adjacency(names, masks, 1)
+    for idx, name in enumerate(names):
+        expected = [names[neighbour] for neighbour in (idx - 1, idx + 1) if 0 <= neighbour < count]
+        assert neighbours[name] == sorted(expected)
+    assert compute_adjacency([], [], 1) == {}
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import pytest
+from telegram.constants import MessageLimit
+
+from src.data.config import Config
+from src.handlers.admin import _parse_district_owners, _stats_messages
+
+
+@pytest.fixture
+def context(config: Config) -> SimpleNamespace:
+    return SimpleNamespace(bot_data=SimpleNamespace(config=config))
+
+
+def test_parse_district_owners(config: Config, context: SimpleNamespace) -> None:
+    team = config.chats.teams[0]
+    text = f"Райончик 1 = {team.name}\n\n  Райончик 2=-  \n"
+    assert _parse_district_owners(text, context) == {
+        "Райончик 1": team.chat_id,
+        "Райончик 2": None,
+    }
+
+
+def test_parse_district_owners_reset(config: Config, context: SimpleNamespace) -> None:
+    district_owners = _parse_district_owners(" reset ", context)
+    assert list(district_owners) == config.districts_map.distict_names
+    assert (
+        district_owners["Райончик 1"]
+        == (config.chats.default_district_name_to_team_chat_id["Райончик 1"])
+    )
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "Райончик 1",
+        "Нет такого = -",
+        "Райончик 1 = Нет такой команды",
+        "Райончик 1 = -\nРайончик 2",
+    ],
+)
+def test_parse_district_owners_invalid(text: str, context: SimpleNamespace) -> None:
+    assert _parse_district_owners(text, context) == {}
+
+
+def test_stats_messages_fit_message_limit() -> None:
+    stats = "\n".join(f"Райончик <{idx}> & {'x' * 40}" for idx in range(500))
+    messages = _stats_messages(stats)
+    assert len(messages) > 1
+    assert all(len(message) <= MessageLimit.MAX_TEXT_LENGTH for message in messages)
+    assert all(message.startswith("<pre>") and message.endswith("</pre>") for message in messages)
+    assert "\n".join(message[len("<pre>") : -len("</pre>")] for message in messages) == (
+        stats.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    )
+    assert _stats_messages("short") == ["<pre>short</pre>"]
@@ -0,0 +1,127 @@
+import asyncio
+from types import SimpleNamespace
+
+from telegram import CallbackQuery, Update, User
+
+from src.data.config import Config
+from src.handlers.district_fight import FIGHT_CALLBACK_PREFIX, _capture_district
+from src.handlers.district_sell import (
+    SELL_CALLBACK_CONFIRMED,
+    SELL_CALLBACK_PREFIX,
+    _sell_district,
+    sell_callback_handler,
+)
+from src.handlers.helpers import (
+    create_callback_data,
+    get_callback_data_idx,
+    get_callback_data_values,
+)
+
+CALLBACK_DATA_MAX_BYTES = 64
+"""Наибольший размер данных встроенной клавиши в telegram"""
+
+
+def _callback_update(data: str) -> Update:
+    user = User(1, "user", is_bot=False)
+    return Update(1, callback_query=CallbackQuery("1", user, "chat", data=data))
+
+
+def test_callback_data_round_trip(config: Config) -> None:
+    teams = len(config.chats.teams)
+    districts = len(config.districts_map.distict_names)
+    for data in (
+        create_callback_data(
+            SELL_CALLBACK_PREFIX, teams - 1, districts - 1, SELL_CALLBACK_CONFIRMED
+        ),
+        create_callback_data(FIGHT_CALLBACK_PREFIX, teams - 1, teams - 2, "d", districts - 1),
+    ):
+        assert len(data.encode()) <= CALLBACK_DATA_MAX_BYTES
+        values = get_callback_data_values(_callback_update(data))[1:]
+        assert get_callback_data_idx(values, 0, teams) == teams - 1
+
+    values = get_callback_data_values(
+        _callback_update(create_callback_data(SELL_CALLBACK_PREFIX, 2, districts - 1))
+    )
+    assert values == [SELL_CALLBACK_PREFIX, "2", str(districts - 1)]
+    assert get_callback_data_idx(values[1:], 1, districts) == districts - 1
+
+
+def test_callback_data_idx_rejects_invalid_values() -> None:
+    assert get_callback_data_idx([], 0, 3) is None
+    assert get_callback_data_idx(["3"], 0, 3) is None
+    assert get_callback_data_idx(["-1"], 0, 3) is None
+    assert get_callback_data_idx(["y"], 0, 3) is None
+    assert get_callback_data_idx(["0", "2"], 1, 3) == 2
+
+
+def test_repeated_transfer_does_not_notify(config: Config) -> None:
+    calls = []
+
+    async def set_district_owner(*args: object) -> bool:
+        calls.append(args)
+        return False
+
+    context = SimpleNamespace(
+        bot_data=SimpleNamespace(config=config, set_district_owner=set_district_owner)
+    )
+    update = _callback_update("")
+    loser, winner = config.chats.teams[:2]
+    assert not asyncio.run(
+        _sell_district(update, context, winner.name, winner.chat_id, "Райончик 1")
+    )
+    assert not asyncio.run(
+        _capture_district(
+            update,
+            context,
+            "Райончик 1",
+            winner.name,
+            winner.chat_id,
+            loser.name,
+            loser.chat_id,
+        )
+    )
+    assert calls == [
+        ("Райончик 1", winner.chat_id, None),
+        ("Райончик 1", winner.chat_id, loser.chat_id),
+    ]
+
+
+def test_repeated_sell_without_configured_reply(config: Config) -> None:
+    config = config.model_copy(
+        update={
+            "keyboard": {
+                key: key_hit
+                for key, key_hit in config.keyboard.items()
+                if key != "district_owner_already_changed"
+            }
+        }
+    )
+    district_name = config.districts_map.distict_names[0]
+    answers = []
+
+    async def answer(text: str | None = None) -> None:
+        answers.append(text)
+
+    async def get_free_disticts_names() -> list[str]:
+        return [district_name]
+
+    async def set_district_owner(*_args: object) -> bool:
+        return False
+
+    update = SimpleNamespace(
+        effective_chat=SimpleNamespace(id=config.chats.bank),
+        callback_query=SimpleNamespace(
+            data=create_callback_data(SELL_CALLBACK_PREFIX, 0, 0, SELL_CALLBACK_CONFIRMED),
+            answer=answer,
+        ),
+    )
+    context = SimpleNamespace(
+        bot_data=SimpleNamespace(
+            config=config,
+            get_free_disticts_names=get_free_disticts_names,
+            set_district_owner=set_district_owner,
+        )
+    )
+    asyncio.run(sell_callback_handler(update, context))
+    assert len(answers) == 1
+    assert f"{district_name} уже передан" in answers[0]
@@ -0,0 +1,68 @@
+import asyncio
+import html
+
+import pytest
+
+from src.data.config import Config
+from src.tg.error_reporter import MESSAGE_MAX_LEN, ErrorReporter
+
+
+def _unwrap(message: str) -> str:
+    return message.removeprefix("<pre>").removesuffix("</pre>\n\n")
+
+
+def test_split_messages_keeps_escaped_chunks_within_limit() -> None:
+    traceback_text = '<&>"' * 5000
+
+    messages = ErrorReporter._split_messages(["title", traceback_text])
+
+    assert messages[0] == "title\n"
+    assert all(len(message) <= MESSAGE_MAX_LEN for message in messages)
+    assert html.unescape("".join(_unwrap(message) for message in messages[1:])) == traceback_text
+
+
+def test_split_escaped_does_not_break_entities() -> None:
+    escaped = html.escape("a" * 3070 + "&&&&")
+
+    chunks = ErrorReporter._split_escaped(escaped)
+
+    assert "".join(chunks) == escaped
+    assert chunks[0].endswith("a")
+    assert all(html.unescape(chunk).count("&") == chunk.count("&amp;") for chunk in chunks)
+
+
+def test_split_messages_joins_short_parts() -> None:
+    messages = ErrorReporter._split_messages(["title", "first", "second"])
+
+    assert messages == ["title\n<pre>first</pre>\n\n<pre>second</pre>\n\n"]
+
+
+class FailingOnceBot:
+    def __init__(self) -> None:
+        self.messages: list[str] = []
+        self.sent = asyncio.Event()
+
+    async def send_message(self, _chat_id: int, message: str, **_kwargs: object) -> None:
+        self.messages.append(message)
+        if len(self.messages) == 1:
+            raise OSError(message)
+        self.sent.set()
+
+
+def test_send_loop_survives_unexpected_error(
+    config: Config, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(ErrorReporter, "SEND_INTERVAL", 0.0)
+
+    async def _run() -> None:
+        error_reporter = ErrorReporter(config)
+        bot = FailingOnceBot()
+        error_reporter.start(bot)
+        error_reporter.send(["first"])
+        error_reporter.send(["second"])
+        await asyncio.wait_for(bot.sent.wait(), 1.0)
+        assert bot.messages == ["first\n", "second\n"]
+        assert not error_reporter._tasks[0].done()
+        await error_reporter.stop()
+
+    asyncio.run(_run())
@@ -0,0 +1,24 @@
+import pytest
+
+from src.data.config import Config
+from src.exceptions.loadtest import LoadStandSchemaIsNotDedicatedError
+from src.loadtest.harness import LOAD_SCHEMA_PREFIX, LoadStand, LoadTest, percentile
+
+
+@pytest.mark.parametrize("pg_schema", [None, "main", "game_loadtest"])
+def test_load_stand_refuses_game_schema(config: Config, pg_schema: str | None) -> None:
+    with pytest.raises(LoadStandSchemaIsNotDedicatedError):
+        LoadTest(config.model_copy(update={"pg_schema": pg_schema}), rates={}, duration=1)
+
+
+def test_load_stand_is_abstract(config: Config) -> None:
+    with pytest.raises(TypeError, match="abstract"):
+        LoadStand(config.model_copy(update={"pg_schema": LOAD_SCHEMA_PREFIX}))  # type: ignore
+
+
+def test_percentile_uses_nearest_rank() -> None:
+    values = [float(value) for value in range(1, 101)]
+
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([], 0.5) == 0
@@ -0,0 +1,89 @@
+import json
+from datetime import UTC, datetime
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from src.observability import logs
+from src.observability.logs import REDACTED, LogFilter, LogSink
+
+INFO = SimpleNamespace(no=20, name="INFO")
+WARNING = SimpleNamespace(no=30, name="WARNING")
+
+
+def _record(name: str, line: int = 1, level: SimpleNamespace = INFO) -> dict[str, Any]:
+    return {"level": level, "name": name, "line": line, "message": "message"}
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(logs.time, "monotonic", clock)
+    return clock
+
+
+def test_level_by_longest_prefix() -> None:
+    log_filter = LogFilter("INFO", {"src.data": "WARNING", "src.data.config": "DEBUG"}, None)
+    assert log_filter(_record("src.tg.runner"))
+    assert not log_filter(_record("src.data.minio_client"))
+    assert log_filter(_record("src.data.minio_client", level=WARNING))
+    assert log_filter(_record("src.data.config"))
+    assert log_filter(_record("src.database"))
+
+
+def test_sampled_count_added_to_next_record(clock: Clock) -> None:
+    log_filter = LogFilter("DEBUG", {}, 2)
+    assert [log_filter(_record("src.a")) for _ in range(5)] == [True, True, False, False, False]
+    assert log_filter(_record("src.a", level=WARNING))
+    clock.now += 1.0
+    record = _record("src.a")
+    assert log_filter(record)
+    assert record["message"] == "message [3 similar records sampled out]"
+
+
+def test_sampled_count_reported_after_silence(clock: Clock) -> None:
+    log_filter = LogFilter("DEBUG", {}, 1)
+    assert [log_filter(_record("src.a", 7)) for _ in range(3)] == [True, False, False]
+    clock.now += 1.5
+    record = _record("src.b", level=WARNING)
+    assert log_filter(record)
+    assert record["message"] == "message [2 records from src.a:7 sampled out]"
+    record = _record("src.a", 7)
+    assert log_filter(record)
+    assert record["message"] == "message"
+
+
+def test_json_sink_redacts_and_nests_extra(capsys: pytest.CaptureFixture[str]) -> None:
+    record = {
+        "time": datetime(2024, 1, 1, tzinfo=UTC),
+        "level": INFO,
+        "name": "src.tg",
+        "function": "handler",
+        "line": 1,
+        "message": "token secret-token",
+        "exception": None,
+        "extra": {"trace_id": "-", "message": "secret-token", "chat": {"ids": [1, "secret-token"]}},
+    }
+
+    class Message(str):
+        __slots__ = ()
+
+    Message.record = record
+    message = Message("token secret-token")
+    LogSink(["secret-token"], json_logs=True)(message)
+    entry = json.loads(capsys.readouterr().err)
+    assert entry["message"] == f"token {REDACTED}"
+    assert entry["extra"] == {
+        "trace_id": "-",
+        "message": REDACTED,
+        "chat": {"ids": [1, REDACTED]},
+    }
@@ -0,0 +1,82 @@
+import pytest
+
+from src.observability import metrics
+from src.observability.metrics import REGISTRY, Counter, Gauge, Histogram, MetricsRegistry
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch: pytest.MonkeyPatch) -> MetricsRegistry:
+    """Отдельный реестр метрик для теста, метрики процесса не меняются"""
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics, "REGISTRY", registry)
+    return registry
+
+
+def test_counter_renders_labels_escaped() -> None:
+    counter = Counter("test_counter_total", "Счётчик", ("method",))
+    counter.inc('send"Message')
+    counter.inc('send"Message', amount=2)
+
+    assert counter.render() == [
+        "# HELP test_counter_total Счётчик",
+        "# TYPE test_counter_total counter",
+        'test_counter_total{method="send\\"Message"} 3.0',
+    ]
+
+
+def test_counter_overflow_series_are_merged() -> None:
+    counter = Counter("test_overflow_total", "Счётчик", ("chat",), max_series=2)
+    for chat in ("1", "2", "3", "4"):
+        counter.inc(chat)
+
+    assert counter.render()[2:] == [
+        'test_overflow_total{chat="1"} 1.0',
+        'test_overflow_total{chat="2"} 1.0',
+        'test_overflow_total{chat="other"} 2.0',
+    ]
+
+
+def test_counter_rejects_wrong_labels() -> None:
+    counter = Counter("test_labels_total", "Счётчик", ("method",))
+
+    with pytest.raises(ValueError, match="expects labels"):
+        counter.inc()
+
+
+def test_gauge_renders_function_values() -> None:
+    gauge = Gauge("test_gauge", "Значение", ("game",))
+    gauge.set(2, "main")
+    gauge.set_function(lambda: 5, "second")
+
+    assert gauge.render()[2:] == ['test_gauge{game="main"} 2.0', 'test_gauge{game="second"} 5.0']
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    histogram = Histogram("test_duration_seconds", "Длительность", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value)
+
+    assert histogram.render()[2:] == [
+        'test_duration_seconds_bucket{le="0.1"} 1',
+        'test_duration_seconds_bucket{le="1.0"} 3',
+        'test_duration_seconds_bucket{le="+Inf"} 4',
+        "test_duration_seconds_sum 4.25",
+        "test_duration_seconds_count 4",
+    ]
+
+
+def test_registry_rejects_duplicate_names(registry: MetricsRegistry) -> None:
+    Counter("test_duplicate_total", "Счётчик")
+
+    with pytest.raises(ValueError, match="already registered"):
+        Counter("test_duplicate_total", "Счётчик")
+    assert registry.render() == (
+        "# HELP test_duplicate_total Счётчик\n# TYPE test_duplicate_total counter\n"
+    )
+
+
+def test_metrics_do_not_leak_into_process_registry(registry: MetricsRegistry) -> None:
+    Counter("test_isolated_total", "Счётчик")
+
+    assert "test_isolated_total" in registry.render()
+    assert "test_isolated_total" not in REGISTRY.render()
@@ -0,0 +1,7 @@
+from src.observability.profiler import SamplingProfiler
+
+
+def test_effective_duration_is_clamped() -> None:
+    assert SamplingProfiler.effective_duration(0) == 1
+    assert SamplingProfiler.effective_duration(30) == 30
+    assert SamplingProfiler.effective_duration(10_000) == SamplingProfiler.MAX_DURATION
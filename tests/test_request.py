@@ -0,0 +1,39 @@
+import asyncio
+import contextlib
+from collections.abc import Iterator
+
+import httpx
+import pytest
+
+from src.observability.tracing import TRACER
+from src.tg.request import InstrumentedHTTPXRequest, get_api_method
+
+
+def test_get_api_method() -> None:
+    assert get_api_method("https://api.telegram.org/bot1:abc/sendMessage") == "sendMessage"
+    assert get_api_method("https://api.telegram.org/file/bot1:abc/photos/file_1.jpg") == "file"
+
+
+def test_get_updates_is_not_traced(monkeypatch: pytest.MonkeyPatch) -> None:
+    spans = []
+
+    @contextlib.contextmanager
+    def span(name: str, **_: object) -> Iterator[None]:
+        spans.append(name)
+        yield
+
+    monkeypatch.setattr(TRACER, "span", span)
+
+    async def send() -> None:
+        request = InstrumentedHTTPXRequest(pool_name="test")
+        request._client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda _: httpx.Response(200, json={"ok": True})),
+            timeout=request._client.timeout,
+        )
+        for api_method in ("getUpdates", "sendMessage"):
+            await request.do_request(f"https://api.telegram.org/bot1:abc/{api_method}", "POST")
+        await request.shutdown()
+
+    asyncio.run(send())
+
+    assert spans == ["telegram sendMessage"]
@@ -0,0 +1,48 @@
+import pytest
+
+from src.data.config import Config
+from src.exceptions.config import (
+    ConfigWebhookPathIsDuplicatedError,
+    ConfigWebhookServerDiffersError,
+)
+from src.tg.runner import check_webhook_games, webhook_path
+
+
+def _game(config: Config, game: str, webhook_url: str, **update: object) -> tuple:
+    return None, config.model_copy(update={"game": game, "webhook_url": webhook_url, **update})
+
+
+def test_webhook_path(config: Config) -> None:
+    assert webhook_path(config.model_copy(update={"webhook_url": "https://bot.example"})) == "/"
+    assert (
+        webhook_path(config.model_copy(update={"webhook_url": "https://bot.example/a/b"})) == "/a/b"
+    )
+
+
+def test_check_webhook_games_distinct_paths(config: Config) -> None:
+    check_webhook_games(
+        [
+            _game(config, "first", "https://bot.example/first"),
+            _game(config, "second", "https://bot.example/second"),
+        ]
+    )
+
+
+def test_check_webhook_games_duplicated_path(config: Config) -> None:
+    with pytest.raises(ConfigWebhookPathIsDuplicatedError, match="/game"):
+        check_webhook_games(
+            [
+                _game(config, "first", "https://bot.example/game"),
+                _game(config, "second", "https://other.example/game"),
+            ]
+        )
+
+
+def test_check_webhook_games_different_server(config: Config) -> None:
+    with pytest.raises(ConfigWebhookServerDiffersError, match="second"):
+        check_webhook_games(
+            [
+                _game(config, "first", "https://bot.example/first"),
+                _game(config, "second", "https://bot.example/second", webhook_port=8081),
+            ]
+        )
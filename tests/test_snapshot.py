@@ -0,0 +1,204 @@
+import asyncio
+import hashlib
+import io
+import json
+import os
+import zipfile
+from datetime import UTC, datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from sqlalchemy import insert, text, update
+
+from src.data.config import Config
+from src.data.db_model import (
+    DbModel,
+    District,
+    DistrictOwnerChange,
+    DistrictsMap,
+    DistrictsMapVariant,
+)
+from src.data.shared_resources import SharedResources
+from src.data.snapshot import (
+    ASSETS_DIR,
+    MANIFEST_FILENAME,
+    SNAPSHOT_VERSION,
+    export_snapshot,
+    restore_snapshot,
+)
+from src.exceptions.snapshot import (
+    SnapshotAssetsWereNotFoundError,
+    SnapshotVersionIsNotSupportedError,
+)
+from src.loadtest.storage import InMemoryMinIOClient
+
+SNAPSHOT_TEST_SCHEMA = "snapshot_test"
+"""Схема БД для проверки снимка, удаляется после проверки"""
+
+
+def _write_snapshot(path: Path, manifest: dict[str, Any], assets: dict[str, bytes]) -> None:
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr(MANIFEST_FILENAME, json.dumps(manifest))
+        for filename, asset in assets.items():
+            archive.writestr(f"{ASSETS_DIR}/{filename}", asset)
+
+
+def _manifest(version: int, assets: dict[str, str]) -> dict[str, Any]:
+    return {
+        "version": version,
+        "game": "game",
+        "created": "2024-01-01T00:00:00+03:00",
+        "tables": {},
+        "assets": assets,
+        "embedded_assets": list(assets),
+    }
+
+
+@pytest.mark.parametrize("version", [0, SNAPSHOT_VERSION + 1])
+def test_restore_rejects_unknown_version(config: Config, tmp_path: Path, version: int) -> None:
+    path = tmp_path / "snapshot.zip"
+    _write_snapshot(path, _manifest(version, {}), {})
+    resources = SimpleNamespace(minio=InMemoryMinIOClient())
+    with pytest.raises(SnapshotVersionIsNotSupportedError):
+        asyncio.run(restore_snapshot(config, resources, path, tmp_path))
+
+
+def test_restore_rejects_asset_with_wrong_hash(config: Config, tmp_path: Path) -> None:
+    path = tmp_path / "snapshot.zip"
+    manifest = _manifest(SNAPSHOT_VERSION, {"map.png": hashlib.sha256(b"map").hexdigest()})
+    _write_snapshot(path, manifest, {"map.png": b"changed map"})
+    minio = InMemoryMinIOClient()
+    resources = SimpleNamespace(minio=minio)
+    with pytest.raises(SnapshotAssetsWereNotFoundError, match=r"map\.png"):
+        asyncio.run(restore_snapshot(config, resources, path, tmp_path))
+    assert asyncio.run(minio.stat(config.minio_bucket, "map.png")) is None
+
+
+async def _game_state(resources: SharedResources, config: Config) -> dict[str, Any]:
+    """Строки таблиц игры и состояние счётчиков идентификаторов"""
+    state: dict[str, Any] = {}
+    async with resources.db_engine.connect() as conn:
+        for table in DbModel.metadata.sorted_tables:
+            qualified_name = f'"{config.pg_schema}"."{table.name}"'
+            rows = await conn.execute(text(f"SELECT * FROM {qualified_name} ORDER BY id"))
+            sequence = await conn.scalar(
+                text("SELECT pg_get_serial_sequence(:name, 'id')"), {"name": qualified_name}
+            )
+            sequence_state = await conn.execute(
+                text(f"SELECT last_value, is_called FROM {sequence}")
+            )
+            state[table.name] = (
+                [tuple(row) for row in rows],
+                tuple(sequence_state.one()),
+            )
+    return state
+
+
+async def _fill_game(resources: SharedResources, config: Config) -> None:
+    """Создать таблицы игры с владением, историей и картой"""
+    async with resources.game_db_engine(config).begin() as conn:
+        await conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{config.pg_schema}"'))
+        await conn.run_sync(DbModel.metadata.create_all)
+        team_chat_id = config.chats.teams[0].chat_id
+        now = datetime(2024, 1, 1, tzinfo=UTC)
+        await conn.execute(
+            insert(District),
+            [
+                {"name": district.name, "mask_filename": district.mask_filename}
+                for district in config.districts_map.default_districts
+            ],
+        )
+        await conn.execute(
+            insert(DistrictOwnerChange),
+            [
+                {"timestamp": now, "district_name": name, "owner_chat_id": team_chat_id}
+                for name in config.districts_map.distict_names[:2]
+            ],
+        )
+        districts_map_id = await conn.scalar(
+            insert(DistrictsMap)
+            .values(timestamp=now, filename="map.png", file_id="file")
+            .returning(DistrictsMap.id)
+        )
+        await conn.execute(
+            insert(DistrictsMapVariant).values(
+                districts_map_id=districts_map_id, chat_id=team_chat_id, filename="map_variant.png"
+            )
+        )
+
+
+async def _change_game(resources: SharedResources, config: Config) -> None:
+    """Изменить состояние игры после снимка"""
+    async with resources.game_db_engine(config).begin() as conn:
+        await conn.execute(update(District).values(owner_chat_id=config.chats.teams[1].chat_id))
+        await conn.execute(
+            insert(DistrictOwnerChange).values(
+                timestamp=datetime(2024, 1, 2, tzinfo=UTC),
+                district_name=config.districts_map.distict_names[0],
+                owner_chat_id=None,
+            )
+        )
+
+
+@pytest.mark.skipif(
+    not os.environ.get("TEST_PG_HOST"), reason="TEST_PG_HOST is not set, Postgres is not available"
+)
+def test_snapshot_round_trip(config: Config, tmp_path: Path) -> None:
+    config = config.model_copy(
+        update={
+            "pg_host": os.environ["TEST_PG_HOST"],
+            "pg_port": int(os.environ.get("TEST_PG_PORT", "5432")),
+            "pg_user": os.environ.get("TEST_PG_USER", "postgres"),
+            "pg_password": os.environ.get("TEST_PG_PASSWORD", "postgres"),
+            "pg_schema": SNAPSHOT_TEST_SCHEMA,
+        }
+    )
+    data_dir = Path("data")
+    path = tmp_path / "snapshot.zip"
+
+    async def _run() -> None:
+        minio = InMemoryMinIOClient()
+        for filename in ("map.png", "map_variant.png"):
+            await minio.upload(config.minio_bucket, filename, io.BytesIO(filename.encode()), "")
+        for filename in [
+            config.districts_map.backing_filename,
+            config.districts_map.text_filename,
+            *(district.mask_filename for district in config.districts_map.default_districts),
+        ]:
+            await minio.upload(
+                config.minio_bucket, filename, io.BytesIO((data_dir / filename).read_bytes()), ""
+            )
+        resources = SharedResources(config, minio=minio)
+        try:
+            async with resources.db_engine.begin() as conn:
+                await conn.execute(text(f'DROP SCHEMA IF EXISTS "{SNAPSHOT_TEST_SCHEMA}" CASCADE'))
+            await _fill_game(resources, config)
+            exported = await _game_state(resources, config)
+            await export_snapshot(config, resources, path)
+
+            await _change_game(resources, config)
+            assert await _game_state(resources, config) != exported
+            await restore_snapshot(config, resources, path, data_dir)
+            assert await _game_state(resources, config) == exported
+            await restore_snapshot(config, resources, path, data_dir)
+            assert await _game_state(resources, config) == exported
+
+            async with resources.game_db_engine(config).begin() as conn:
+                change_id = await conn.scalar(
+                    insert(DistrictOwnerChange)
+                    .values(
+                        timestamp=datetime(2024, 1, 3, tzinfo=UTC),
+                        district_name=config.districts_map.distict_names[0],
+                        owner_chat_id=None,
+                    )
+                    .returning(DistrictOwnerChange.id)
+                )
+            assert change_id == len(exported["district_owner_changes"][0]) + 1
+        finally:
+            async with resources.db_engine.begin() as conn:
+                await conn.execute(text(f'DROP SCHEMA IF EXISTS "{SNAPSHOT_TEST_SCHEMA}" CASCADE'))
+            await resources.close()
+
+    asyncio.run(_run())
@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+from src.data.config import StandingsBroadcast
+from src.tg.standings_broadcaster import StandingsBroadcaster
+
+
+class FailingOnceBot:
+    def __init__(self) -> None:
+        self.chat_ids: list[int] = []
+
+    async def send_photo(self, chat_id: int, *_args: object, **_kwargs: object) -> str:
+        self.chat_ids.append(chat_id)
+        if len(self.chat_ids) == 1:
+            raise ValueError(chat_id)
+        return f"message {chat_id}"
+
+
+def test_send_loop_survives_unexpected_error() -> None:
+    async def _run() -> None:
+        broadcaster = StandingsBroadcaster(StandingsBroadcast(messages_per_second=1000.0))
+        bot = FailingOnceBot()
+        broadcaster._task = asyncio.create_task(broadcaster._send_loop(bot))
+        failed = broadcaster._submit(1, "file id", "caption")
+        sent = broadcaster._submit(2, "file id", "caption")
+        with pytest.raises(ValueError, match="1"):
+            await failed
+        assert await sent == "message 2"
+        assert bot.chat_ids == [1, 2]
+        assert not broadcaster._task.done()
+        await broadcaster.stop()
+
+    asyncio.run(_run())
@@ -0,0 +1,48 @@
+import io
+
+from PIL import Image
+
+from src.data.tiled_map import FullMapCanvas, TiledMapSources, assemble_area
+
+TILE_SIZE = 4
+
+
+def _sources(key: str) -> TiledMapSources:
+    backing = Image.new("RGBA", (2 * TILE_SIZE, TILE_SIZE))
+    text = Image.new("RGBA", backing.size)
+    masks = [((0, 0, 2, 2), Image.new("L", (2, 2), 255))]
+    return TiledMapSources(key, backing, text, masks, TILE_SIZE)
+
+
+def _tile(color: str) -> bytes:
+    tile_bio = io.BytesIO()
+    Image.new("RGBA", (TILE_SIZE, TILE_SIZE), color).save(tile_bio, format="PNG")
+    return tile_bio.getvalue()
+
+
+def test_sources_key_depends_on_versions() -> None:
+    filenames = ["backing.png", "text.png", "mask.png"]
+    key = TiledMapSources.create_key(filenames, ["a:1", "b:1", "c:1"], 512)
+    assert key == TiledMapSources.create_key(filenames, ["a:1", "b:1", "c:1"], 512)
+    assert key != TiledMapSources.create_key(filenames, ["a:1", "b:1", "d:1"], 512)
+    assert key != TiledMapSources.create_key(filenames, ["a:1", "b:1", "c:1"], 256)
+
+
+def test_tile_key_depends_on_intersecting_districts_only() -> None:
+    sources = _sources("sources")
+    assert sources.tile_districts == {(0, 0): [0], (1, 0): []}
+    assert sources.tile_key((0, 0), ["#ff0000"]) != sources.tile_key((0, 0), ["#00ff00"])
+    assert sources.tile_key((1, 0), ["#ff0000"]) == sources.tile_key((1, 0), ["#00ff00"])
+    assert sources.tile_key((1, 0), ["#ff0000"]) != _sources("other").tile_key((1, 0), ["#ff0000"])
+    sources.close()
+
+
+def test_full_map_canvas_matches_assembled_tiles() -> None:
+    canvas = FullMapCanvas("sources", (2 * TILE_SIZE, TILE_SIZE), TILE_SIZE)
+    canvas.update({(0, 0): ("red", _tile("red")), (1, 0): ("blue", _tile("blue"))})
+    tiles = {(0, 0): _tile("green"), (1, 0): _tile("blue")}
+    full_map = canvas.update({(0, 0): ("green", tiles[(0, 0)]), (1, 0): ("blue", b"")})
+    assembled = assemble_area((0, 0, 2 * TILE_SIZE, TILE_SIZE), TILE_SIZE, tiles)
+    with Image.open(io.BytesIO(full_map)) as image, Image.open(io.BytesIO(assembled)) as expected:
+        assert image.tobytes() == expected.tobytes()
+    canvas.close()
@@ -0,0 +1,60 @@
+import asyncio
+import gzip
+from pathlib import Path
+
+from telegram import Update
+
+from src.tg.update_recorder import TOKEN_PLACEHOLDER, UpdateRecorder, read_recording
+
+TOKEN = "123456:test-token"
+
+
+def _update(update_id: int) -> Update:
+    return Update.de_json(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 0,
+                "chat": {"id": -100, "type": "group"},
+                "text": f"https://api.telegram.org/bot{TOKEN}/getMe",
+            },
+        },
+        None,
+    )
+
+
+def test_recording_round_trip_hides_token(tmp_path: Path) -> None:
+    path = tmp_path / "updates.jsonl.gz"
+    recorder = UpdateRecorder(str(path), TOKEN)
+    recorder.start()
+    for update_id in (1, 2):
+        asyncio.run(recorder.record_handler(_update(update_id), None))  # type: ignore
+    recorder.stop()
+
+    records = list(read_recording(path))
+
+    assert [update["update_id"] for _, update in records] == [1, 2]
+    assert records[0][0] <= records[1][0]
+    assert TOKEN_PLACEHOLDER in records[0][1]["message"]["text"]
+    assert TOKEN not in path.read_bytes().decode("latin-1")
+    assert TOKEN not in gzip.decompress(path.read_bytes()).decode()
+
+
+def test_truncated_recording_yields_records_before_damage(tmp_path: Path) -> None:
+    path = tmp_path / "updates.jsonl.gz"
+    lines = [f'{{"time": {idx}, "update": {{"update_id": {idx}}}}}\n' for idx in range(200)]
+    data = gzip.compress("".join(lines).encode())
+    path.write_bytes(data[: len(data) * 2 // 3])
+
+    records = list(read_recording(path))
+
+    assert 0 < len(records) < 200
+    assert [update["update_id"] for _, update in records] == list(range(len(records)))
+
+
+def test_corrupt_recording_header_yields_nothing(tmp_path: Path) -> None:
+    path = tmp_path / "updates.jsonl.gz"
+    path.write_bytes(b"not a gzip file")
+
+    assert list(read_recording(path)) == []